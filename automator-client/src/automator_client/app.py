@@ -1,3 +1,4 @@
+import json
 import streamlit as st
 import requests
 import pandas as pd
@@ -16,20 +17,39 @@ def post_request(endpoint: str, payload):
         return None, f"API request failed: {e}"
 
 
-def render_scan_results(scan_results, scan_file_path, scan_dir_path):
-    """Display scan results in a table."""
-    st.success("Nmap scan completed. Results displayed below.")
-    # Flatten and display results
-    flattened_results = [
-        {**entry, "Subdomain": subdomain_entry["target"]}
-        for subdomain_entry in scan_results
-        for entry in subdomain_entry["results"]
-    ]
-    df = pd.DataFrame(flattened_results)
-    st.dataframe(df)
-    st.session_state["scan_file_path"] = scan_file_path
-    st.session_state["scan_dir_path"] = scan_dir_path
-    st.session_state["scan_results"] = flattened_results
+def stream_request(endpoint: str, payload):
+    """Send a streaming request and yield the NDJSON events as they arrive."""
+    try:
+        with requests.post(endpoint, json=payload, stream=True) as response:
+            if response.status_code != 200:
+                yield {"event": "error", "error": f"Error: {response.status_code} - {response.text}"}
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    except requests.RequestException as e:
+        yield {"event": "error", "error": f"API request failed: {e}"}
+
+
+def render_scan_stream(events):
+    """Display scan results progressively, one host at a time."""
+    status = st.empty()
+    table = st.empty()
+    rows = []
+    for event in events:
+        if event["event"] == "host":
+            rows.extend(event["host"]["results"])
+            table.dataframe(pd.DataFrame(rows))
+            status.info(f"Scanning... {len(rows)} port records received.")
+        elif event["event"] == "target_done" and event.get("error"):
+            st.warning(f"Error scanning {event['target']}: {event['error']}")
+        elif event["event"] == "scan_done":
+            status.success("Nmap scan completed. Results displayed below.")
+            st.session_state["scan_id"] = event["scan_id"]
+            st.session_state["scan_dir_path"] = event["scan_dir_path"]
+            st.session_state["scan_results"] = rows
+        elif event["event"] == "error":
+            status.error(f"Error scanning: {event['error']}")
 
 
 def render_analysis_results(result):
@@ -45,6 +65,28 @@ def render_analysis_results(result):
             st.write("No suggestions provided.")
 
 
+def render_interpretation_stream(events):
+    """Display the LLM's answer as it is generated, then the parsed analysis."""
+    status = st.empty()
+    answer = st.empty()
+    text = ""
+    for event in events:
+        if event["event"] == "token":
+            text += event["text"]
+            answer.code(text, language="json")
+            status.info("Analyzing...")
+        elif event["event"] == "result":
+            answer.empty()
+            result = event["interpreted_results"]
+            if result.get("error"):
+                status.error(f"Error analyzing logs: {result['error']}")
+            else:
+                status.empty()
+                render_analysis_results(result)
+        elif event["event"] == "error":
+            status.error(f"Error analyzing logs: {event['error']}")
+
+
 def main():
     st.title("Nmap Scan Automator")
 
@@ -85,20 +127,12 @@ def main():
                         "target": selected_subdomains
                     }
                 }
-                result, error = post_request(endpoint=const.NMAP_ENDPOINT, payload=payload)
-                if error:
-                    st.error(f"Error scanning: {error}")
-                elif result:
-                    render_scan_results(
-                        scan_results=result["data"],
-                        scan_file_path=result["scan_file_path"],
-                        scan_dir_path=result["scan_dir_path"]
-                    )
+                render_scan_stream(stream_request(endpoint=const.NMAP_STREAM_ENDPOINT, payload=payload))
 
     # Step 4: Analyze Logs with LLM
-    scan_file_path = st.session_state.get("scan_file_path", None)
+    scan_id = st.session_state.get("scan_id", None)
     scan_dir_path = st.session_state.get("scan_dir_path", None)
-    if scan_file_path:
+    if scan_id:
         st.header("Step 4: Analyze Nmap Logs")
         interpreter_type = st.selectbox("Choose an interpreter", ["gpt", "gemini", "ollama"])
         model_flavor = st.selectbox("Choose a model flavor", const.MODEL_FLAVORS[interpreter_type])
@@ -111,14 +145,10 @@ def main():
                     "model_flavor": model_flavor,
                     "interpret_runner": runner_mode
                 },
-                "scan_file_path": scan_file_path,
+                "scan_id": scan_id,
                 "scan_dir_path": scan_dir_path
             }
-            result, error = post_request(endpoint=const.LLM_INTERPRETATION_ENDPOINT, payload=payload)
-            if error:
-                st.error(f"Error analyzing logs: {error}")
-            elif result:
-                render_analysis_results(result["interpreted_results"])
+            render_interpretation_stream(stream_request(endpoint=const.LLM_INTERPRETATION_STREAM_ENDPOINT, payload=payload))
 
 
 if __name__ == "__main__":
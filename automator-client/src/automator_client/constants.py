@@ -16,5 +16,7 @@ RUNNER_MODES = ["normal", "restricted", "suggest"]
 API_URL = "http://127.0.0.1:5000"
 SCAN_ENDPOINT = f"{API_URL}/scan"
 NMAP_ENDPOINT = f"{API_URL}/nmap_scan"
+NMAP_STREAM_ENDPOINT = f"{API_URL}/nmap_scan/stream"
 LLM_INTERPRETATION_ENDPOINT = f"{API_URL}/llm_interpret"
+LLM_INTERPRETATION_STREAM_ENDPOINT = f"{API_URL}/llm_interpret/stream"
 ENUMERATE_SUBDOMAINS_ENDPOINT = f"{API_URL}/enumerate_subdomains"
\ No newline at end of file
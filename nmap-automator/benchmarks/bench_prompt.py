@@ -0,0 +1,93 @@
+"""
+Prompt size (and optionally interpretation latency) of the raw and compact prompt formats.
+
+Builds the interpretation prompt of scans of growing size, generated like the two-phase
+benchmark fixture (--hosts) or read from a recorded nmap XML output (--xml), in both
+formats: "raw" (the Python repr of the result rows, the previous behaviour) and
+"compact" (see nmap_automator.interpretors.prompt_serializer). For each it reports the
+characters, estimated tokens and whether the prompt fits the token budget of --model.
+
+With --interpretor, every prompt is also sent to that backend (API keys are read from
+the environment as by the server) and the end-to-end interpretation time is reported.
+
+Usage:
+    poetry run python benchmarks/bench_prompt.py --hosts 16 64 256
+    poetry run python benchmarks/bench_prompt.py --xml recorded_scan.xml --interpretor ollama --model gemma2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+from bench_two_phase import write_fixture
+from nmap_automator.interpretors import InterpretorFactory, estimate_tokens, serialize, token_budget
+from nmap_automator.interpretors.prompts import PROMPTS
+from nmap_automator.scanner import iter_hosts_from_file
+
+FORMATS = ("raw", "compact")
+API_KEYS = {"gpt": "OPENAI_API_KEY", "gemini": "GOOGLE_API_KEY"}
+
+
+def load_rows(path: str) -> list[dict]:
+    return [
+        dict(port.to_dict(), Subdomain=host.ip)
+        for host in iter_hosts_from_file(path)
+        for port in host.ports
+    ]
+
+
+def interpret(interpretor_type: str, model: str, rows: list[dict], prompt_format: str, save_dir: str) -> tuple[float, str]:
+    interpretor = InterpretorFactory.create_interpretor(
+        interpretor_type, "bench", model, api_key=os.getenv(API_KEYS.get(interpretor_type, ""), None)
+    )
+    interpretor.configure()
+    interpretor.prompt_format = prompt_format
+    start = time.perf_counter()
+    result = interpretor.interpret_restricted(rows, save_dir)
+    return time.perf_counter() - start, result["error"] or result["result"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--xml", help="Recorded nmap XML output to build the prompt from.")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[16, 64, 256, 1024], help="Hosts of the generated scans.")
+    parser.add_argument("--model", default="gpt-4o", help="Model flavor whose token budget is checked.")
+    parser.add_argument("--interpretor", choices=["gpt", "gemini", "ollama"], help="Also time a restricted interpretation with this backend.")
+    args = parser.parse_args()
+    load_dotenv()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scans = []
+        if args.xml:
+            scans.append((os.path.basename(args.xml), load_rows(args.xml)))
+        else:
+            for hosts in args.hosts:
+                fixture = os.path.join(tmp, f"fixture_{hosts}.xml")
+                write_fixture(fixture, hosts)
+                scans.append((f"{hosts} hosts", load_rows(fixture)))
+
+        budget = token_budget(args.model)
+        print(f"Token budget of {args.model}: {budget}\n")
+        header = f"{'scan':<16}{'rows':>7}{'format':>9}{'chars':>10}{'tokens':>9}{'fits':>6}{'build ms':>10}"
+        if args.interpretor:
+            header += f"{'interpret s':>13}   result"
+        print(header)
+        for name, rows in scans:
+            sizes = {}
+            for prompt_format in FORMATS:
+                start = time.perf_counter()
+                prompt = PROMPTS["restricted"].format(scan_results=serialize(rows, prompt_format))
+                build_ms = (time.perf_counter() - start) * 1000
+                tokens = sizes[prompt_format] = estimate_tokens(prompt)
+                line = f"{name:<16}{len(rows):>7}{prompt_format:>9}{len(prompt):>10}{tokens:>9}{'yes' if tokens <= budget else 'no':>6}{build_ms:>10.2f}"
+                if args.interpretor:
+                    seconds, outcome = interpret(args.interpretor, args.model, rows, prompt_format, tmp)
+                    line += f"{seconds:>13.2f}   {outcome}"
+                print(line)
+            print(f"{'':<16}compact prompt is {sizes['compact'] / sizes['raw']:.0%} of the raw one\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Scaling of sharded range scans with the number of shard workers.
+
+Scans one CIDR range with Runner.scan_targets against fake_nmap.py: first as a single
+nmap run (no sharding), then split into shards across 1, 2, 4, ... worker processes.
+The fixture spreads --hosts up hosts over the range (or replays --xml). The worker
+processes are started before timing, as they are once per server. Speedups are bounded
+by the CPU count, since every shard also runs (and parses) its own nmap process.
+
+Usage:
+    poetry run python benchmarks/bench_shards.py --range 10.0.0.0/20 --hosts 512 --workers 1 2 4 8
+    poetry run python benchmarks/bench_shards.py --xml recorded_scan.xml --range 192.168.0.0/22
+"""
+import argparse
+import ipaddress
+import os
+import tempfile
+import time
+
+from bench_two_phase import install_fake_nmap, write_fixture
+from nmap_automator.config_loader import ScannerConfig, ServerConfig
+from nmap_automator.server.api_server import Runner
+from nmap_automator.server.context import ServerContext
+
+
+def run(server_conf: ServerConfig, save_dir: str, target: str, shard_size: int) -> tuple[float, int, dict]:
+    context = ServerContext(server_conf)
+    runner = Runner(context)
+    # The shard workers are started once per server; start them before timing
+    context.shard_pool.run(["127.0.0.1"] * context.shard_pool.workers, "-sn")
+    conf = ScannerConfig(nmap_args=["-sV", "-T4"], save_dir=save_dir, target=[target], shard_size=shard_size, concurrency=1)
+    scan_dir = runner.create_save_dir(conf)
+    start = time.perf_counter()
+    result = runner.scan_targets(conf, scan_dir)[0]
+    elapsed = time.perf_counter() - start
+    context.shard_pool.shutdown()
+    return elapsed, len(result.get("results", [])), result.get("shards", {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--xml", help="Recorded nmap XML output to replay.")
+    parser.add_argument("--range", default="10.0.0.0/20", help="CIDR range to scan.")
+    parser.add_argument("--hosts", type=int, default=512, help="Up hosts in the synthetic fixture.")
+    parser.add_argument("--shard-size", type=int, default=256, help="Addresses per shard.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard worker counts to measure.")
+    parser.add_argument("--scale", type=float, default=1, help="Multiplier of the simulated nmap costs (FAKE_NMAP_SCALE).")
+    args = parser.parse_args()
+
+    network = ipaddress.ip_network(args.range, strict=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture = args.xml
+        if fixture is None:
+            fixture = os.path.join(tmp, "fixture.xml")
+            write_fixture(fixture, args.hosts, stride=max(1, network.num_addresses // args.hosts))
+        install_fake_nmap(tmp, fixture)
+        os.environ["FAKE_NMAP_SCALE"] = str(args.scale)
+        print(f"Range {network} ({network.num_addresses} addresses), shards of {args.shard_size}, {os.cpu_count()} CPUs\n")
+
+        print(f"{'mode':<22}{'seconds':>10}{'rows':>8}{'speedup':>10}")
+        baseline, rows, _ = run(ServerConfig(data_dir=os.path.join(tmp, "data"), scan_cache_ttl=0), tmp, str(network), network.num_addresses)
+        print(f"{'single nmap run':<22}{baseline:>10.2f}{rows:>8}{1:>10.2f}")
+        for workers in args.workers:
+            server_conf = ServerConfig(
+                data_dir=os.path.join(tmp, "data"),
+                scan_cache_ttl=0,
+                shard_workers=workers,
+                max_scan_concurrency=max(workers, 1)
+            )
+            elapsed, rows, shards = run(server_conf, tmp, str(network), args.shard_size)
+            label = f"{shards.get('total', 1)} shards, {workers} workers"
+            print(f"{label:<22}{elapsed:>10.2f}{rows:>8}{baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Wall-clock comparison of the single-pass and two-phase scan modes.
+
+Runs Runner.scan_targets in both modes against fake_nmap.py, which replays a recorded
+`-A` scan (--xml) or a generated fixture where most hosts have only a few open ports.
+The targets are the /26 ranges covering the fixture hosts. Both modes must report the
+same open ports and services.
+
+Usage:
+    poetry run python benchmarks/bench_two_phase.py --hosts 64 --concurrency 8 --scale 5
+    poetry run python benchmarks/bench_two_phase.py --xml recorded_scan.xml
+"""
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import tempfile
+import time
+
+from nmap_automator.config_loader import ScannerConfig, ServerConfig
+from nmap_automator.server.api_server import Runner
+from nmap_automator.server.context import ServerContext
+
+FAKE_NMAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_nmap.py")
+SERVICES = [
+    (22, "ssh", "OpenSSH", "8.9p1"), (25, "smtp", "Postfix smtpd", ""), (53, "domain", "ISC BIND", "9.18"),
+    (80, "http", "nginx", "1.24.0"), (443, "https", "nginx", "1.24.0"), (3306, "mysql", "MySQL", "8.0.36"),
+    (8080, "http-proxy", "Apache Tomcat", "9.0"),
+]
+
+
+def write_fixture(path: str, hosts: int, seed: int = 0, stride: int = 1) -> None:
+    """Write a synthetic `-A` scan of `hosts` hosts in 10.0.0.0/16, one every `stride` addresses, with zero to four open ports each."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0"?>\n<nmaprun scanner="nmap" args="nmap -A -T3 -v">\n')
+        for h in range(0, hosts * stride, stride):
+            f.write(f'<host><status state="up" reason="syn-ack"/><address addr="10.0.{h // 256}.{h % 256}" addrtype="ipv4"/><ports>')
+            for port, name, product, version in sorted(rng.sample(SERVICES, rng.randint(0, 4))):
+                f.write(
+                    f'<port protocol="tcp" portid="{port}"><state state="open" reason="syn-ack"/>'
+                    f'<service name="{name}" product="{product}" version="{version}"/></port>'
+                )
+            if h % 5 == 0:
+                f.write('<port protocol="tcp" portid="445"><state state="filtered" reason="no-response"/><service name="microsoft-ds"/></port>')
+            f.write('</ports></host>\n')
+        f.write('<runstats><finished time="0" elapsed="0"/></runstats></nmaprun>\n')
+
+
+def fixture_targets(path: str) -> list[str]:
+    import xml.etree.ElementTree as ET
+    networks = {
+        ipaddress.ip_network(f"{address.get('addr')}/26", strict=False)
+        for address in ET.parse(path).getroot().iter("address")
+        if address.get("addrtype", "ipv4") == "ipv4"
+    }
+    return [str(network) for network in sorted(networks)]
+
+
+def install_fake_nmap(bin_dir: str, fixture: str) -> None:
+    shim = os.path.join(bin_dir, "nmap")
+    with open(shim, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_NMAP}" "$@"\n')
+    os.chmod(shim, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_NMAP_FIXTURE"] = fixture
+
+
+def run(runner: Runner, save_dir: str, targets: list[str], mode: str, concurrency: int) -> tuple[float, list[dict]]:
+    conf = ScannerConfig(nmap_args=["-A", "-T3", "-v"], save_dir=save_dir, target=targets, concurrency=concurrency, scan_mode=mode)
+    scan_dir = runner.create_save_dir(conf)
+    start = time.perf_counter()
+    results = runner.scan_targets(conf, scan_dir)
+    return time.perf_counter() - start, [row for result in results for row in result.get("results", [])]
+
+
+def open_services(rows: list[dict]) -> set[tuple]:
+    return {(r["IP"], r["Port"], r["Name"], r["Product"], r["Version"]) for r in rows if r["State"] == "open"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--xml", help="Recorded nmap -A XML output to replay.")
+    parser.add_argument("--hosts", type=int, default=32, help="Hosts in the synthetic fixture.")
+    parser.add_argument("--concurrency", type=int, default=8, help="scanner.concurrency of the request.")
+    parser.add_argument("--scale", type=float, default=5, help="Multiplier of the simulated nmap costs (FAKE_NMAP_SCALE).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture = args.xml
+        if fixture is None:
+            fixture = os.path.join(tmp, "fixture.xml")
+            write_fixture(fixture, args.hosts)
+        install_fake_nmap(tmp, fixture)
+        os.environ["FAKE_NMAP_SCALE"] = str(args.scale)
+        targets = fixture_targets(fixture)
+        server_conf = ServerConfig(data_dir=os.path.join(tmp, "data"), scan_cache_ttl=0, max_scan_concurrency=args.concurrency)
+        print(f"Fixture: {fixture}, {len(targets)} targets, concurrency {args.concurrency}\n")
+
+        print(f"{'mode':<14}{'seconds':>10}{'rows':>8}{'open':>8}   phases")
+        outputs = {}
+        for mode in ("single_pass", "two_phase"):
+            runner = Runner(ServerContext(server_conf))
+            elapsed, rows = run(runner, tmp, targets, mode, args.concurrency)
+            outputs[mode] = open_services(rows)
+            print(f"{mode:<14}{elapsed:>10.2f}{len(rows):>8}{len(outputs[mode]):>8}   {runner.phase_timing or ''}")
+
+        same = outputs["single_pass"] == outputs["two_phase"]
+        print(f"\nSame open ports and services: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Memory and throughput comparison of the nmap XML parsers.
+
+Compares the python-nmap path (whole output parsed into nested dicts, then flattened)
+with the incremental native parser (one host at a time). Uses a recorded nmap XML file
+when given with --xml, otherwise generates a synthetic fixture of the requested size.
+
+Usage:
+    poetry run python benchmarks/bench_xml_parser.py --hosts 20000 --ports 20
+    poetry run python benchmarks/bench_xml_parser.py --xml recorded_scan.xml
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import nmap
+
+from nmap_automator.scanner import iter_hosts_from_file
+
+
+def write_fixture(path: str, hosts: int, ports: int) -> None:
+    """Write a synthetic `-A` style nmap XML output with `hosts` hosts of `ports` ports each."""
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<nmaprun scanner="nmap" args="nmap -A -T3 -v -oX - 10.0.0.0/16" version="7.94" xmloutputversion="1.05">\n')
+        f.write('<scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>\n')
+        for h in range(hosts):
+            ip = f"10.{(h >> 16) & 255}.{(h >> 8) & 255}.{h & 255}"
+            f.write(f'<host starttime="1" endtime="2"><status state="up" reason="syn-ack" reason_ttl="0"/>')
+            f.write(f'<address addr="{ip}" addrtype="ipv4"/>')
+            f.write(f'<hostnames><hostname name="host{h}.example.com" type="PTR"/></hostnames><ports>')
+            for p in range(ports):
+                state = "open" if p % 3 == 0 else "filtered"
+                f.write(
+                    f'<port protocol="tcp" portid="{20 + p}"><state state="{state}" reason="syn-ack" reason_ttl="64"/>'
+                    f'<service name="svc{p}" product="Product {p}" version="{p}.0" method="probed" conf="10">'
+                    f'<cpe>cpe:/a:vendor:product{p}:{p}.0</cpe></service>'
+                    f'<script id="banner" output="Banner for service {p} on {ip}"/></port>'
+                )
+            f.write('</ports><times srtt="1000" rttvar="500" to="100000"/></host>\n')
+        f.write(f'<runstats><finished time="2" elapsed="1"/><hosts up="{hosts}" down="0" total="{hosts}"/></runstats></nmaprun>\n')
+
+
+def parse_python_nmap(path: str) -> int:
+    """The previous NmapScanner path: parse the whole output, then flatten it into rows."""
+    # PortScanner() looks for an nmap binary on creation, which parsing a file does not need
+    scanner = nmap.PortScanner.__new__(nmap.PortScanner)
+    with open(path) as f:
+        scanner.analyse_nmap_xml_scan(nmap_xml_output=f.read())
+    rows = []
+    for host in scanner.all_hosts():
+        for proto in scanner[host].all_protocols():
+            for port in scanner[host][proto]:
+                service_info = scanner[host][proto][port]
+                rows.append({
+                    'IP': host, 'Protocol': proto, 'Port': port, 'State': service_info['state'],
+                    'Name': service_info.get('name', ''), 'Product': service_info.get('product', ''),
+                    'Version': service_info.get('version', '')
+                })
+    return len(rows)
+
+
+def parse_native_rows(path: str) -> int:
+    """Native parser producing the same list of row dicts as NmapScanner.scan()."""
+    rows = [port.to_dict() for host in iter_hosts_from_file(path) for port in host.ports]
+    return len(rows)
+
+
+def parse_native_streaming(path: str) -> int:
+    """Native parser consumed as a stream (what /nmap_scan/stream does): nothing is retained."""
+    return sum(len(host.ports) for host in iter_hosts_from_file(path))
+
+
+def measure(fn, path: str) -> tuple[int, float, float]:
+    start = time.perf_counter()
+    rows = fn(path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--xml", help="Recorded nmap XML output to parse.")
+    parser.add_argument("--hosts", type=int, default=20000, help="Hosts in the synthetic fixture.")
+    parser.add_argument("--ports", type=int, default=20, help="Ports per host in the synthetic fixture.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.xml
+        if path is None:
+            path = os.path.join(tmp, "fixture.xml")
+            write_fixture(path, args.hosts, args.ports)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Fixture: {path} ({size_mb:.1f} MiB)\n")
+
+        print(f"{'parser':<22}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak MiB':>11}")
+        for name, fn in (
+            ("python-nmap", parse_python_nmap),
+            ("native (rows)", parse_native_rows),
+            ("native (streaming)", parse_native_streaming),
+        ):
+            rows, elapsed, peak = measure(fn, path)
+            print(f"{name:<22}{rows:>10}{elapsed:>10.2f}{rows / elapsed:>12.0f}{peak:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
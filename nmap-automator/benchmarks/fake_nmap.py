@@ -0,0 +1,129 @@
+"""
+Fake nmap binary replaying a recorded nmap XML output, for the scan benchmarks.
+
+The benchmarks put an executable named `nmap` running this script first on PATH and
+point FAKE_NMAP_FIXTURE at a recorded (or generated) `-A` scan. Every invocation reports
+the fixture hosts matching its targets (IPs, CIDR ranges or hostnames), limited to the
+ports given with -p, with service details only when -sV or -A is given.
+
+Time is simulated with a simple cost model (in seconds, multiplied by FAKE_NMAP_SCALE):
+- DISCOVERY_COST for every address of the targets (host discovery), unless -Pn is given;
+- PROBE_COST for every probed port of every host (1000 ports without -p), 40% less with -T4;
+- SERVICE_COST for every open port with -sV or -A;
+- HOST_A_COST for every host with -A (OS detection, traceroute, scripts).
+The hosts of one invocation are processed up to FAKE_NMAP_PARALLELISM at a time.
+"""
+import ipaddress
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+DISCOVERY_COST = 0.0005
+PROBE_COST = 0.00005
+SERVICE_COST = 0.02
+HOST_A_COST = 0.1
+DEFAULT_PORT_COUNT = 1000
+
+
+def parse_ports(spec: str) -> set[int]:
+    ports = set()
+    for part in spec.split(","):
+        if "-" in part:
+            low, high = part.split("-")
+            ports.update(range(int(low), int(high) + 1))
+        else:
+            ports.add(int(part))
+    return ports
+
+
+def parse_args(argv: list[str]) -> tuple[list[str], set[str], set[int] | None]:
+    targets, flags, ports = [], set(), None
+    args = iter(argv)
+    for arg in args:
+        if arg == "-p":
+            ports = parse_ports(next(args))
+        elif arg in ("-oX", "-oG", "--host-timeout", "--max-rate"):
+            next(args)
+        elif arg.startswith("-"):
+            flags.add(arg)
+        else:
+            targets.append(arg)
+    return targets, flags, ports
+
+
+def load_fixture(path: str) -> list[ET.Element]:
+    return ET.parse(path).getroot().findall("host")
+
+
+def matches(host: ET.Element, target: str) -> bool:
+    ip = host.find("address").get("addr")
+    try:
+        return ipaddress.ip_address(ip) in ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return any(name.get("name") == target for name in host.iter("hostname"))
+
+
+def address_count(target: str) -> int:
+    try:
+        return ipaddress.ip_network(target, strict=False).num_addresses
+    except ValueError:
+        return 1
+
+
+def host_xml(host: ET.Element, ports: set[int] | None, service_detection: bool) -> tuple[str, int]:
+    address = host.find("address")
+    parts = [f'<host><status state="up" reason="syn-ack"/><address addr="{address.get("addr")}" addrtype="{address.get("addrtype", "ipv4")}"/><ports>']
+    open_ports = 0
+    for port in host.iter("port"):
+        if ports is not None and int(port.get("portid")) not in ports:
+            continue
+        state = port.find("state").get("state")
+        open_ports += state == "open"
+        service = port.find("service")
+        attrs = {"name": service.get("name", "")} if service is not None else {}
+        if service is not None and service_detection:
+            attrs.update({key: service.get(key) for key in ("product", "version") if service.get(key)})
+        service_attrs = " ".join(f"{key}={quoteattr(value)}" for key, value in attrs.items())
+        parts.append(
+            f'<port protocol="{port.get("protocol")}" portid="{port.get("portid")}"><state state="{state}" reason="syn-ack"/>'
+            f'<service {service_attrs}/></port>'
+        )
+    parts.append("</ports></host>\n")
+    return "".join(parts), open_ports
+
+
+def main() -> None:
+    if "-V" in sys.argv[1:]:
+        print("Nmap version 7.94 ( https://nmap.org ) [fake]")
+        return
+
+    targets, flags, ports = parse_args(sys.argv[1:])
+    scale = float(os.environ.get("FAKE_NMAP_SCALE", "1"))
+    parallelism = int(os.environ.get("FAKE_NMAP_PARALLELISM", "4"))
+    service_detection = "-sV" in flags or "-A" in flags
+    probe_cost = PROBE_COST * (0.6 if "-T4" in flags else 1.0)
+
+    hosts = [host for host in load_fixture(os.environ["FAKE_NMAP_FIXTURE"]) if any(matches(host, t) for t in targets)]
+    out = sys.stdout
+    out.write(f'<?xml version="1.0"?>\n<nmaprun scanner="nmap" args="nmap {" ".join(sys.argv[1:])}">\n')
+    out.flush()
+    if "-Pn" not in flags:
+        addresses = sum(address_count(target) for target in targets)
+        time.sleep(DISCOVERY_COST * addresses * scale / min(parallelism, addresses))
+    for host in hosts:
+        xml, open_ports = host_xml(host, ports, service_detection)
+        cost = probe_cost * (len(ports) if ports is not None else DEFAULT_PORT_COUNT)
+        if service_detection:
+            cost += SERVICE_COST * open_ports
+        if "-A" in flags:
+            cost += HOST_A_COST
+        time.sleep(cost * scale / min(parallelism, len(hosts)))
+        out.write(xml)
+        out.flush()
+    out.write(f'<runstats><finished time="0" elapsed="0"/><hosts up="{len(hosts)}" down="0" total="{len(hosts)}"/></runstats></nmaprun>\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from .config import Config, NmapScanRequest, LLMInterpretRequest, ScannerConfig, InterpretorConfig, SubdomainRequest
\ No newline at end of file
+from .config import Config, NmapScanRequest, LLMInterpretRequest, ScannerConfig, InterpretorConfig, EnsembleMemberConfig, SubdomainRequest, ServerConfig, ResultsQueryRequest, ScanDiffRequest, ScheduleRequest, ScheduleUpdateRequest
\ No newline at end of file
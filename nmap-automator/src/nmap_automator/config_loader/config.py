@@ -1,5 +1,7 @@
 import os
-from typing import Literal, List
+import datetime
+import ipaddress
+from typing import Literal, List, Optional
 
 from pydantic import BaseModel, field_validator, model_validator, Field
 from omegaconf import OmegaConf
@@ -8,6 +10,21 @@ class ScannerConfig(BaseModel):
     nmap_args: List[str]
     save_dir: str
     target: List[str]
+    concurrency: int = Field(default=4, description="Maximum number of targets scanned in parallel for this request.")
+    force_refresh: bool = Field(default=False, description="Scan every target again instead of using cached results.")
+    plan_targets: bool = Field(
+        default=True,
+        description="Normalize, deduplicate and merge the targets, and scan names sharing an IP only once."
+    )
+    shard_size: int = Field(default=256, description="Ranges with more addresses are split into shards of this many addresses (a power of two).")
+    scan_mode: Literal["single_pass", "two_phase"] = Field(
+        default="single_pass",
+        description="single_pass runs nmap_args on every target; two_phase sweeps all targets for open ports, then runs nmap_args on the open ports of each host."
+    )
+    host_timeout: Optional[int] = Field(default=None, description="Seconds nmap spends on a single host before giving up on it (nmap --host-timeout).")
+    target_timeout: Optional[int] = Field(default=None, description="Seconds an nmap process may run before it is killed; the hosts it finished are kept.")
+    job_timeout: Optional[int] = Field(default=None, description="Seconds the whole scan may run before the targets still running or queued are cancelled.")
+    max_rate: Optional[int] = Field(default=None, description="Packets per second this scan may send, on top of its share of the server's packet rate budget.")
 
     @field_validator("nmap_args")
     @classmethod
@@ -34,11 +51,93 @@ class ScannerConfig(BaseModel):
         if not isinstance(v, List):
             raise ValueError("targets must be a list")
         return v
-    
-class InterpretorConfig(BaseModel):
+
+    @field_validator("concurrency")
+    @classmethod
+    def validate_concurrency(cls, v):
+        if v < 1:
+            raise ValueError("concurrency must be at least 1")
+        return v
+
+    @field_validator("host_timeout", "target_timeout", "job_timeout", "max_rate")
+    @classmethod
+    def validate_limits(cls, v, info):
+        if v is not None and v < 1:
+            raise ValueError(f"{info.field_name} must be at least 1")
+        return v
+
+    @field_validator("shard_size")
+    @classmethod
+    def validate_shard_size(cls, v):
+        if v < 1 or v & (v - 1):
+            raise ValueError("shard_size must be a power of two")
+        return v
+
+# Model flavors of each interpretor type (the policies of an ensemble)
+MODEL_FLAVORS = {
+    "gpt": ["gpt-4", "gpt-4o", "gpt-4o-mini", "o1", "o1-mini"],
+    "gemini": [
+        "models/gemini-1.5-pro", "models/gemini-1.5-flash",
+        "models/gemini-1.5-flash-8b", "models/gemini-1.0-pro"
+    ],
+    "ollama": [
+        "llama3.3", "llama3.2", "llama3.1", "llama3", 
+        "llama2", "gemma2", "gemma",
+        "jimscard/whiterabbit-neo", "ALIENTELLIGENCE/cybersecuritythreatanalysis"
+    ],
+    "ensemble": ["hedge", "cascade"]
+}
+
+class EnsembleMemberConfig(BaseModel):
+    """An interpretor of an ensemble."""
     interpretor_type: Literal["ollama", "gpt", "gemini"]
     model_flavor: str
+
+    @model_validator(mode='after')
+    def validate_model_flavor(self):
+        if self.model_flavor not in MODEL_FLAVORS[self.interpretor_type]:
+            raise ValueError(f"model_flavor must be one of {MODEL_FLAVORS[self.interpretor_type]} for interpretor_type '{self.interpretor_type}'")
+        return self
+
+class InterpretorConfig(BaseModel):
+    interpretor_type: Literal["ollama", "gpt", "gemini", "ensemble"]
+    model_flavor: str
     interpret_runner: Literal["normal", "restricted", "suggest"]
+    force_refresh: bool = Field(default=False, description="Interpret again instead of using a cached interpretation.")
+    prompt_format: Literal["compact", "raw"] = Field(
+        default="compact",
+        description="compact groups the scan results by host with a dense table of open ports; raw is the list of result rows as is."
+    )
+    chunking: Literal["auto", "off", "always"] = Field(
+        default="auto",
+        description="Interpret the scan in chunks of hosts: auto when its prompt exceeds chunk_tokens, always, or never (off)."
+    )
+    chunk_tokens: Optional[int] = Field(default=None, ge=1, description="Token budget of a chunk prompt (defaults to the model's budget).")
+    chunk_concurrency: int = Field(default=4, ge=1, description="Number of chunks interpreted at the same time.")
+    reduce: Literal["merge", "llm"] = Field(
+        default="merge",
+        description="Combine the chunk interpretations deterministically (merge) or with one more LLM call (llm)."
+    )
+    ensemble: Optional[List[EnsembleMemberConfig]] = Field(
+        default=None,
+        description="Members of an ensemble interpretor, in order: the first one asked (hedge), or cheapest first (cascade)."
+    )
+    hedge_delay: Optional[float] = Field(
+        default=None, ge=0,
+        description="Seconds before the next ensemble member is asked (defaults to the first member's p95 latency)."
+    )
+    cascade_min_confidence: float = Field(
+        default=0.7, ge=0, le=1,
+        description="Confidence under which a cascade escalates to the next member."
+    )
+    preclassify: List[Literal["no_hosts_up", "all_filtered", "complete_service_scan"]] = Field(
+        default=["no_hosts_up", "all_filtered"],
+        description="Rules classifying obvious scans without the LLM, tried in order (an empty list sends every scan to the LLM)."
+    )
+    preclassify_min_confidence: float = Field(
+        default=0.9, ge=0, le=1,
+        description="Confidence a rule needs for its classification to be kept instead of asking the LLM."
+    )
 
     @model_validator(mode='before')
     def validate_interpretor_config(cls, values):
@@ -46,29 +145,19 @@ class InterpretorConfig(BaseModel):
         model_flavor = values.get('model_flavor')
         interpret_runner = values.get('interpret_runner')
 
-        model_model_flavor = {
-            "gpt": ["gpt-4", "gpt-4o", "gpt-4o-mini", "o1", "o1-mini"],
-            "gemini": [
-                "models/gemini-1.5-pro", "models/gemini-1.5-flash",
-                "models/gemini-1.5-flash-8b", "models/gemini-1.0-pro"
-            ],
-            "ollama": [
-                "llama3.3", "llama3.2", "llama3.1", "llama3", 
-                "llama2", "gemma2", "gemma",
-                "jimscard/whiterabbit-neo", "ALIENTELLIGENCE/cybersecuritythreatanalysis"
-            ]
-        }
+        if interpretor_type not in ["ollama", "gpt", "gemini", "ensemble"]:
+            raise ValueError("interpretor_type must be one of 'ollama', 'gpt', 'gemini', 'ensemble'")
         
-        if interpretor_type not in ["ollama", "gpt", "gemini"]:
-            raise ValueError("interpretor_type must be one of 'ollama', 'gpt', 'gemini'")
-        
-        valid_flavors = model_model_flavor.get(interpretor_type, [])
+        valid_flavors = MODEL_FLAVORS.get(interpretor_type, [])
 
         if model_flavor not in valid_flavors:
             raise ValueError(f"model_flavor must be one of {valid_flavors} for interpretor_type '{interpretor_type}'")
         
         if interpret_runner not in ["normal", "restricted", "suggest"]:
             raise ValueError("interpret_runner must be one of 'normal', 'restricted', 'suggest'")
+
+        if interpretor_type == "ensemble" and len(values.get('ensemble') or []) < 2:
+            raise ValueError("an ensemble interpretor needs at least two members in 'ensemble'")
         
         return values
 
@@ -80,8 +169,53 @@ class LLMInterpretRequest(BaseModel):
     """Request model for the /llm_interpret endpoint."""
     #scanner: ScannerConfig = Field(..., description="Scanner configuration for the saved directory.")
     interpretor: InterpretorConfig = Field(..., description="Interpreter configuration for the LLM.")
-    scan_file_path: str = Field(..., description="Path to the CSV file with scan results.")
-    scan_dir_path: str = Field(..., description="Path to the scan data directory.")
+    scan_id: Optional[str] = Field(default=None, description="ID of the stored scan to interpret.")
+    scan_file_path: Optional[str] = Field(default=None, description="Path to a CSV file with scan results (scans made before the results store).")
+    scan_dir_path: Optional[str] = Field(default=None, description="Path to the scan data directory.")
+
+    @model_validator(mode='after')
+    def validate_scan_source(self):
+        if not (self.scan_id or self.scan_dir_path or self.scan_file_path):
+            raise ValueError("One of scan_id, scan_dir_path or scan_file_path is required")
+        return self
+
+class ScanDiffRequest(BaseModel):
+    """Request model for the /scans/diff endpoint: a base scan and a newer scan, each by ID or directory."""
+    base_scan_id: Optional[str] = Field(default=None, description="ID of the earlier scan.")
+    base_scan_dir_path: Optional[str] = Field(default=None, description="Data directory of the earlier scan.")
+    scan_id: Optional[str] = Field(default=None, description="ID of the newer scan.")
+    scan_dir_path: Optional[str] = Field(default=None, description="Data directory of the newer scan.")
+    interpretor: Optional[InterpretorConfig] = Field(default=None, description="Interpret the changes instead of the full scan when given.")
+
+    @model_validator(mode='after')
+    def validate_scan_sources(self):
+        if not (self.base_scan_id or self.base_scan_dir_path):
+            raise ValueError("One of base_scan_id or base_scan_dir_path is required")
+        if not (self.scan_id or self.scan_dir_path):
+            raise ValueError("One of scan_id or scan_dir_path is required")
+        return self
+
+class ScheduleRequest(BaseModel):
+    """Request model for the /schedules endpoint: a scan run again every `interval_seconds`."""
+    name: str = Field(..., description="Name of the recurring scan.")
+    scanner: ScannerConfig = Field(..., description="Scanner configuration of every run.")
+    interpretor: Optional[InterpretorConfig] = Field(default=None, description="Interpret the results of every run when given.")
+    interval_seconds: int = Field(..., ge=1, description="Seconds between two runs.")
+    priority: int = Field(default=0, description="Runs due at the same time are dispatched by decreasing priority.")
+    overlap: Literal["skip", "coalesce"] = Field(
+        default="skip",
+        description="When a run is due while the previous one is still going: skip it, or run once as soon as the previous one finishes."
+    )
+    min_target_interval: int = Field(default=0, ge=0, description="Seconds before a target scanned by any recurring scan may be scanned again.")
+    enabled: bool = Field(default=True, description="Disabled schedules are kept but never run.")
+
+class ScheduleUpdateRequest(BaseModel):
+    """Request model for updating a schedule: only the given fields change."""
+    interval_seconds: Optional[int] = Field(default=None, ge=1)
+    priority: Optional[int] = None
+    overlap: Optional[Literal["skip", "coalesce"]] = None
+    min_target_interval: Optional[int] = Field(default=None, ge=0)
+    enabled: Optional[bool] = None
 
 class SubdomainRequest(BaseModel):
     domain: str = Field(..., description="The target domain to enumerate subdomains for.")
@@ -93,6 +227,106 @@ class SubdomainRequest(BaseModel):
         description="List of search engines to use for subdomain enumeration."
     )
 
+class ResultsQueryRequest(BaseModel):
+    """Request model for the /results endpoint (query string parameters)."""
+    ip: Optional[str] = Field(default=None, description="Exact IP address.")
+    cidr: Optional[str] = Field(default=None, description="Network containing the IP, e.g. '10.0.0.0/16'.")
+    port: Optional[int] = Field(default=None, description="Port number.")
+    protocol: Optional[str] = Field(default=None, description="Protocol, e.g. 'tcp'.")
+    state: Optional[str] = Field(default=None, description="Port state, e.g. 'open'.")
+    service: Optional[str] = Field(default=None, description="Exact service name, e.g. 'ssh'.")
+    product: Optional[str] = Field(default=None, description="Substring of the product, e.g. 'OpenSSH'.")
+    version: Optional[str] = Field(default=None, description="Substring of the version, e.g. '7.'.")
+    scan_id: Optional[str] = Field(default=None, description="Restrict the query to one scan.")
+    target: Optional[str] = Field(default=None, description="Restrict the query to one scanned target.")
+    since: Optional[str] = Field(default=None, description="Earliest recording time (ISO 8601).")
+    until: Optional[str] = Field(default=None, description="Latest recording time (ISO 8601).")
+    sort_by: Literal["scanned_at", "ip", "port", "protocol", "state", "name", "product", "version", "scan_id"] = "scanned_at"
+    sort_order: Literal["asc", "desc"] = "desc"
+    page: int = Field(default=1, ge=1)
+    page_size: int = Field(default=100, ge=1, le=1000)
+
+    @field_validator("cidr")
+    @classmethod
+    def validate_cidr(cls, v):
+        if v is not None:
+            ipaddress.ip_network(v, strict=False)
+        return v
+
+    @field_validator("since", "until")
+    @classmethod
+    def validate_time(cls, v):
+        # Stored timestamps are local ISO 8601 strings, compared as text
+        if v is not None:
+            return datetime.datetime.fromisoformat(v).isoformat(timespec="seconds")
+        return v
+
+class ServerConfig(BaseModel):
+    """Server-wide settings, read from the environment (or the .env file)."""
+    max_scan_concurrency: int = Field(default=8, description="Maximum number of nmap processes running at once across all requests.")
+    data_dir: str = Field(default="./data", description="Directory holding the server's on-disk state (results and job databases, ...).")
+    job_workers: int = Field(default=2, description="Number of background scan jobs running at the same time.")
+    scanner_backend: Literal["native", "python-nmap"] = Field(default="native", description="Parser used for nmap's XML output.")
+    shard_workers: int = Field(default=4, description="Worker processes scanning the shards of a large range.")
+    shard_queue: str = Field(default="", description="SQLite file of the distributed shard queue; when set, shards are scanned by `nmap-automator worker` processes instead of the local pool.")
+    worker_lease_seconds: int = Field(default=60, description="Seconds a worker keeps a shard without a heartbeat before it is queued again.")
+    scan_cache_ttl: int = Field(default=3600, description="Seconds a target's scan results are reused by identical scans (0 disables the cache).")
+    scan_cache_max_mb: int = Field(default=100, description="Size of the scan cache before least recently used entries are evicted.")
+    packet_rate_budget: int = Field(default=0, description="Packets per second shared by all running scans and passed to nmap as --max-rate (0 for no budget).")
+    interpretation_cache_ttl: int = Field(default=86400, description="Seconds an interpretation is reused for the same scan results, model and prompt (0 disables the cache).")
+    interpretation_cache_max_mb: int = Field(default=50, description="Size of the interpretation cache before least recently used entries are evicted.")
+    interpretation_cache_scope: Literal["all", "deterministic"] = Field(
+        default="deterministic",
+        description="Cache only the interpretations run at temperature 0 (GPT restricted runs), or every interpretation."
+    )
+    scheduler_enabled: bool = Field(default=True, description="Run the recurring scans stored in the schedule database.")
+    scheduler_poll_seconds: int = Field(default=5, description="Seconds between two checks for due recurring scans.")
+    scheduler_max_running: int = Field(default=2, description="Recurring scan runs in flight at once; further due runs wait, highest priority first.")
+    scheduler_min_target_interval: int = Field(default=0, description="Seconds before a target scanned by any recurring scan may be scanned again by one.")
+    gpt_requests_per_minute: int = Field(default=0, description="Requests a minute sent to OpenAI (0 for no limit).")
+    gpt_tokens_per_minute: int = Field(default=0, description="Estimated prompt and answer tokens a minute sent to OpenAI (0 for no limit).")
+    gemini_requests_per_minute: int = Field(default=0, description="Requests a minute sent to Gemini (0 for no limit).")
+    gemini_tokens_per_minute: int = Field(default=0, description="Estimated prompt and answer tokens a minute sent to Gemini (0 for no limit).")
+    ollama_requests_per_minute: int = Field(default=0, description="Requests a minute sent to Ollama (0 for no limit).")
+    ollama_tokens_per_minute: int = Field(default=0, description="Estimated prompt and answer tokens a minute sent to Ollama (0 for no limit).")
+    llm_max_retries: int = Field(default=3, description="Retries of an LLM call that was throttled, timed out or failed on the provider's side.")
+    llm_retry_base_seconds: float = Field(default=1.0, description="Backoff ceiling of the first retry, doubled on every retry (the actual delay is jittered).")
+    llm_retry_max_seconds: float = Field(default=30.0, description="Maximum backoff ceiling between two retries.")
+    llm_call_deadline: float = Field(default=120.0, description="Seconds an LLM call may take, retries and rate limit waits included (0 for none).")
+    llm_breaker_failures: int = Field(default=5, description="Consecutive failed calls to a provider before it is failed fast.")
+    llm_breaker_reset_seconds: int = Field(default=30, description="Seconds a provider is failed fast before a trial call is let through.")
+
+    @field_validator(
+        "max_scan_concurrency", "job_workers", "shard_workers", "worker_lease_seconds", "scan_cache_max_mb", "interpretation_cache_max_mb",
+        "scheduler_poll_seconds", "scheduler_max_running", "llm_breaker_failures", "llm_breaker_reset_seconds"
+    )
+    @classmethod
+    def validate_positive(cls, v, info):
+        if v < 1:
+            raise ValueError(f"{info.field_name} must be at least 1")
+        return v
+
+    @field_validator(
+        "scan_cache_ttl", "interpretation_cache_ttl", "packet_rate_budget", "scheduler_min_target_interval",
+        "gpt_requests_per_minute", "gpt_tokens_per_minute", "gemini_requests_per_minute", "gemini_tokens_per_minute",
+        "ollama_requests_per_minute", "ollama_tokens_per_minute", "llm_max_retries", "llm_retry_base_seconds",
+        "llm_retry_max_seconds", "llm_call_deadline"
+    )
+    @classmethod
+    def validate_non_negative(cls, v, info):
+        if v < 0:
+            raise ValueError(f"{info.field_name} must not be negative")
+        return v
+
+    @classmethod
+    def from_env(cls):
+        values = {}
+        for name in cls.model_fields:
+            env_value = os.getenv(f"NMAP_AUTOMATOR_{name.upper()}")
+            if env_value is not None:
+                values[name] = env_value
+        return cls(**values)
+
 class Config(BaseModel):
     scanner: ScannerConfig
     interpretor: InterpretorConfig
@@ -0,0 +1,4 @@
+# src/nmap_automator/distributed/__init__.py
+from .shard_queue import ShardQueue, SqliteShardQueue
+from .worker import ShardWorker
+from .coordinator import ShardCoordinator
@@ -0,0 +1,104 @@
+import time
+import uuid
+from typing import Callable
+
+from nmap_automator.scanner import CancelToken
+from .shard_queue import ShardQueue
+
+
+class _BatchCanceller:
+    """Lets a CancelToken cancel the shards of a batch, including those running on workers."""
+
+    def __init__(self, queue: ShardQueue, batch_id: str) -> None:
+        self.queue = queue
+        self.batch_id = batch_id
+
+    def cancel(self) -> None:
+        self.queue.cancel(self.batch_id)
+
+
+class ShardCoordinator:
+    """
+    Drop-in replacement of ShardPool that has the shards scanned by `nmap-automator worker` processes.
+
+    Shards are enqueued as one batch per range; the coordinator then polls the queue,
+    queues again the shards of workers whose lease expired, and collects the results.
+    """
+
+    def __init__(self, queue: ShardQueue, lease_seconds: float = 60, poll_interval: float = 0.5, max_attempts: int = 3) -> None:
+        """
+        :param queue: Queue shared with the workers.
+        :param lease_seconds: Lease duration of the workers, used to report dead workers.
+        :param poll_interval: Seconds between two polls of the queue.
+        :param max_attempts: Number of leases after which a shard is failed rather than queued again.
+        """
+        self.queue = queue
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+
+    def workers(self) -> list[dict]:
+        return self.queue.worker_stats(self.lease_seconds)
+
+    def shutdown(self) -> None:
+        pass
+
+    def run(
+        self,
+        shards: list[str],
+        arguments: str,
+        backend: str = "native",
+        cancel_token: CancelToken = None,
+        on_shard_start: Callable[[str], None] = None,
+        on_shard_done: Callable[[dict], None] = None
+    ) -> list[dict]:
+        """
+        Scan every shard through the queue and return one result per shard, in input order.
+
+        Takes the same arguments and returns the same results as ShardPool.run, with the
+        `worker_id` and number of `attempts` of every shard.
+        """
+        if not shards:
+            return []
+
+        batch_id = uuid.uuid4().hex
+        self.queue.enqueue(batch_id, shards, arguments, backend)
+        canceller = _BatchCanceller(self.queue, batch_id)
+        if cancel_token is not None:
+            cancel_token.register(canceller)
+
+        results = {}
+        started = set()
+        try:
+            while len(results) < len(shards):
+                requeued = self.queue.requeue_expired(self.max_attempts)
+                if requeued:
+                    print(f"Queued {requeued} shards of unresponsive workers again.")
+                for task in self.queue.batch_status(batch_id):
+                    shard = task["shard"]
+                    if shard in results:
+                        continue
+                    if task["status"] == "leased" and shard not in started:
+                        started.add(shard)
+                        if on_shard_start is not None:
+                            on_shard_start(shard)
+                    elif task["status"] in ("completed", "failed", "cancelled"):
+                        result = {"shard": shard, "worker_id": task["worker_id"], "attempts": task["attempts"]}
+                        if task["status"] == "completed":
+                            result.update(results=self.queue.take_results(task["task_id"]), cancelled=False, elapsed_seconds=task["elapsed_seconds"])
+                        elif task["status"] == "cancelled":
+                            result.update(error="Scan cancelled.", cancelled=True)
+                        else:
+                            result["error"] = task["error"]
+                        results[shard] = result
+                        if on_shard_done is not None:
+                            on_shard_done(result)
+                if len(results) < len(shards):
+                    time.sleep(self.poll_interval)
+        finally:
+            if cancel_token is not None:
+                cancel_token.unregister(canceller)
+            if len(results) < len(shards):
+                self.queue.cancel(batch_id)
+            self.queue.delete_batch(batch_id)
+        return [results[shard] for shard in shards]
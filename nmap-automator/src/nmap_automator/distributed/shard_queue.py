@@ -0,0 +1,282 @@
+import json
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from nmap_automator.storage import SqliteStore
+
+
+class ShardQueue(ABC):
+    """
+    Queue of scan shards shared by a coordinator (the API server) and `nmap-automator worker` processes.
+
+    The coordinator enqueues the shards of a batch and collects their results; workers claim
+    shards under a lease, which they renew with heartbeats while scanning. Shards whose lease
+    expires (their worker died or lost contact) are queued again for another worker.
+    """
+
+    @abstractmethod
+    def enqueue(self, batch_id: str, shards: list[str], arguments: str, backend: str) -> None:
+        pass
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> dict | None:
+        """Lease the oldest queued shard to a worker, or return None when there is none."""
+        pass
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, task_id: str = None, lease_seconds: float = None) -> str | None:
+        """
+        Record that a worker is alive and renew the lease of the shard it is scanning.
+
+        :return: Status of the shard, "leased" while the worker still holds it.
+        """
+        pass
+
+    @abstractmethod
+    def complete(self, task_id: str, worker_id: str, results: list[dict], elapsed_seconds: float) -> bool:
+        """Store the results of a shard. Results of a worker that lost the lease are discarded (returns False)."""
+        pass
+
+    @abstractmethod
+    def fail(self, task_id: str, worker_id: str, error: str) -> bool:
+        pass
+
+    @abstractmethod
+    def requeue_expired(self, max_attempts: int = 3) -> int:
+        """Queue the shards whose lease expired again, or fail them after `max_attempts` leases."""
+        pass
+
+    @abstractmethod
+    def cancel(self, batch_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def batch_status(self, batch_id: str) -> list[dict]:
+        """State of every shard of a batch, without the results."""
+        pass
+
+    @abstractmethod
+    def take_results(self, task_id: str) -> list[dict]:
+        pass
+
+    @abstractmethod
+    def delete_batch(self, batch_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def register_worker(self, worker_id: str, hostname: str, pid: int) -> None:
+        pass
+
+    @abstractmethod
+    def stop_worker(self, worker_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def worker_stats(self, lease_seconds: float) -> list[dict]:
+        pass
+
+
+class SqliteShardQueue(SqliteStore, ShardQueue):
+    """
+    ShardQueue kept in a SQLite file, shared by the processes of one host or of hosts mounting the same file system.
+
+    Every state change is a single conditional UPDATE, so workers in other processes
+    never claim the same shard twice.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS shard_tasks (
+            task_id TEXT PRIMARY KEY,
+            batch_id TEXT NOT NULL,
+            shard TEXT NOT NULL,
+            arguments TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            status TEXT NOT NULL,
+            worker_id TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_expires REAL,
+            results TEXT,
+            error TEXT,
+            elapsed_seconds REAL,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_shard_tasks_status ON shard_tasks (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_shard_tasks_batch ON shard_tasks (batch_id)",
+        """
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            hostname TEXT NOT NULL,
+            pid INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            last_heartbeat REAL NOT NULL,
+            shards_completed INTEGER NOT NULL DEFAULT 0,
+            shards_failed INTEGER NOT NULL DEFAULT 0,
+            hosts_scanned INTEGER NOT NULL DEFAULT 0,
+            busy_seconds REAL NOT NULL DEFAULT 0
+        )
+        """,
+    )
+
+    def enqueue(self, batch_id: str, shards: list[str], arguments: str, backend: str) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO shard_tasks (task_id, batch_id, shard, arguments, backend, status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                [(uuid.uuid4().hex, batch_id, shard, arguments, backend, now + i * 1e-6) for i, shard in enumerate(shards)]
+            )
+
+    def claim(self, worker_id: str, lease_seconds: float) -> dict | None:
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                """
+                UPDATE shard_tasks SET status = 'leased', worker_id = ?, attempts = attempts + 1, lease_expires = ?
+                WHERE task_id = (SELECT task_id FROM shard_tasks WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+                AND status = 'queued'
+                RETURNING task_id, batch_id, shard, arguments, backend, attempts
+                """,
+                (worker_id, now + lease_seconds)
+            ).fetchall()
+            conn.execute("UPDATE workers SET last_heartbeat = ? WHERE worker_id = ?", (now, worker_id))
+        return dict(rows[0]) if rows else None
+
+    def heartbeat(self, worker_id: str, task_id: str = None, lease_seconds: float = None) -> str | None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE workers SET last_heartbeat = ?, status = 'alive' WHERE worker_id = ?", (now, worker_id))
+            if task_id is None:
+                return None
+            conn.execute(
+                "UPDATE shard_tasks SET lease_expires = ? WHERE task_id = ? AND worker_id = ? AND status = 'leased'",
+                (now + lease_seconds, task_id, worker_id)
+            )
+            row = conn.execute("SELECT status, worker_id FROM shard_tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            # The coordinator gave up the batch
+            return "cancelled"
+        # A shard leased again to another worker is no longer this worker's
+        return row["status"] if row["worker_id"] == worker_id else "requeued"
+
+    def __finish(self, conn: sqlite3.Connection, task_id: str, worker_id: str, assignments: str, params: tuple) -> bool:
+        cursor = conn.execute(
+            f"UPDATE shard_tasks SET {assignments}, lease_expires = NULL WHERE task_id = ? AND worker_id = ? AND status = 'leased'",
+            (*params, task_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: str, worker_id: str, results: list[dict], elapsed_seconds: float) -> bool:
+        hosts = len({row["IP"] for row in results})
+        with self._transaction() as conn:
+            if not self.__finish(conn, task_id, worker_id, "status = 'completed', results = ?, elapsed_seconds = ?", (json.dumps(results), elapsed_seconds)):
+                return False
+            conn.execute(
+                """
+                UPDATE workers SET shards_completed = shards_completed + 1, hosts_scanned = hosts_scanned + ?,
+                busy_seconds = busy_seconds + ?, last_heartbeat = ? WHERE worker_id = ?
+                """,
+                (hosts, elapsed_seconds, time.time(), worker_id)
+            )
+        return True
+
+    def fail(self, task_id: str, worker_id: str, error: str) -> bool:
+        with self._transaction() as conn:
+            if not self.__finish(conn, task_id, worker_id, "status = 'failed', error = ?", (error,)):
+                return False
+            conn.execute("UPDATE workers SET shards_failed = shards_failed + 1 WHERE worker_id = ?", (worker_id,))
+        return True
+
+    def requeue_expired(self, max_attempts: int = 3) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                UPDATE shard_tasks SET status = 'failed', error = 'Lease expired ' || attempts || ' times.', lease_expires = NULL
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, max_attempts)
+            )
+            cursor = conn.execute(
+                "UPDATE shard_tasks SET status = 'queued', worker_id = NULL, lease_expires = NULL WHERE status = 'leased' AND lease_expires < ?",
+                (now,)
+            )
+        return cursor.rowcount
+
+    def cancel(self, batch_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE shard_tasks SET status = 'cancelled', lease_expires = NULL WHERE batch_id = ? AND status IN ('queued', 'leased')",
+                (batch_id,)
+            )
+
+    def batch_status(self, batch_id: str) -> list[dict]:
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT task_id, shard, status, worker_id, attempts, error, elapsed_seconds FROM shard_tasks WHERE batch_id = ? ORDER BY created_at",
+                (batch_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def take_results(self, task_id: str) -> list[dict]:
+        with self._reader() as conn:
+            row = conn.execute("SELECT results FROM shard_tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row["results"]) if row is not None and row["results"] is not None else []
+
+    def delete_batch(self, batch_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM shard_tasks WHERE batch_id = ?", (batch_id,))
+
+    def register_worker(self, worker_id: str, hostname: str, pid: int) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO workers (worker_id, hostname, pid, status, started_at, last_heartbeat) VALUES (?, ?, ?, 'alive', ?, ?)
+                ON CONFLICT (worker_id) DO UPDATE SET hostname = excluded.hostname, pid = excluded.pid, status = 'alive',
+                started_at = excluded.started_at, last_heartbeat = excluded.last_heartbeat
+                """,
+                (worker_id, hostname, pid, now, now)
+            )
+
+    def stop_worker(self, worker_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("UPDATE workers SET status = 'stopped', last_heartbeat = ? WHERE worker_id = ?", (time.time(), worker_id))
+            # Hand the shard of a worker stopped mid-scan straight to another worker
+            conn.execute(
+                "UPDATE shard_tasks SET status = 'queued', worker_id = NULL, lease_expires = NULL WHERE worker_id = ? AND status = 'leased'",
+                (worker_id,)
+            )
+
+    def worker_stats(self, lease_seconds: float) -> list[dict]:
+        """
+        Throughput of every worker that registered with the queue.
+
+        Workers are reported "dead" when they have not sent a heartbeat for `lease_seconds`.
+        """
+        now = time.time()
+        with self._reader() as conn:
+            rows = conn.execute("SELECT * FROM workers ORDER BY started_at").fetchall()
+            leased = dict(conn.execute(
+                "SELECT worker_id, COUNT(*) FROM shard_tasks WHERE status = 'leased' GROUP BY worker_id"
+            ).fetchall())
+        stats = []
+        for row in rows:
+            worker = dict(row)
+            idle_for = now - worker["last_heartbeat"]
+            if worker["status"] == "alive" and idle_for > lease_seconds:
+                worker["status"] = "dead"
+            busy = worker["busy_seconds"]
+            worker.update({
+                "leased_shards": leased.get(worker["worker_id"], 0),
+                "seconds_since_heartbeat": round(idle_for, 1),
+                "uptime_seconds": round(worker["last_heartbeat"] - worker["started_at"], 1),
+                "busy_seconds": round(busy, 3),
+                "shards_per_minute": round(worker["shards_completed"] * 60 / busy, 2) if busy else 0.0,
+                "hosts_per_minute": round(worker["hosts_scanned"] * 60 / busy, 2) if busy else 0.0
+            })
+            stats.append(worker)
+        return stats
@@ -0,0 +1,113 @@
+import os
+import socket
+import threading
+import time
+import uuid
+
+from nmap_automator.scanner import NmapScanner
+from .shard_queue import ShardQueue
+
+
+class ShardWorker:
+    """
+    Scans the shards of a ShardQueue, one at a time, until stopped.
+
+    While a shard is scanned, a heartbeat thread renews its lease every third of the lease
+    duration. The scan is abandoned (and nmap terminated) when the shard was cancelled or
+    leased to another worker in the meantime.
+    """
+
+    def __init__(
+        self,
+        queue: ShardQueue,
+        worker_id: str = None,
+        lease_seconds: float = 60,
+        poll_interval: float = 1.0
+    ) -> None:
+        """
+        :param queue: Queue to take shards from.
+        :param worker_id: Unique name of the worker (defaults to "<hostname>-<pid>-<random>").
+        :param lease_seconds: Time a shard stays leased without a heartbeat before it is queued again.
+        :param poll_interval: Seconds between two polls of an empty queue.
+        """
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.__stopping = threading.Event()
+        self.__scanner = None
+
+    def stop(self) -> None:
+        """Stop after the current shard (which is handed back to the queue if it is still running)."""
+        self.__stopping.set()
+        scanner = self.__scanner
+        if scanner is not None:
+            scanner.cancel()
+
+    def run(self, max_shards: int = None, exit_when_idle: bool = False) -> int:
+        """
+        Scan shards until stopped.
+
+        :param max_shards: Optional number of shards after which the worker stops.
+        :param exit_when_idle: Stop as soon as the queue is empty.
+        :return: Number of shards scanned.
+        """
+        self.queue.register_worker(self.worker_id, socket.gethostname(), os.getpid())
+        print(f"Worker {self.worker_id} started.")
+        scanned = 0
+        try:
+            while not self.__stopping.is_set() and (max_shards is None or scanned < max_shards):
+                task = self.queue.claim(self.worker_id, self.lease_seconds)
+                if task is None:
+                    if exit_when_idle:
+                        break
+                    self.__stopping.wait(self.poll_interval)
+                    self.queue.heartbeat(self.worker_id)
+                    continue
+                self.scan(task)
+                scanned += 1
+        finally:
+            self.queue.stop_worker(self.worker_id)
+            print(f"Worker {self.worker_id} stopped after {scanned} shards.")
+        return scanned
+
+    def scan(self, task: dict) -> None:
+        """Scan a claimed shard and report its results to the queue."""
+        task_id = task["task_id"]
+        scanner = NmapScanner(backend=task["backend"])
+        self.__scanner = scanner
+        done = threading.Event()
+        lost = threading.Event()
+
+        def keep_lease() -> None:
+            while not done.wait(self.lease_seconds / 3):
+                status = self.queue.heartbeat(self.worker_id, task_id, self.lease_seconds)
+                if status != "leased":
+                    print(f"Shard {task['shard']} is {status}, abandoning it.")
+                    lost.set()
+                    scanner.cancel()
+                    return
+
+        print(f"Worker {self.worker_id} scanning shard {task['shard']} (attempt {task['attempts']}).")
+        heartbeat = threading.Thread(target=keep_lease, daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            results = scanner.scan(target=task["shard"], arguments=task["arguments"])
+        except Exception as e:
+            self.queue.fail(task_id, self.worker_id, str(e))
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+            self.__scanner = None
+
+        if lost.is_set() or scanner.cancelled:
+            # Cancelled shards are final; shards of a stopping worker are queued again by stop_worker
+            return
+        if scanner.error is not None:
+            # The scanner reports a failed nmap run with no rows rather than raising
+            self.queue.fail(task_id, self.worker_id, f"nmap failed: {scanner.error}")
+            return
+        if not self.queue.complete(task_id, self.worker_id, results, round(time.perf_counter() - start, 3)):
+            print(f"Results of shard {task['shard']} discarded: its lease expired.")
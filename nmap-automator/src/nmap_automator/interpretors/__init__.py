@@ -3,4 +3,11 @@ from .base_interpretor import BaseInterpretor
 from .gpt_based_interpretor import GPTInterpretor
 from .gemini_based_interpretor import GeminiInterpretor
 from .ollama_interpretor import OllamaInterpretor
-from .interpretor_factory import InterpretorFactory
\ No newline at end of file
+from .ensemble_interpretor import EnsembleInterpretor, LatencyTracker
+from .interpretor_factory import InterpretorFactory
+from .prompt_serializer import PromptTooLargeError, estimate_tokens, serialize, serialize_compact, token_budget
+from .client_registry import ConnectionStats, InterpretorClients
+from .resilience import CallDeadlineExceeded, CircuitBreaker, CircuitOpenError, InterpretorResilience, ProviderGuard, TokenBucket
+from .async_runner import AsyncInterpretationRunner
+from .chunked_interpretation import ChunkedInterpretation
+from .rule_classifier import RuleClassifier, RuleClassifierStats
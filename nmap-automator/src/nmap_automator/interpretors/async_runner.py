@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable
+
+
+class AsyncInterpretationRunner:
+    """
+    Runs async interpretations (`BaseInterpretor.ainterpret*`) concurrently from synchronous code.
+
+    The coroutines run on one event loop shared by the whole process, in a background thread.
+    Flask workers and executor threads block on their own results only, and the async clients
+    of the providers keep their connections across calls. This would not happen with a new
+    event loop per call (asyncio.run).
+
+    `interpret_many` fans a batch of interpretations out with at most `concurrency` of them
+    waiting on a provider at a time.
+    """
+    __loop = None
+    __lock = threading.Lock()
+
+    def __init__(self, concurrency: int = 4) -> None:
+        """
+        :param concurrency: Number of interpretations of a batch in flight at once.
+        """
+        self.concurrency = max(1, concurrency)
+
+    @classmethod
+    def loop(cls) -> asyncio.AbstractEventLoop:
+        """The shared event loop, started on first use."""
+        with cls.__lock:
+            if cls.__loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+                cls.__loop = loop
+            return cls.__loop
+
+    def run(self, coroutine: Awaitable):
+        """Run a coroutine on the shared event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop()).result()
+
+    async def __limited(
+        self,
+        semaphore: asyncio.Semaphore,
+        index: int,
+        call: Callable[[], Awaitable[dict]],
+        on_done: Callable[[int, dict, float], None] | None
+    ) -> tuple[dict, float]:
+        async with semaphore:
+            start = time.perf_counter()
+            result = await call()
+            seconds = time.perf_counter() - start
+        if on_done is not None:
+            on_done(index, result, seconds)
+        return result, seconds
+
+    async def ainterpret_many(
+        self,
+        calls: list[Callable[[], Awaitable[dict]]],
+        on_done: Callable[[int, dict, float], None] = None
+    ) -> list[tuple[dict, float]]:
+        """
+        Await the interpretations started by `calls`, at most `concurrency` at a time.
+
+        :param calls: Callables starting one interpretation each, e.g. `lambda: interpretor.ainterpret(rows, save_dir)`.
+        :param on_done: Optional callback invoked with (index, result, seconds) as each call completes,
+            on the event loop: it must not block.
+        :return: (result, seconds spent waiting on it) of every call, in order.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self.__limited(semaphore, index, call, on_done) for index, call in enumerate(calls)))
+
+    def interpret_many(
+        self,
+        calls: list[Callable[[], Awaitable[dict]]],
+        on_done: Callable[[int, dict, float], None] = None
+    ) -> list[tuple[dict, float]]:
+        """Blocking `ainterpret_many`."""
+        return self.run(self.ainterpret_many(calls, on_done))
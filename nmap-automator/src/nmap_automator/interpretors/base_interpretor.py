@@ -1,9 +1,35 @@
 from abc import ABC, abstractmethod
 import io
+import itertools
 import os
 import json
+import time
+from typing import Callable, Iterator
+
+from nmap_automator.storage import InterpretationCache
+from .client_registry import ConnectionStats, InterpretorClients
+from .resilience import InterpretorResilience
+from .prompts import PROMPTS, CONFIDENCE_FIELD
+from .prompt_serializer import RESPONSE_TOKENS, PromptTooLargeError, estimate_tokens, serialize, token_budget
 
 class BaseInterpretor(ABC):
+    """
+    Interpretation of scan results by an LLM.
+
+    Backends only implement the call to their model, blocking (`_complete`) and async
+    (`_acomplete`), and optionally its streaming variant (`_stream`). Building the prompt,
+    parsing the answer, caching and saving the results are shared, so `interpret*`, their
+    async variants `ainterpret*` and their streaming variants `interpret*_stream` behave
+    the same.
+    """
+    # Interpretor type of the backend, as configured in InterpretorConfig
+    interpretor_type: str = None
+    # Names of the backend in error messages: of its answers, and of its API
+    response_name: str = "LLM"
+    api_name: str = None
+    # Whether restricted interpretations run at temperature 0
+    deterministic_restricted: bool = False
+
     def __init__(
         self,
         name: str,
@@ -15,28 +41,345 @@ class BaseInterpretor(ABC):
         self.model_flavor = model_flavor
         self.results = None
         self.is_configured = False
+        self.cache = None
+        self.bypass_cache = False
+        self.cache_deterministic_only = False
+        # How scan results are written in prompts: "compact" or "raw" (see prompt_serializer)
+        self.prompt_format = "compact"
+        # Also ask the model how confident it is, returned as "confidence" (see CONFIDENCE_FIELD)
+        self.ask_confidence = False
+        # Size of the last prompt: {"format", "chars", "estimated_tokens", "token_budget"}
+        self.last_prompt = None
+        # Cache outcome of the last interpretation: {"hit", ...}, or None without a cache
+        self.last_cache = None
+        # Timing of the last streamed interpretation: {"ttft_seconds", "total_seconds", "chunks", "chars"}
+        self.last_stream = None
+        # Registry sharing the provider clients between interpretors, None to build them per interpretor
+        self.clients = None
+        # Rate limits, retries, deadline and circuit breaker of the provider calls, None to call directly
+        self.resilience = None
 
     def save_results(self, results: dict, save_dir: str) -> None:
         # Save the results to a file
         with io.open(os.path.join(save_dir, f"{self.name}_results.json"), "w") as f:
             f.write(json.dumps(results, indent=4))
 
+    def build_prompt(self, prompt_key: str, scan_results) -> str:
+        """
+        Prompt `prompt_key` filled with the serialized scan results.
+
+        :raises PromptTooLargeError: When the prompt does not fit in the token budget of the model.
+        """
+        template = PROMPTS[prompt_key]
+        if self.ask_confidence:
+            template = template.replace("IT IS MISSION CRITICAL", CONFIDENCE_FIELD + "IT IS MISSION CRITICAL", 1)
+        prompt = template.format(scan_results=serialize(scan_results, self.prompt_format))
+        tokens = estimate_tokens(prompt)
+        budget = self.prompt_budget()
+        self.last_prompt = {
+            "format": self.prompt_format,
+            "chars": len(prompt),
+            "estimated_tokens": tokens,
+            "token_budget": budget
+        }
+        if tokens > budget:
+            raise PromptTooLargeError(tokens, budget, self.model_flavor)
+        return prompt
+
+    def prompt_budget(self) -> int:
+        """Tokens a prompt may use with the model of this interpretor (see token_budget)."""
+        return token_budget(self.model_flavor)
+
+    def use_clients(self, clients: InterpretorClients) -> None:
+        """Take the provider clients from `clients` instead of building new ones in `configure`."""
+        self.clients = clients
+
+    def _shared_clients(self, build: Callable[[ConnectionStats | None], object]):
+        """
+        Provider clients of this interpretor: those of the registry, or built by `build(None)` without one.
+
+        :param build: Builds the clients, counting their connections in the ConnectionStats given.
+        """
+        if self.clients is None:
+            return build(None)
+        return self.clients.get(self.interpretor_type, self.model_flavor, self.api_key, build)
+
+    def use_resilience(self, resilience: InterpretorResilience) -> None:
+        """Make the provider calls through the ProviderGuard of this interpretor's provider."""
+        self.resilience = resilience
+
+    def use_cache(self, cache: InterpretationCache, bypass: bool = False, deterministic_only: bool = False) -> None:
+        """
+        Serve identical interpretations from `cache`.
+
+        :param cache: Cache shared by the interpretors of the server.
+        :param bypass: Interpret again even on a cache hit (the new result replaces the cached one).
+        :param deterministic_only: Only cache the interpretations run with `deterministic=True`.
+        """
+        self.cache = cache
+        self.bypass_cache = bypass
+        self.cache_deterministic_only = deterministic_only
+
+    def __cache_prompt_key(self, prompt_key: str) -> str:
+        # The same results written differently, or asking for more fields, make a different prompt
+        return f"{prompt_key}/{self.prompt_format}" + ("/confidence" if self.ask_confidence else "")
+
+    def __cache_key(self, prompt_key: str, scan_results, deterministic: bool) -> str | None:
+        """Cache key of an interpretation, None when it is not to be cached."""
+        if self.cache is None or (self.cache_deterministic_only and not deterministic):
+            self.last_cache = None
+            return None
+        return self.cache.cache_key(self.interpretor_type, self.model_flavor, self.__cache_prompt_key(prompt_key), scan_results)
+
+    def __cached(self, key: str, save_dir: str) -> dict | None:
+        if self.bypass_cache:
+            self.cache.record_bypass()
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        self.last_cache = {"hit": True, "cached_at": cached["cached_at"], "age_seconds": cached["age_seconds"]}
+        self.save_results(cached["result"], save_dir)
+        return cached["result"]
+
+    def __store(self, key: str, prompt_key: str, result: dict) -> None:
+        self.last_cache = {"hit": False, "bypassed": self.bypass_cache}
+        if result.get("error") is None:
+            self.cache.put(key, self.interpretor_type, self.model_flavor, self.__cache_prompt_key(prompt_key), result)
+
+    def _interpret_cached(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
+        """
+        Run `_interpret` unless the same scan results were interpreted by the same model with the same prompt.
+
+        Only successful interpretations are cached. A cached result is still saved to `save_dir`.
+        """
+        key = self.__cache_key(prompt_key, scan_results, deterministic)
+        if key is None:
+            return self._interpret(scan_results, save_dir, prompt_key, deterministic)
+        cached = self.__cached(key, save_dir)
+        if cached is not None:
+            return cached
+        result = self._interpret(scan_results, save_dir, prompt_key, deterministic)
+        self.__store(key, prompt_key, result)
+        return result
+
+    async def _ainterpret_cached(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
+        """Async `_interpret_cached`."""
+        key = self.__cache_key(prompt_key, scan_results, deterministic)
+        if key is None:
+            return await self._ainterpret(scan_results, save_dir, prompt_key, deterministic)
+        cached = self.__cached(key, save_dir)
+        if cached is not None:
+            return cached
+        result = await self._ainterpret(scan_results, save_dir, prompt_key, deterministic)
+        self.__store(key, prompt_key, result)
+        return result
+
+    def _parse_output(self, output: str) -> dict:
+        """Interpretation fields of the JSON object in a model's answer."""
+        classifications = {
+            "error": None,
+            "result": None,
+            "analysis_description": None,
+            "next_arguments": None
+        }
+        # Attempt to extract JSON from response
+        json_start = output.find('{')  # Find the first '{' character
+        json_end = output.rfind('}')  # Find the last '}' character
+
+        if json_start != -1 and json_end != -1:
+            sanitized_output = output[json_start:json_end + 1]  # Extract JSON part
+            try:
+                parsed_output = json.loads(sanitized_output)  # Parse as JSON
+            except json.JSONDecodeError:
+                classifications["error"] = f"Failed to parse JSON response from {self.response_name}."
+                return classifications
+            classifications["result"] = parsed_output.get("classification", None)
+            classifications["analysis_description"] = parsed_output.get("analysis_description", None)
+            classifications["next_arguments"] = parsed_output.get("next_arguments", [])
+            if self.ask_confidence:
+                try:
+                    classifications["confidence"] = float(parsed_output["confidence"])
+                except (KeyError, TypeError, ValueError):
+                    classifications["confidence"] = None
+        else:
+            classifications["error"] = f"No valid JSON found in {self.response_name} response."
+        return classifications
+
+    def __failed(self, error: str) -> dict:
+        return {"error": error, "result": None, "analysis_description": None, "next_arguments": None}
+
+    def _complete_guarded(self, prompt: str, deterministic: bool = False) -> str:
+        """`_complete`, through the ProviderGuard of the provider when the interpretor has one."""
+        if self.resilience is None:
+            return self._complete(prompt, deterministic)
+        return self.resilience.guard(self.interpretor_type).call(
+            lambda timeout: self._complete(prompt, deterministic, timeout),
+            tokens=estimate_tokens(prompt) + RESPONSE_TOKENS
+        )
+
+    async def _acomplete_guarded(self, prompt: str, deterministic: bool = False) -> str:
+        """Async `_complete_guarded`."""
+        if self.resilience is None:
+            return await self._acomplete(prompt, deterministic)
+        return await self.resilience.guard(self.interpretor_type).acall(
+            lambda timeout: self._acomplete(prompt, deterministic, timeout),
+            tokens=estimate_tokens(prompt) + RESPONSE_TOKENS
+        )
+
+    def _interpret(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
+        if not self.is_configured:
+            classifications = self.__failed("Interpretor not configured.")
+        else:
+            try:
+                prompt = self.build_prompt(prompt_key, scan_results)
+                output = self._complete_guarded(prompt, deterministic)
+                classifications = self._parse_output(output.strip())
+            except PromptTooLargeError as e:
+                classifications = self.__failed(str(e))
+            except Exception as e:
+                classifications = self.__failed(f"Error with {self.api_name} API: {e}")
+
+        self.save_results(classifications, save_dir)
+        return classifications
+
+    async def _ainterpret(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
+        """Async `_interpret`, through the provider's async client."""
+        if not self.is_configured:
+            classifications = self.__failed("Interpretor not configured.")
+        else:
+            try:
+                prompt = self.build_prompt(prompt_key, scan_results)
+                output = await self._acomplete_guarded(prompt, deterministic)
+                classifications = self._parse_output(output.strip())
+            except PromptTooLargeError as e:
+                classifications = self.__failed(str(e))
+            except Exception as e:
+                classifications = self.__failed(f"Error with {self.api_name} API: {e}")
+
+        self.save_results(classifications, save_dir)
+        return classifications
+
+    def __open_stream(self, prompt: str, deterministic: bool, timeout: float = None) -> tuple[str, Iterator[str]]:
+        """Start streaming the answer to `prompt`: its first piece of text, and the rest of the stream."""
+        chunks = self._stream(prompt, deterministic, timeout)
+        try:
+            return next(chunks, ""), chunks
+        except BaseException:
+            chunks.close()
+            raise
+
+    def _interpret_stream(self, scan_results, save_dir: str, prompt_key: str, deterministic: bool = False) -> Iterator[dict]:
+        """
+        `_interpret_cached`, yielding the answer of the model as it is generated.
+
+        Yields {"event": "token", "text": ...} events with the pieces of the answer, then a
+        {"event": "result", "result": ...} event with the parsed interpretation, which is saved
+        (and cached) like that of `_interpret`. A cached interpretation is only yielded as the
+        result. Through the resilience layer, only opening the stream (up to its first piece)
+        is retried; an interpretation whose stream breaks afterwards is returned as an error.
+        Closing the generator closes the provider stream, and nothing is saved.
+        """
+        self.last_stream = None
+        key = self.__cache_key(prompt_key, scan_results, deterministic)
+        if key is not None:
+            cached = self.__cached(key, save_dir)
+            if cached is not None:
+                yield {"event": "result", "result": cached}
+                return
+
+        start = time.perf_counter()
+        ttft = None
+        pieces = []
+        if not self.is_configured:
+            classifications = self.__failed("Interpretor not configured.")
+        else:
+            chunks = None
+            try:
+                prompt = self.build_prompt(prompt_key, scan_results)
+                if self.resilience is None:
+                    first, chunks = self.__open_stream(prompt, deterministic)
+                else:
+                    first, chunks = self.resilience.guard(self.interpretor_type).call(
+                        lambda timeout: self.__open_stream(prompt, deterministic, timeout),
+                        tokens=self.last_prompt["estimated_tokens"] + RESPONSE_TOKENS
+                    )
+                for text in itertools.chain([first], chunks):
+                    if not text:
+                        continue
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    pieces.append(text)
+                    yield {"event": "token", "text": text}
+                classifications = self._parse_output("".join(pieces).strip())
+            except PromptTooLargeError as e:
+                classifications = self.__failed(str(e))
+            except Exception as e:
+                classifications = self.__failed(f"Error with {self.api_name} API: {e}")
+            finally:
+                if chunks is not None:
+                    chunks.close()
+
+        self.last_stream = {
+            "ttft_seconds": round(ttft, 3) if ttft is not None else None,
+            "total_seconds": round(time.perf_counter() - start, 3),
+            "chunks": len(pieces),
+            "chars": sum(len(text) for text in pieces)
+        }
+        self.save_results(classifications, save_dir)
+        if key is not None:
+            self.__store(key, prompt_key, classifications)
+        yield {"event": "result", "result": classifications}
+
+    def interpret(self, scan_results: str, save_dir: str) -> dict:
+        return self._interpret_cached(scan_results, save_dir, "default")
+
+    def interpret_restricted(self, scan_results: str, save_dir: str) -> dict:
+        return self._interpret_cached(scan_results, save_dir, "restricted", deterministic=self.deterministic_restricted)
+
+    def interpret_with_suggestions(self, scan_results: str, save_dir: str) -> dict:
+        return self._interpret_cached(scan_results, save_dir, "with_suggestions")
+
+    async def ainterpret(self, scan_results: str, save_dir: str) -> dict:
+        return await self._ainterpret_cached(scan_results, save_dir, "default")
+
+    async def ainterpret_restricted(self, scan_results: str, save_dir: str) -> dict:
+        return await self._ainterpret_cached(scan_results, save_dir, "restricted", deterministic=self.deterministic_restricted)
+
+    async def ainterpret_with_suggestions(self, scan_results: str, save_dir: str) -> dict:
+        return await self._ainterpret_cached(scan_results, save_dir, "with_suggestions")
+
+    def interpret_stream(self, scan_results: str, save_dir: str) -> Iterator[dict]:
+        return self._interpret_stream(scan_results, save_dir, "default")
+
+    def interpret_restricted_stream(self, scan_results: str, save_dir: str) -> Iterator[dict]:
+        return self._interpret_stream(scan_results, save_dir, "restricted", deterministic=self.deterministic_restricted)
+
+    def interpret_with_suggestions_stream(self, scan_results: str, save_dir: str) -> Iterator[dict]:
+        return self._interpret_stream(scan_results, save_dir, "with_suggestions")
+
     @abstractmethod
     def configure(self) -> None:
         self.is_configured = True
 
     @abstractmethod
-    def _interpret(self, scan_results: str, save_dir: str, prompt: str, deterministic: bool = False) -> dict:
-        pass
-    
-    @abstractmethod
-    def interpret(self, scan_results: str, save_dir: str) -> dict:
+    def _complete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        """
+        Send `prompt` to the model and return its answer (blocking).
+
+        :param timeout: Seconds the call may take, when the client supports a per-call timeout.
+        """
         pass
 
     @abstractmethod
-    def interpret_restricted(self, scan_results: str, save_dir: str) -> dict:
+    async def _acomplete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        """Send `prompt` to the model with the provider's async client and return its answer."""
         pass
 
-    @abstractmethod
-    def interpret_with_suggestions(self, scan_results: str, save_dir: str) -> dict:
-        pass
\ No newline at end of file
+    def _stream(self, prompt: str, deterministic: bool = False, timeout: float = None) -> Iterator[str]:
+        """
+        Send `prompt` to the model and yield its answer in pieces, as they are generated.
+
+        Backends without a streaming mode yield the whole answer of `_complete` at once.
+        """
+        yield self._complete(prompt, deterministic, timeout)
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+from typing import Callable
+
+from .async_runner import AsyncInterpretationRunner
+from .base_interpretor import BaseInterpretor
+from .prompts import PROMPTS
+from .prompt_serializer import estimate_tokens, serialize
+
+# Public interpretation method, its async variant and the prompt of each interpret_runner mode
+RUNNER_MODES = {
+    "normal": ("interpret", "ainterpret", "default"),
+    "restricted": ("interpret_restricted", "ainterpret_restricted", "restricted"),
+    "suggest": ("interpret_with_suggestions", "ainterpret_with_suggestions", "with_suggestions"),
+}
+# When chunks disagree, the whole scan gets the first of these classifications found
+CLASSIFICATION_PRECEDENCE = ("Incomplete", "False Positive Rich", "Completed")
+
+
+class ChunkedInterpretation:
+    """
+    Map-reduce interpretation of scans too large for a single prompt.
+
+    The result rows are split by host into chunks whose prompt fits in `chunk_tokens`.
+    Every chunk is interpreted on its own (map) by a fresh interpretor of the same backend,
+    and in the same interpret_runner mode. The chunks go through the providers' async
+    clients, up to `concurrency` at a time (see AsyncInterpretationRunner). The chunk
+    interpretations are then combined (reduce) either:
+    - "merge": deterministically. The most severe classification wins, the descriptions are
+      concatenated, and the next arguments are the union of those of the chunks;
+    - "llm": by one more call to the model with the chunk interpretations, falling back to
+      the deterministic merge if that call fails.
+
+    The combined result has the same fields as a single interpretation and is saved to
+    the scan directory; every chunk's own result is saved under `chunks/<n>/`.
+    """
+
+    def __init__(
+        self,
+        interpretor_factory: Callable[[], BaseInterpretor],
+        interpret_runner: str,
+        chunk_tokens: int = None,
+        concurrency: int = 4,
+        reduce: str = "merge"
+    ) -> None:
+        """
+        :param interpretor_factory: Callable returning a configured interpretor; called once per chunk.
+        :param interpret_runner: "normal", "restricted" or "suggest".
+        :param chunk_tokens: Token budget of a chunk prompt (defaults to the model's budget).
+        :param concurrency: Number of chunks interpreted at the same time.
+        :param reduce: "merge" or "llm".
+        """
+        if interpret_runner not in RUNNER_MODES:
+            raise ValueError(f"Invalid interpret_runner: {interpret_runner}")
+        if reduce not in ("merge", "llm"):
+            raise ValueError(f"Unsupported reduce: {reduce}")
+        self.interpretor_factory = interpretor_factory
+        self.interpret_runner = interpret_runner
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = max(1, concurrency)
+        self.reduce = reduce
+        # Summary of the last run: chunks, their hosts, timing and the reduce used
+        self.stats = None
+
+    @property
+    def prompt_key(self) -> str:
+        return RUNNER_MODES[self.interpret_runner][2]
+
+    def budget(self, interpretor: BaseInterpretor) -> int:
+        return self.chunk_tokens or interpretor.prompt_budget()
+
+    def prompt_tokens(self, interpretor: BaseInterpretor, scan_results) -> int:
+        """Estimated tokens of the single prompt of `scan_results`."""
+        prompt = PROMPTS[self.prompt_key].format(scan_results=serialize(scan_results, interpretor.prompt_format))
+        return estimate_tokens(prompt)
+
+    def needs_chunks(self, interpretor: BaseInterpretor, scan_results) -> bool:
+        """Whether the single prompt of `scan_results` exceeds the chunk budget."""
+        return not isinstance(scan_results, str) and self.prompt_tokens(interpretor, scan_results) > self.budget(interpretor)
+
+    def split(self, interpretor: BaseInterpretor, scan_results: list[dict]) -> list[list[dict]]:
+        """
+        Split the rows by host into chunks whose prompt fits in the budget.
+
+        Hosts are packed in order; a single host larger than the budget gets a chunk of its own.
+        """
+        hosts = {}
+        for row in scan_results:
+            hosts.setdefault(row.get("IP"), []).append(row)
+        overhead = estimate_tokens(PROMPTS[self.prompt_key].format(scan_results=""))
+        budget = self.budget(interpretor) - overhead
+
+        chunks, chunk, used = [], [], 0
+        for rows in hosts.values():
+            tokens = estimate_tokens(serialize(rows, interpretor.prompt_format)) + 1
+            if chunk and used + tokens > budget:
+                chunks.append(chunk)
+                chunk, used = [], 0
+            chunk.extend(rows)
+            used += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def __chunk_call(self, interpretor: BaseInterpretor, rows: list[dict], chunk_dir: str):
+        os.makedirs(chunk_dir, exist_ok=True)
+        method = getattr(interpretor, RUNNER_MODES[self.interpret_runner][1])
+        return lambda: method(rows, chunk_dir)
+
+    @staticmethod
+    def merge(chunk_results: list[dict]) -> dict:
+        """Deterministic reduce of the chunk interpretations."""
+        results = [chunk["result"] for chunk in chunk_results]
+        succeeded = [result for result in results if result.get("error") is None]
+        failed = [chunk["chunk"] for chunk in chunk_results if chunk["result"].get("error") is not None]
+        merged = {"error": None, "result": None, "analysis_description": None, "next_arguments": None}
+        if not succeeded:
+            merged["error"] = "Every chunk failed: " + "; ".join(str(result["error"]) for result in results)
+            return merged
+        if failed:
+            merged["error"] = f"Chunks {failed} failed; the result only covers the others."
+
+        classifications = [result.get("result") for result in succeeded]
+        merged["result"] = next(
+            (classification for classification in CLASSIFICATION_PRECEDENCE if classification in classifications),
+            classifications[0]
+        )
+        descriptions = [
+            f"[chunk {chunk['chunk']}, {chunk['hosts']} hosts: {chunk['result'].get('result')}] {chunk['result']['analysis_description']}"
+            for chunk in chunk_results
+            if chunk["result"].get("error") is None and chunk["result"].get("analysis_description")
+        ]
+        if descriptions:
+            merged["analysis_description"] = "\n".join(descriptions)
+        if any(result.get("next_arguments") for result in succeeded):
+            arguments = {}
+            for result in succeeded:
+                for argument in result.get("next_arguments") or []:
+                    arguments[json.dumps(argument) if not isinstance(argument, str) else argument] = argument
+            merged["next_arguments"] = list(arguments.values())
+        return merged
+
+    def __reduce_with_llm(self, chunk_results: list[dict], save_dir: str) -> dict:
+        summaries = [
+            {
+                "chunk": chunk["chunk"],
+                "hosts": chunk["hosts"],
+                "classification": chunk["result"].get("result"),
+                "analysis_description": chunk["result"].get("analysis_description"),
+                "next_arguments": chunk["result"].get("next_arguments")
+            }
+            for chunk in chunk_results
+            if chunk["result"].get("error") is None
+        ]
+        interpretor = self.interpretor_factory()
+        return interpretor._interpret_cached(
+            "\n".join(json.dumps(summary) for summary in summaries),
+            save_dir,
+            f"reduce_{self.prompt_key}"
+        )
+
+    def run(self, scan_results: list[dict], save_dir: str, on_chunk: Callable[[dict], None] = None) -> dict:
+        """
+        Interpret the rows chunk by chunk and return the combined interpretation.
+
+        :param on_chunk: Optional callback invoked as each chunk is interpreted, with
+            {"chunk", "chunks", "hosts", "rows", "elapsed_seconds", "classification", "error"}.
+            It runs on the event loop of the interpretations and must not block.
+        """
+        start = time.perf_counter()
+        first = self.interpretor_factory()
+        chunks = self.split(first, scan_results)
+        print(f"Interpreting {len(scan_results)} rows as {len(chunks)} chunks, {self.concurrency} at a time")
+        interpretors = [self.interpretor_factory() for _ in chunks]
+        calls = [
+            self.__chunk_call(interpretor, rows, os.path.join(save_dir, "chunks", f"{index:03d}"))
+            for index, (interpretor, rows) in enumerate(zip(interpretors, chunks))
+        ]
+
+        def chunk_done(index: int, result: dict, seconds: float) -> None:
+            on_chunk({
+                "chunk": index,
+                "chunks": len(chunks),
+                "hosts": len({row.get("IP") for row in chunks[index]}),
+                "rows": len(chunks[index]),
+                "elapsed_seconds": round(seconds, 3),
+                "classification": result.get("result"),
+                "error": result.get("error")
+            })
+
+        outcomes = AsyncInterpretationRunner(self.concurrency).interpret_many(calls, chunk_done if on_chunk is not None else None)
+        chunk_results = [
+            {
+                "chunk": index,
+                "hosts": len({row.get("IP") for row in rows}),
+                "rows": len(rows),
+                "elapsed_seconds": round(seconds, 3),
+                "cache": interpretor.last_cache,
+                "ensemble": getattr(interpretor, "last_ensemble", None),
+                "result": result
+            }
+            for index, (rows, interpretor, (result, seconds)) in enumerate(zip(chunks, interpretors, outcomes))
+        ]
+        map_seconds = time.perf_counter() - start
+
+        reduce = self.reduce
+        merged = self.merge(chunk_results)
+        if reduce == "llm" and merged["result"] is not None:
+            reduced = self.__reduce_with_llm(chunk_results, save_dir)
+            if reduced.get("error") is None:
+                merged = {**reduced, "error": merged["error"]}
+            else:
+                print(f"Reduce call failed ({reduced['error']}), merging the chunks instead")
+                reduce = "merge"
+        first.save_results(merged, save_dir)
+
+        self.stats = {
+            "chunks": len(chunks),
+            "concurrency": self.concurrency,
+            "reduce": reduce,
+            "map_seconds": round(map_seconds, 3),
+            "total_seconds": round(time.perf_counter() - start, 3),
+            "per_chunk": [{key: value for key, value in chunk.items() if key != "result"} | {"error": chunk["result"].get("error")} for chunk in chunk_results]
+        }
+        return merged
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from typing import Callable
+
+
+class ConnectionStats:
+    """
+    Requests and new connections of httpx clients.
+
+    New TCP connections and TLS handshakes are counted through httpcore's `trace` request
+    extension, which the request hooks of `hooks()` / `async_hooks()` set on every request.
+    A request without a new connection reused a kept-alive one from the client's pool; only
+    the reuses of https connections avoided a TLS handshake (Ollama is usually plain http).
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__counters = {"requests": 0, "tls_requests": 0, "connections_opened": 0, "tls_handshakes": 0}
+
+    def __count(self, counter: str) -> None:
+        with self.__lock:
+            self.__counters[counter] += 1
+
+    def __trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.started":
+            self.__count("connections_opened")
+        elif event_name == "connection.start_tls.started":
+            self.__count("tls_handshakes")
+
+    async def __atrace(self, event_name: str, info: dict) -> None:
+        self.__trace(event_name, info)
+
+    def __count_request(self, request) -> None:
+        self.__count("requests")
+        if request.url.scheme == "https":
+            self.__count("tls_requests")
+
+    def __on_request(self, request) -> None:
+        self.__count_request(request)
+        request.extensions["trace"] = self.__trace
+
+    async def __aon_request(self, request) -> None:
+        self.__count_request(request)
+        request.extensions["trace"] = self.__atrace
+
+    def hooks(self) -> dict:
+        """Keyword arguments of an httpx.Client counting its connections here."""
+        return {"event_hooks": {"request": [self.__on_request]}}
+
+    def async_hooks(self) -> dict:
+        """Keyword arguments of an httpx.AsyncClient counting its connections here."""
+        return {"event_hooks": {"request": [self.__aon_request]}}
+
+    def stats(self) -> dict:
+        with self.__lock:
+            counters = dict(self.__counters)
+        reused = max(0, counters["requests"] - counters["connections_opened"])
+        handshakes_avoided = max(0, counters["tls_requests"] - counters["tls_handshakes"])
+        return {**counters, "connections_reused": reused, "handshakes_avoided": handshakes_avoided}
+
+
+class InterpretorClients:
+    """
+    Process-wide registry of the provider clients of the interpretors.
+
+    Interpretors are created per request, but their clients are built once per
+    (interpretor type, model flavor, API key) and shared, so the HTTP connection pools
+    and TLS sessions they hold survive between requests. The clients of the supported
+    providers are thread-safe; the registry itself may be used from any thread.
+
+    Keys are only kept as a digest. When an interpretor asks for a key that differs from
+    the one registered for its type and flavor (the key was changed), or on `reload`, the
+    clients of the previous key are dropped. Interpretations still using them finish normally.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        self.__counters = {"created": 0, "reused": 0, "dropped": 0, "reloads": 0}
+
+    @staticmethod
+    def key_digest(api_key: str | None) -> str:
+        return hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+
+    def get(self, interpretor_type: str, model_flavor: str, api_key: str | None, build: Callable[[ConnectionStats], object]):
+        """
+        The clients registered for (interpretor_type, model_flavor, api_key), built on first use.
+
+        :param build: Called with the ConnectionStats of the new entry to build its clients.
+        """
+        digest = self.key_digest(api_key)
+        key = (interpretor_type, model_flavor, digest)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                entry["uses"] += 1
+                self.__counters["reused"] += 1
+                return entry["clients"]
+
+            self.__drop(lambda other: other[:2] == key[:2])
+            stats = ConnectionStats()
+            entry = {"clients": build(stats), "stats": stats, "uses": 1, "created_at": time.time()}
+            self.__entries[key] = entry
+            self.__counters["created"] += 1
+            return entry["clients"]
+
+    def __drop(self, predicate: Callable[[tuple], bool]) -> int:
+        stale = [key for key in self.__entries if predicate(key)]
+        for key in stale:
+            del self.__entries[key]
+        self.__counters["dropped"] += len(stale)
+        return len(stale)
+
+    def reload(self, api_keys: dict[str, str | None]) -> int:
+        """
+        Drop the clients of keys that are no longer current.
+
+        :param api_keys: Current API key of each interpretor type (types left out are kept).
+        :return: Number of client entries dropped; they are rebuilt with the new keys on next use.
+        """
+        digests = {interpretor_type: self.key_digest(api_key) for interpretor_type, api_key in api_keys.items()}
+        with self.__lock:
+            self.__counters["reloads"] += 1
+            return self.__drop(lambda key: key[0] in digests and key[2] != digests[key[0]])
+
+    def stats(self) -> dict:
+        with self.__lock:
+            counters = dict(self.__counters)
+            entries = [
+                {
+                    "interpretor_type": interpretor_type,
+                    "model_flavor": model_flavor,
+                    "key": digest,
+                    "uses": entry["uses"],
+                    "age_seconds": round(time.time() - entry["created_at"], 1),
+                    **entry["stats"].stats()
+                }
+                for (interpretor_type, model_flavor, digest), entry in self.__entries.items()
+            ]
+        totals = {
+            counter: sum(entry[counter] for entry in entries)
+            for counter in ("requests", "tls_requests", "connections_opened", "connections_reused", "tls_handshakes", "handshakes_avoided")
+        }
+        return {**counters, "clients": len(entries), **totals, "per_client": entries}
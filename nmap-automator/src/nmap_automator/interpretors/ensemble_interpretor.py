@@ -0,0 +1,298 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from .async_runner import AsyncInterpretationRunner
+from .base_interpretor import BaseInterpretor
+from .prompt_serializer import token_budget
+
+# Classifications a member may answer for its interpretation to be valid
+VALID_CLASSIFICATIONS = ("Completed", "Incomplete", "False Positive Rich")
+
+
+class LatencyTracker:
+    """Recent interpretation latencies of each model, shared by the interpretations of the server."""
+
+    def __init__(self, window: int = 100, min_samples: int = 5) -> None:
+        """
+        :param window: Latencies kept per model.
+        :param min_samples: Latencies needed before a percentile is reported.
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.__samples = {}
+        self.__lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self.__lock:
+            self.__samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model: str, percent: float) -> float | None:
+        """Nearest-rank percentile of the recent latencies of `model`, None without enough samples."""
+        with self.__lock:
+            samples = sorted(self.__samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(percent / 100 * len(samples)) - 1)]
+
+    def stats(self) -> dict:
+        with self.__lock:
+            models = list(self.__samples)
+        stats = {}
+        for model in models:
+            p50, p95 = self.percentile(model, 50), self.percentile(model, 95)
+            stats[model] = {
+                "samples": len(self.__samples[model]),
+                "p50_seconds": round(p50, 3) if p50 is not None else None,
+                "p95_seconds": round(p95, 3) if p95 is not None else None
+            }
+        return stats
+
+
+class EnsembleInterpretor(BaseInterpretor):
+    """
+    Interpretation by several interpretors (members), with one of two policies (the model flavor).
+
+    - "hedge": the first member is asked; when it has not answered after the hedge delay, the
+      next member is asked too, and so on. The first valid interpretation wins and the other
+      calls are cancelled. The delay is `hedge_delay` when set, else the 95th percentile of the
+      first member's recent latencies (DEFAULT_HEDGE_DELAY until enough are known).
+    - "cascade": the members are asked one after the other, cheapest first. The interpretation
+      of a member is kept unless it is invalid or its confidence is under `min_confidence`, in
+      which case the next member is asked. When no member is confident enough, the last valid
+      interpretation is kept.
+
+    An interpretation is valid when it has no error and one of the expected classifications.
+    Members save their results under `ensemble/<n>/`; the interpretation kept is saved to the
+    scan directory. `last_ensemble` reports which member answered and the latency of every call;
+    `on_attempt`, when set, is called with every call as it starts and as it ends.
+    """
+    interpretor_type = "ensemble"
+    api_name = "ensemble"
+    # Members whose backend supports it answer restricted prompts at temperature 0
+    deterministic_restricted = True
+    # Hedge delay, in seconds, while the first member's latencies are unknown
+    DEFAULT_HEDGE_DELAY = 10.0
+    HEDGE_PERCENTILE = 95
+
+    def __init__(
+        self,
+        name: str,
+        model_flavor: str = "hedge",
+        api_key: str = None
+    ):
+        if model_flavor not in ("hedge", "cascade"):
+            raise ValueError(f"Unsupported ensemble policy: {model_flavor}")
+        super().__init__(name, model_flavor, api_key)
+        # (interpretor type, model flavor, factory returning a configured interpretor) of every member
+        self.members = []
+        self.latencies = LatencyTracker()
+        self.hedge_delay = None
+        self.min_confidence = 0.7
+        # The cascade policy needs the confidence of every answer
+        self.ask_confidence = model_flavor == "cascade"
+        # Report of the last interpretation: policy, member that answered and every call made
+        self.last_ensemble = None
+        # Optional callback invoked with a copy of a call's report as it starts and ends (on the event loop)
+        self.on_attempt = None
+
+    def use_members(self, members: list[tuple[str, str, Callable[[], BaseInterpretor]]]) -> None:
+        self.members = members
+
+    def use_latencies(self, latencies: LatencyTracker) -> None:
+        self.latencies = latencies
+
+    def configure(self) -> None:
+        if len(self.members) < 2:
+            raise ValueError("An ensemble needs at least two members.")
+        super().configure()
+
+    def prompt_budget(self) -> int:
+        """The smallest budget of the members: a prompt may be sent to any of them."""
+        return min(token_budget(model_flavor) for _, model_flavor, _ in self.members)
+
+    def _complete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        return AsyncInterpretationRunner().run(self._acomplete(prompt, deterministic, timeout))
+
+    async def _acomplete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        """
+        Answer of the member kept by the policy, for a prompt built by the ensemble.
+
+        The members are called through their own ProviderGuard (`timeout` is not used) and are
+        not cached. An answer is judged by parsing it like the member would.
+
+        :raises RuntimeError: When no member gave a valid answer to keep.
+        """
+        outputs = {}
+
+        async def ask(index: int, interpretor: BaseInterpretor, member_dir: str) -> dict:
+            output = outputs[index] = await interpretor._acomplete_guarded(
+                prompt, deterministic and interpretor.deterministic_restricted
+            )
+            return interpretor._parse_output(output.strip())
+
+        index, result, _ = await self.__run(ask, None)
+        if index not in outputs:
+            raise RuntimeError(result.get("error") or "No ensemble member answered.")
+        return outputs[index]
+
+    @staticmethod
+    def is_valid(result: dict) -> bool:
+        return result.get("error") is None and result.get("result") in VALID_CLASSIFICATIONS
+
+    def current_hedge_delay(self) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        interpretor_type, model_flavor, _ = self.members[0]
+        p95 = self.latencies.percentile(f"{interpretor_type}/{model_flavor}", self.HEDGE_PERCENTILE)
+        return p95 if p95 is not None else self.DEFAULT_HEDGE_DELAY
+
+    async def __ask(self, index: int, ask: Callable, save_dir: str | None, attempt: dict) -> tuple[dict, BaseInterpretor]:
+        """
+        Interpretation of member `index` by `ask(index, interpretor, member_dir)`, its call being reported in `attempt`.
+
+        :param save_dir: Directory the members save their results under, None for no results saved.
+        """
+        interpretor_type, model_flavor, factory = self.members[index]
+        member_dir = None
+        if save_dir is not None:
+            member_dir = os.path.join(save_dir, "ensemble", str(index))
+            os.makedirs(member_dir, exist_ok=True)
+        start = time.perf_counter()
+        try:
+            interpretor = factory()
+            interpretor.ask_confidence = self.ask_confidence
+            result = await ask(index, interpretor, member_dir)
+        except asyncio.CancelledError:
+            attempt.update(status="cancelled", latency_seconds=round(time.perf_counter() - start, 3))
+            self.__report(attempt)
+            raise
+        except Exception as e:
+            interpretor = None
+            result = {"error": f"Error with {interpretor_type} member: {e}", "result": None, "analysis_description": None, "next_arguments": None}
+
+        seconds = time.perf_counter() - start
+        valid = self.is_valid(result)
+        attempt.update(
+            status="valid" if valid else "invalid",
+            latency_seconds=round(seconds, 3),
+            classification=result.get("result"),
+            confidence=result.get("confidence"),
+            error=result.get("error"),
+            cache_hit=bool(interpretor is not None and (interpretor.last_cache or {}).get("hit"))
+        )
+        if valid and not attempt["cache_hit"]:
+            self.latencies.record(f"{interpretor_type}/{model_flavor}", seconds)
+        self.__report(attempt)
+        return result, interpretor
+
+    def __report(self, attempt: dict) -> None:
+        if self.on_attempt is not None:
+            self.on_attempt(dict(attempt))
+
+    def __attempt(self, index: int, start: float) -> dict:
+        interpretor_type, model_flavor, _ = self.members[index]
+        return {
+            "member": index,
+            "interpretor_type": interpretor_type,
+            "model_flavor": model_flavor,
+            "started_after_seconds": round(time.perf_counter() - start, 3),
+            "status": "running"
+        }
+
+    async def __hedge(self, ask: Callable, save_dir: str | None, start: float, report: dict):
+        delay = report["hedge_delay_seconds"] = round(self.current_hedge_delay(), 3)
+        tasks = {}
+
+        def launch(index: int) -> None:
+            attempt = self.__attempt(index, start)
+            report["attempts"].append(attempt)
+            self.__report(attempt)
+            tasks[asyncio.ensure_future(self.__ask(index, ask, save_dir, attempt))] = index
+
+        launch(0)
+        launched = 1
+        fallback = None
+        while tasks:
+            done, _ = await asyncio.wait(
+                tasks, timeout=delay if launched < len(self.members) else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                # Nothing yet from the members asked so far: hedge with the next one
+                launch(launched)
+                launched += 1
+                continue
+            for task in done:
+                index = tasks.pop(task)
+                result, interpretor = task.result()
+                if self.is_valid(result):
+                    for pending in tasks:
+                        pending.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    return index, result, interpretor
+                fallback = fallback or (index, result, interpretor)
+            if launched < len(self.members):
+                # An invalid answer: ask the next member right away
+                launch(launched)
+                launched += 1
+        return fallback
+
+    async def __cascade(self, ask: Callable, save_dir: str | None, start: float, report: dict):
+        kept = None
+        for index in range(len(self.members)):
+            attempt = self.__attempt(index, start)
+            report["attempts"].append(attempt)
+            self.__report(attempt)
+            result, interpretor = await self.__ask(index, ask, save_dir, attempt)
+            if self.is_valid(result):
+                kept = (index, result, interpretor)
+                confidence = result.get("confidence")
+                # A member not saying how confident it is is trusted
+                if confidence is None or confidence >= self.min_confidence:
+                    return kept
+            if index < len(self.members) - 1:
+                attempt["status"] = "escalated"
+                report["escalations"] += 1
+        return kept or (index, result, interpretor)
+
+    async def __run(self, ask: Callable, save_dir: str | None) -> tuple[int, dict, BaseInterpretor | None]:
+        """Run the policy with `ask`, reporting it in `last_ensemble`; (member kept, its result, its interpretor)."""
+        start = time.perf_counter()
+        report = {"policy": self.model_flavor, "attempts": []}
+        if self.model_flavor == "hedge":
+            index, result, interpretor = await self.__hedge(ask, save_dir, start, report)
+        else:
+            report["escalations"] = 0
+            report["min_confidence"] = self.min_confidence
+            index, result, interpretor = await self.__cascade(ask, save_dir, start, report)
+
+        interpretor_type, model_flavor, _ = self.members[index]
+        report["answered_by"] = {"member": index, "interpretor_type": interpretor_type, "model_flavor": model_flavor}
+        report["latency_seconds"] = round(time.perf_counter() - start, 3)
+        self.last_ensemble = report
+        return index, result, interpretor
+
+    def _interpret_cached(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
+        """Interpret through the members (the ensemble itself is not cached, its members are)."""
+        return AsyncInterpretationRunner().run(self._ainterpret_cached(scan_results, save_dir, prompt_key, deterministic))
+
+    async def _ainterpret_cached(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
+        if not self.is_configured:
+            result = {"error": "Interpretor not configured.", "result": None, "analysis_description": None, "next_arguments": None}
+            self.save_results(result, save_dir)
+            return result
+
+        async def ask(index: int, interpretor: BaseInterpretor, member_dir: str) -> dict:
+            # Restricted interpretations are deterministic on the backends supporting it
+            member_deterministic = prompt_key == "restricted" and interpretor.deterministic_restricted
+            return await interpretor._ainterpret_cached(scan_results, member_dir, prompt_key, member_deterministic)
+
+        _, result, interpretor = await self.__run(ask, save_dir)
+        self.last_cache = interpretor.last_cache if interpretor is not None else None
+        self.last_prompt = interpretor.last_prompt if interpretor is not None else None
+        self.save_results(result, save_dir)
+        return result
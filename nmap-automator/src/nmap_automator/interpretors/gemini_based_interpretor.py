@@ -1,18 +1,21 @@
+from typing import Iterator
+
 from .base_interpretor import BaseInterpretor
-from .prompts import PROMPTS
 
 import google.generativeai as genai
-import json
 
 
 class GeminiInterpretor(BaseInterpretor):
+    interpretor_type = "gemini"
+    response_name = "Gemini"
+    api_name = "Gemini"
+
     def __init__(
         self,
         name: str,
         model_flavor: str = "models/gemini-1.5-pro",
         api_key: str = None
     ):
-        self.__client = None
         self.__model = None
         self.__safety_settings = [
             {
@@ -39,51 +42,31 @@ class GeminiInterpretor(BaseInterpretor):
         super().__init__(name, model_flavor, api_key)
 
     def configure(self) -> None:
-        self.__client = genai.configure(api_key=self.api_key)
-        self.__model = genai.GenerativeModel(self.model_flavor)
+        self.__model = self._shared_clients(self.__build_model)
         super().configure()
 
-    def _interpret(self, scan_results: str, save_dir: str, prompt_key: str) -> dict:
-        classifications = {
-            "error": None,
-            "result": None,
-            "analysis_description": None,
-            "next_arguments": None
-        }
-
-        if not self.is_configured:
-            classifications["error"] = "Interpretor not configured."
-        else:
-            try:
-                prompt = PROMPTS[prompt_key].format(scan_results=scan_results)
-                response = self.__model.generate_content([prompt], safety_settings=self.__safety_settings)
-                output = response.text.strip()
-
-                # Attempt to parse JSON response
-                json_start = output.find('{')  # Find the first '{' character
-                json_end = output.rfind('}')  # Find the last '}' character
-
-                if json_start != -1 and json_end != -1:
-                    sanitized_output = output[json_start:json_end + 1]  # Extract JSON part
-                    parsed_output = json.loads(sanitized_output)
-                    classifications["result"] = parsed_output.get("classification", None)
-                    classifications["analysis_description"] = parsed_output.get("analysis_description", None)
-                    classifications["next_arguments"] = parsed_output.get("next_arguments", [])
-                else:
-                    classifications["error"] = "No valid JSON found in Gemini response."
-            except json.JSONDecodeError:
-                classifications["error"] = "Failed to parse JSON response from Gemini."
-            except Exception as e:
-                classifications["error"] = f"Error with Gemini API: {e}"
-
-        self.save_results(classifications, save_dir)
-        return classifications
+    def __build_model(self, stats) -> genai.GenerativeModel:
+        # The gRPC channels of genai are process-wide and rebuilt by every genai.configure,
+        # so it is only called when the model is built. Their connections are not counted.
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(self.model_flavor)
 
-    def interpret(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "default")
+    def _complete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        response = self.__model.generate_content(
+            [prompt], safety_settings=self.__safety_settings, request_options={"timeout": timeout} if timeout else None
+        )
+        return response.text
 
-    def interpret_restricted(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "restricted")
+    async def _acomplete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        response = await self.__model.generate_content_async(
+            [prompt], safety_settings=self.__safety_settings, request_options={"timeout": timeout} if timeout else None
+        )
+        return response.text
 
-    def interpret_with_suggestions(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "with_suggestions")
+    def _stream(self, prompt: str, deterministic: bool = False, timeout: float = None) -> Iterator[str]:
+        response = self.__model.generate_content(
+            [prompt], safety_settings=self.__safety_settings, stream=True,
+            request_options={"timeout": timeout} if timeout else None
+        )
+        for chunk in response:
+            yield chunk.text
@@ -1,11 +1,16 @@
+from typing import Iterator
+
 from .base_interpretor import BaseInterpretor
-from .prompts import PROMPTS
 
-import json
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
 
 
 class GPTInterpretor(BaseInterpretor):
+    interpretor_type = "gpt"
+    response_name = "LLM"
+    api_name = "OpenAI"
+    deterministic_restricted = True
+
     def __init__(
         self,
         name: str,
@@ -13,75 +18,65 @@ class GPTInterpretor(BaseInterpretor):
         api_key: str=None
     ):
         self.__client = None
+        self.__async_client = None
         super().__init__(name, model_flavor, api_key)
 
     
     def configure(self):
-        self.__client = OpenAI(api_key=self.api_key)
+        self.__client, self.__async_client = self._shared_clients(self.__build_clients)
         super().configure()
 
-    def _interpret(self, scan_results: str, save_dir: str, prompt_key: str, deterministic: bool = False) -> dict:
-        classifications = {
-            "error": None,
-            "result": None,
-            "analysis_description": None,
-            "next_arguments": None
-        }
-
-        if not self.is_configured:
-            classifications["error"] = "Interpretor not configured."
-        else:
-            try:
-                prompt = PROMPTS[prompt_key].format(scan_results=scan_results)
-                messages = [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a system that classifies scan results as 'Completed', "
-                            "'Incomplete', or 'False Positive Rich', optionally providing additional "
-                            "recommendations based on your analysis."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+    def __build_clients(self, stats) -> tuple[OpenAI, AsyncOpenAI]:
+        if stats is None:
+            return OpenAI(api_key=self.api_key), AsyncOpenAI(api_key=self.api_key)
+        return (
+            OpenAI(api_key=self.api_key, http_client=DefaultHttpxClient(**stats.hooks())),
+            AsyncOpenAI(api_key=self.api_key, http_client=DefaultAsyncHttpxClient(**stats.async_hooks()))
+        )
 
-                response = self.__client.chat.completions.create(
-                    model=self.model_flavor,
-                    messages=messages,
-                    temperature=0 if deterministic else 1,
-                    top_p=1
-                )
-                output = response.choices[0].message.content.strip()
-
-                # Attempt to extract JSON from response
-                json_start = output.find('{')  # Find the first '{' character
-                json_end = output.rfind('}')  # Find the last '}' character
+    def __request(self, prompt: str, deterministic: bool) -> dict:
+        return {
+            "model": self.model_flavor,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a system that classifies scan results as 'Completed', "
+                        "'Incomplete', or 'False Positive Rich', optionally providing additional "
+                        "recommendations based on your analysis."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0 if deterministic else 1,
+            "top_p": 1
+        }
 
-                if json_start != -1 and json_end != -1:
-                    sanitized_output = output[json_start:json_end + 1]  # Extract JSON part
-                    parsed_output = json.loads(sanitized_output)  # Parse as JSON
-                    classifications["result"] = parsed_output.get("classification", None)
-                    classifications["analysis_description"] = parsed_output.get("analysis_description", None)
-                    classifications["next_arguments"] = parsed_output.get("next_arguments", [])
-                else:
-                    classifications["error"] = "No valid JSON found in LLM response."
+    def __with_options(self, client, timeout: float = None):
+        # The resilience layer retries failed calls itself, instead of the client
+        if self.resilience is None:
+            return client
+        if timeout is None:
+            # Keep the client's default timeout
+            return client.with_options(max_retries=0)
+        return client.with_options(max_retries=0, timeout=timeout)
 
-            except json.JSONDecodeError:
-                classifications["error"] = "Failed to parse JSON response from LLM."
-            except Exception as e:
-                classifications["error"] = f"Error with OpenAI API: {e}"
+    def _complete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        client = self.__with_options(self.__client, timeout)
+        response = client.chat.completions.create(**self.__request(prompt, deterministic))
+        return response.choices[0].message.content
 
-        self.save_results(classifications, save_dir)
-        return classifications
-    
-    def interpret(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "default")
-    
-    def interpret_restricted(self, scan_results: str, save_dir: str) -> dict:
-       return self._interpret(scan_results, save_dir, "restricted", deterministic=True)
+    async def _acomplete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        client = self.__with_options(self.__async_client, timeout)
+        response = await client.chat.completions.create(**self.__request(prompt, deterministic))
+        return response.choices[0].message.content
 
-    def interpret_with_suggestions(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "with_suggestions")
\ No newline at end of file
+    def _stream(self, prompt: str, deterministic: bool = False, timeout: float = None) -> Iterator[str]:
+        client = self.__with_options(self.__client, timeout)
+        with client.chat.completions.create(**self.__request(prompt, deterministic), stream=True) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
@@ -1,6 +1,7 @@
 from .gpt_based_interpretor import GPTInterpretor
 from .ollama_interpretor import OllamaInterpretor
 from .gemini_based_interpretor import GeminiInterpretor
+from .ensemble_interpretor import EnsembleInterpretor
 from .base_interpretor import BaseInterpretor
 
 class InterpretorFactory:
@@ -17,5 +18,8 @@ class InterpretorFactory:
             return GPTInterpretor(name, model_flavor, api_key)
         elif interpretor_type == "gemini":
             return GeminiInterpretor(name, model_flavor, api_key)
+        elif interpretor_type == "ensemble":
+            # The model flavor of an ensemble is its policy; its members are set with use_members
+            return EnsembleInterpretor(name, model_flavor, api_key)
         else:
             raise ValueError("Interpretor type not supported.")
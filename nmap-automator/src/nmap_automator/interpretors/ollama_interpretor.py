@@ -1,67 +1,76 @@
+from typing import Iterator
+
+import httpx
+
 from .base_interpretor import BaseInterpretor
-from .prompts import PROMPTS
 
-from ollama import chat
-import json
+from ollama import Client, AsyncClient
 
 
 class OllamaInterpretor(BaseInterpretor):
+    interpretor_type = "ollama"
+    response_name = "Ollama"
+    api_name = "Ollama"
+
     def __init__(
         self,
         name: str,
         model_flavor: str = "gemma2",
         api_key: str = None
     ):
-        self.__client = None
+        self.__transport = None
+        self.__hooks = {}
+        self.__async_transport = None
+        self.__async_hooks = {}
         super().__init__(name, model_flavor, api_key)
 
     def configure(self):
+        self.__transport, self.__hooks, self.__async_transport, self.__async_hooks = self._shared_clients(self.__build_clients)
         super().configure()
 
-    def _interpret(self, scan_results: str, save_dir: str, prompt_key: str) -> dict:
-        classifications = {
-            "error": None,
-            "result": None,
-            "analysis_description": None,
-            "next_arguments": None
-        }
-
-        if not self.is_configured:
-            classifications["error"] = "Interpretor not configured."
-        else:
-            try:
-                prompt = PROMPTS[prompt_key].format(scan_results=scan_results)
-                response = chat(
-                    model=self.model_flavor,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                output = response.message.content.strip()
+    def __build_clients(self, stats) -> tuple[httpx.HTTPTransport, dict, httpx.AsyncHTTPTransport, dict]:
+        # The clients are built per call (see __client), on these shared connection pools
+        if stats is None:
+            return httpx.HTTPTransport(), {}, httpx.AsyncHTTPTransport(), {}
+        return httpx.HTTPTransport(), stats.hooks(), httpx.AsyncHTTPTransport(), stats.async_hooks()
 
-                # Attempt to parse JSON response
-                json_start = output.find('{')  # Find the first '{' character
-                json_end = output.rfind('}')  # Find the last '}' character
+    def __client(self, timeout: float = None) -> Client:
+        """
+        Blocking client whose requests time out after `timeout` seconds.
 
-                if json_start != -1 and json_end != -1:
-                    sanitized_output = output[json_start:json_end + 1]  # Extract JSON part
-                    parsed_output = json.loads(sanitized_output)
-                    classifications["result"] = parsed_output.get("classification", None)
-                    classifications["analysis_description"] = parsed_output.get("analysis_description", None)
-                    classifications["next_arguments"] = parsed_output.get("next_arguments", [])
-                else:
-                    classifications["error"] = "No valid JSON found in Ollama response."
-            except json.JSONDecodeError:
-                classifications["error"] = "Failed to parse JSON response from Ollama."
-            except Exception as e:
-                classifications["error"] = f"Error with Ollama API: {e}"
+        ollama's clients only take a timeout when they are built, so each call gets its own
+        client sending through the shared transport. It is not closed: that would close the
+        transport, and the client itself holds no connection.
+        """
+        return Client(timeout=timeout, transport=self.__transport, **self.__hooks)
 
-        self.save_results(classifications, save_dir)
-        return classifications
+    def __async_client(self, timeout: float = None) -> AsyncClient:
+        """Async `__client`."""
+        return AsyncClient(timeout=timeout, transport=self.__async_transport, **self.__async_hooks)
 
-    def interpret(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "default")
+    def _complete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        response = self.__client(timeout).chat(
+            model=self.model_flavor,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.message.content
 
-    def interpret_restricted(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "restricted")
+    async def _acomplete(self, prompt: str, deterministic: bool = False, timeout: float = None) -> str:
+        response = await self.__async_client(timeout).chat(
+            model=self.model_flavor,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.message.content
 
-    def interpret_with_suggestions(self, scan_results: str, save_dir: str) -> dict:
-        return self._interpret(scan_results, save_dir, "with_suggestions")
+    def _stream(self, prompt: str, deterministic: bool = False, timeout: float = None) -> Iterator[str]:
+        stream = self.__client(timeout).chat(
+            model=self.model_flavor,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        try:
+            for part in stream:
+                yield part.message.content
+        finally:
+            # Closing the generator of the client closes its HTTP response
+            stream.close()
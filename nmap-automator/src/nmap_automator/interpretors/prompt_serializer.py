@@ -0,0 +1,130 @@
+import math
+
+# Context window of every supported model flavor, in tokens
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4": 8192,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "o1": 200000,
+    "o1-mini": 128000,
+    "models/gemini-1.5-pro": 2097152,
+    "models/gemini-1.5-flash": 1048576,
+    "models/gemini-1.5-flash-8b": 1048576,
+    "models/gemini-1.0-pro": 30720,
+    "llama3.3": 131072,
+    "llama3.2": 131072,
+    "llama3.1": 131072,
+    "llama3": 8192,
+    "llama2": 4096,
+    "gemma2": 8192,
+    "gemma": 8192,
+    "jimscard/whiterabbit-neo": 16384,
+    "ALIENTELLIGENCE/cybersecuritythreatanalysis": 8192,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+# Tokens kept free for the model's answer
+RESPONSE_TOKENS = 1024
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt does not fit in the token budget of the model."""
+
+    def __init__(self, tokens: int, budget: int, model_flavor: str) -> None:
+        super().__init__(f"Prompt of about {tokens} tokens exceeds the {budget} token budget of {model_flavor}.")
+        self.tokens = tokens
+        self.budget = budget
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of `text` for the BPE tokenizers of the supported models.
+
+    About four characters per token for prose, but digits, dots and punctuation of
+    addresses and port tables often get a token each, so those count double.
+    """
+    symbols = sum(1 for char in text if not char.isalpha() and not char.isspace())
+    return math.ceil((len(text) + symbols) / 4)
+
+
+def token_budget(model_flavor: str) -> int:
+    """Tokens a prompt may use with `model_flavor`, leaving room for the answer."""
+    return MODEL_CONTEXT_TOKENS.get(model_flavor, DEFAULT_CONTEXT_TOKENS) - RESPONSE_TOKENS
+
+
+def serialize_compact(scan_results) -> str:
+    """
+    Compact text form of scan result rows for LLM prompts.
+
+    Rows are grouped by host: a header line with the host's names and the number of ports
+    in each state, then one line per open port. Other ports (closed, filtered, ...) are only
+    counted, since their details rarely matter for the classification:
+
+        hosts: 2, open ports: 3
+        host 10.0.0.1 (www.example.com) open=2 filtered=998
+          22/tcp ssh OpenSSH 8.9p1
+          80/tcp http nginx 1.24.0
+        host 10.0.0.2 open=1 closed=3
+          443/tcp https
+
+    Rows of a scan diff (see `diff_to_results`) carry a `Change`. Every changed port gets a
+    line whatever its state, with the change in brackets, and host changes (rows without a
+    port) go in the host header:
+
+        host 10.0.0.1 open=1 absent=1
+          22/tcp ssh OpenSSH 9.6 [service changed (was: ssh OpenSSH 8.9)]
+          80/tcp http nginx state=absent was=open [closed]
+        host 10.0.0.3 [new host]
+
+    :param scan_results: Rows as returned by the scanner or the results store, or text (returned as is).
+    """
+    if isinstance(scan_results, str):
+        return scan_results
+    hosts = {}
+    for row in scan_results:
+        host = hosts.setdefault(str(row.get("IP", "")), {"names": {}, "states": {}, "ports": [], "changes": []})
+        name = row.get("Subdomain")
+        if name and name != row.get("IP"):
+            host["names"][str(name)] = None
+        if row.get("Port") in (None, ""):
+            # A change of the whole host
+            if row.get("Change"):
+                host["changes"].append(str(row["Change"]))
+            continue
+        state = str(row.get("State", "")) or "unknown"
+        host["states"][state] = host["states"].get(state, 0) + 1
+        if state == "open" or row.get("Change"):
+            host["ports"].append(row)
+
+    open_ports = sum(count for host in hosts.values() for state, count in host["states"].items() if state == "open")
+    lines = [f"hosts: {len(hosts)}, open ports: {open_ports}"]
+    for ip, host in hosts.items():
+        header = f"host {ip}"
+        if host["names"]:
+            header += f" ({', '.join(host['names'])})"
+        states = sorted(host["states"].items(), key=lambda item: (item[0] != "open", item[0]))
+        header_fields = [header] + [f"{state}={count}" for state, count in states] + [f"[{change}]" for change in host["changes"]]
+        lines.append(" ".join(header_fields))
+        for row in sorted(host["ports"], key=lambda row: (str(row.get("Protocol", "")), int(row.get("Port") or 0))):
+            fields = [f"{row.get('Port', '')}/{row.get('Protocol', '')}"]
+            fields += [str(row.get(key) or "") for key in ("Name", "Product", "Version")]
+            if row.get("State") != "open":
+                fields.append(f"state={row.get('State') or 'unknown'}")
+            if row.get("Previous State"):
+                fields.append(f"was={row['Previous State']}")
+            if row.get("Change"):
+                fields.append(f"[{row['Change']}]")
+            lines.append("  " + " ".join(field for field in fields if field))
+    return "\n".join(lines)
+
+
+def serialize(scan_results, prompt_format: str = "compact") -> str:
+    """
+    Scan results as they go in a prompt.
+
+    :param prompt_format: "compact" (see serialize_compact) or "raw" (the Python repr of the rows, as before).
+    """
+    if prompt_format == "compact":
+        return serialize_compact(scan_results)
+    if prompt_format == "raw":
+        return str(scan_results)
+    raise ValueError(f"Unsupported prompt format: {prompt_format}")
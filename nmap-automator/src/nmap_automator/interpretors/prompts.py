@@ -25,4 +25,37 @@ PROMPTS = {
         "3. 'next_arguments': An array of recommended nmap arguments for the next nmap scan.\n"
         "IT IS MISSION CRITICAL THAT YOU NOT ADD ANY COMMENTS TO THE JSON OBJECT.\n\n{scan_results}"
     ),
-}
\ No newline at end of file
+    # Combine the interpretations of the chunks of a scan too large for a single prompt
+    "reduce_default": (
+        "The following are the classifications of parts of one nmap scan, each covering different hosts.\n"
+        "Classify the whole scan as Completed, Incomplete, or False Positive Rich.\n"
+        "Provide a single JSON object API response for the response with the following fields:\n"
+        "1. 'classification': The classification result.\n"
+        "2. 'analysis_description': A detailed explanation of the classification decision for the whole scan.\n"
+        "3. 'next_arguments': keep it NULL.\n"
+        "IT IS MISSION CRITICAL THAT YOU NOT ADD ANY COMMENTS TO THE JSON OBJECT.\n\n{scan_results}"
+    ),
+    "reduce_restricted": (
+        "The following are the classifications of parts of one nmap scan, each covering different hosts.\n"
+        "Classify the whole scan into one of the following categories:\n"
+        "'Completed', 'Incomplete', or 'False Positive Rich'.\n"
+        "Do not provide any details, only return the category name in a single JSON object API "
+        "response following this structure:\n"
+        "1. 'classification': The classification result.\n"
+        "2. 'analysis_description': keep it NULL.\n"
+        "3. 'next_arguments': keep it NULL.\n"
+        "IT IS MISSION CRITICAL THAT YOU NOT ADD ANY COMMENTS TO THE JSON OBJECT.\n\n{scan_results}"
+    ),
+    "reduce_with_suggestions": (
+        "The following are the classifications and suggested nmap arguments of parts of one nmap scan, each covering different hosts.\n"
+        "Classify the whole scan as Completed, Incomplete, or False Positive Rich.\n"
+        "Prepare a single JSON object that will be returned as an API Response with the following fields:\n"
+        "1. 'classification': The classification result.\n"
+        "2. 'analysis_description': A detailed explanation of the classification decision for the whole scan.\n"
+        "3. 'next_arguments': An array of recommended nmap arguments for the next nmap scan, merging those of the parts.\n"
+        "IT IS MISSION CRITICAL THAT YOU NOT ADD ANY COMMENTS TO THE JSON OBJECT.\n\n{scan_results}"
+    ),
+}
+
+# Extra answer field asked for when the confidence of the answer is needed (cascaded interpretations)
+CONFIDENCE_FIELD = "4. 'confidence': How confident you are in the classification, as a number from 0 to 1.\n"
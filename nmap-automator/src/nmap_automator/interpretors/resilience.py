@@ -0,0 +1,396 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Awaitable, Callable
+
+# Exceptions (or their bases) of the provider clients meaning the call may succeed if retried
+RETRYABLE_ERRORS = ("APIConnectionError", "TransportError", "ServiceUnavailable", "DeadlineExceeded")
+# HTTP statuses of a throttled or failing provider
+RETRYABLE_STATUSES = (408, 409, 429)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class CallDeadlineExceeded(TimeoutError):
+    """Raised when a provider call (with its retries) cannot finish before its deadline."""
+
+
+def retry_info(error: Exception) -> tuple[bool, float | None]:
+    """
+    Whether a failed provider call may be retried, and after how many seconds the provider asked for.
+
+    The HTTP status is read from `status_code` (OpenAI, Ollama), `code` (Google API errors) or
+    the error's response. The delay comes from the Retry-After / retry-after-ms response headers.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int) or status < 0:
+        status = getattr(error, "code", None)
+    if not isinstance(status, int) or status < 0:
+        status = getattr(response, "status_code", None)
+
+    if isinstance(status, int) and status >= 0:
+        retryable = status in RETRYABLE_STATUSES or status >= 500
+    else:
+        retryable = isinstance(error, (TimeoutError, ConnectionError)) or any(
+            cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__
+        )
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if retryable and headers is not None:
+        try:
+            if headers.get("retry-after-ms") is not None:
+                retry_after = float(headers["retry-after-ms"]) / 1000
+            elif headers.get("retry-after") is not None:
+                value = headers["retry-after"]
+                try:
+                    retry_after = float(value)
+                except ValueError:
+                    retry_after = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            retry_after = None
+    return retryable, max(0.0, retry_after) if retry_after is not None else None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `per_minute` tokens a minute, holding at most a minute's worth.
+
+    Takers reserve what they need and get the time to wait before using it, so a burst is
+    spread over time instead of being rejected. A bucket of 0 tokens a minute never waits.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.per_minute = per_minute
+        self.__tokens = float(per_minute)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens; return the seconds to wait before they are actually available."""
+        if not self.per_minute:
+            return 0.0
+        # A request larger than the bucket waits for a full bucket rather than forever
+        amount = min(amount, self.per_minute)
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.per_minute, self.__tokens + (now - self.__updated) * self.per_minute / 60)
+            self.__updated = now
+            self.__tokens -= amount
+            return max(0.0, -self.__tokens * 60 / self.per_minute)
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens reserved by a call that was not made."""
+        if self.per_minute:
+            with self.__lock:
+                self.__tokens = min(self.per_minute, self.__tokens + min(amount, self.per_minute))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider is down.
+
+    After `failure_threshold` consecutive failed calls the circuit opens, and calls are
+    rejected for `reset_seconds`. Then a single trial call is let through (half open): the
+    circuit closes if it succeeds, and opens again if it fails.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self.__opened_at = 0.0
+        self.__trial_running = False
+        self.__lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """:raises CircuitOpenError: When the call must not be made."""
+        with self.__lock:
+            if self.state == "closed":
+                return
+            retry_in = self.__opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and retry_in <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.__trial_running:
+                self.__trial_running = True
+                return
+            raise CircuitOpenError(
+                f"circuit open after {self.failures} consecutive failures, next trial in {max(0, retry_in):.0f}s"
+            )
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.state = "closed"
+            self.failures = 0
+            self.__trial_running = False
+
+    def release(self) -> None:
+        """End a call that did not reach the provider, without judging it."""
+        with self.__lock:
+            self.__trial_running = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self.__opened_at = time.monotonic()
+            self.__trial_running = False
+
+
+class ProviderGuard:
+    """
+    Rate limits, retries, deadline and circuit breaker of the calls to one provider.
+
+    Every call first takes one request and its estimated tokens from the provider's token
+    buckets, waiting as needed. A failed call is retried when the provider was throttled
+    (429), timed out, was unreachable or failed (5xx): after the Retry-After delay the
+    provider asked for, or else after an exponential backoff with full jitter. The whole call,
+    retries and rate limit waits included, must finish within `deadline` seconds. Each attempt
+    gets the remaining time as its timeout.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_retries: int = 3,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+        deadline: float = 0,
+        breaker: CircuitBreaker = None
+    ) -> None:
+        """
+        :param provider: Interpretor type of the provider.
+        :param requests_per_minute: Request rate limit (0 for none).
+        :param tokens_per_minute: Prompt and answer token rate limit (0 for none).
+        :param max_retries: Retries of a failed call.
+        :param retry_base_seconds: Backoff ceiling of the first retry, doubled on every retry.
+        :param retry_max_seconds: Maximum backoff ceiling.
+        :param deadline: Seconds a call may take, retries included (0 for none).
+        :param breaker: Circuit breaker of the provider.
+        """
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.__lock = threading.Lock()
+        self.__counters = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "retry_after_honored": 0,
+            "rate_limited": 0,
+            "rate_limited_seconds": 0.0,
+            "deadline_exceeded": 0,
+            "circuit_rejected": 0
+        }
+
+    def __count(self, counter: str, amount: float = 1) -> None:
+        with self.__lock:
+            self.__counters[counter] += amount
+
+    def __start(self) -> float | None:
+        """Count the call and check the breaker; return its deadline (monotonic), if any."""
+        self.__count("calls")
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.__count("circuit_rejected")
+            raise
+        return time.monotonic() + self.deadline if self.deadline else None
+
+    def __remaining(self, deadline: float | None) -> float | None:
+        return None if deadline is None else deadline - time.monotonic()
+
+    def __refund(self, tokens: int) -> None:
+        self.requests.refund(1)
+        self.tokens.refund(tokens)
+
+    def __acquire(self, tokens: int, deadline: float | None) -> float:
+        """Reserve a request and `tokens`; return the seconds to wait for them."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            remaining = self.__remaining(deadline)
+            if remaining is not None and wait >= remaining:
+                self.__refund(tokens)
+                self.__count("deadline_exceeded")
+                self.__count("failed")
+                self.breaker.release()
+                raise CallDeadlineExceeded(f"{self.provider} rate limit wait of {wait:.1f}s exceeds the call deadline")
+            self.__count("rate_limited")
+            self.__count("rate_limited_seconds", wait)
+        return wait
+
+    def __fail(self, counter: str = None) -> None:
+        if counter is not None:
+            self.__count(counter)
+        self.__count("failed")
+        self.breaker.record_failure()
+
+    def __retry_delay(self, error: Exception, attempt: int, deadline: float | None) -> float:
+        """
+        Seconds to wait before retrying after `error`.
+
+        :raises: `error` when it is not to be retried, CallDeadlineExceeded when no retry fits in the deadline.
+        """
+        retryable, retry_after = retry_info(error)
+        if not retryable:
+            # The provider answered (bad request, authentication, ...): it is up
+            self.__count("failed")
+            self.breaker.record_success()
+            raise error
+        if attempt > self.max_retries:
+            self.__fail()
+            raise error
+        if retry_after is not None:
+            self.__count("retry_after_honored")
+            delay = retry_after
+        else:
+            delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempt - 1)))
+        remaining = self.__remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            self.__fail("deadline_exceeded")
+            raise CallDeadlineExceeded(f"{self.provider} call did not succeed before its deadline: {error or type(error).__name__}") from error
+        self.__count("retries")
+        print(f"{self.provider} call failed ({error}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def __succeeded(self) -> None:
+        self.__count("succeeded")
+        self.breaker.record_success()
+
+    def call(self, fn: Callable[[float | None], str], tokens: int = 0) -> str:
+        """
+        Call the provider through `fn(timeout)` (blocking).
+
+        :param fn: Makes one call with a timeout in seconds (None for no timeout).
+        :param tokens: Estimated tokens of the prompt and answer.
+        :raises CircuitOpenError: When the provider's circuit is open.
+        :raises CallDeadlineExceeded: When the call cannot finish before its deadline.
+        """
+        deadline = self.__start()
+        attempt = 0
+        try:
+            while True:
+                wait = self.__acquire(tokens, deadline)
+                try:
+                    time.sleep(wait)
+                    result = fn(self.__remaining(deadline))
+                except Exception as e:
+                    attempt += 1
+                    delay = self.__retry_delay(e, attempt, deadline)
+                except BaseException:
+                    self.__refund(tokens)
+                    raise
+                else:
+                    self.__succeeded()
+                    return result
+                time.sleep(delay)
+        except Exception:
+            raise
+        except BaseException:
+            # Interrupted before the call was judged: do not hold the breaker's trial forever
+            self.breaker.release()
+            raise
+
+    async def acall(self, fn: Callable[[float | None], Awaitable[str]], tokens: int = 0) -> str:
+        """Async `call`; every attempt is also cancelled when it outlives the deadline."""
+        deadline = self.__start()
+        attempt = 0
+        try:
+            while True:
+                wait = self.__acquire(tokens, deadline)
+                try:
+                    await asyncio.sleep(wait)
+                    timeout = self.__remaining(deadline)
+                    result = await asyncio.wait_for(fn(timeout), timeout)
+                except Exception as e:
+                    attempt += 1
+                    delay = self.__retry_delay(e, attempt, deadline)
+                except BaseException:
+                    # Cancelled: the reservation of the attempt is given back
+                    self.__refund(tokens)
+                    raise
+                else:
+                    self.__succeeded()
+                    return result
+                await asyncio.sleep(delay)
+        except Exception:
+            raise
+        except BaseException:
+            # Cancelled before the call was judged: do not hold the breaker's trial forever
+            self.breaker.release()
+            raise
+
+    def stats(self) -> dict:
+        with self.__lock:
+            counters = dict(self.__counters)
+        counters["rate_limited_seconds"] = round(counters["rate_limited_seconds"], 3)
+        return {
+            **counters,
+            "limits": {"requests_per_minute": self.requests.per_minute, "tokens_per_minute": self.tokens.per_minute},
+            "circuit": {"state": self.breaker.state, "consecutive_failures": self.breaker.failures, "opened": self.breaker.opened}
+        }
+
+
+class InterpretorResilience:
+    """The ProviderGuard of every provider, shared by the interpretors of the server."""
+
+    def __init__(
+        self,
+        rate_limits: dict[str, tuple[int, int]] = None,
+        max_retries: int = 3,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+        deadline: float = 0,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30
+    ) -> None:
+        """
+        :param rate_limits: Interpretor type -> (requests per minute, tokens per minute); 0 for no limit.
+        The other parameters are those of ProviderGuard and CircuitBreaker, the same for every provider.
+        """
+        self.rate_limits = rate_limits or {}
+        self.__options = {
+            "max_retries": max_retries,
+            "retry_base_seconds": retry_base_seconds,
+            "retry_max_seconds": retry_max_seconds,
+            "deadline": deadline
+        }
+        self.__breaker = {"failure_threshold": breaker_failures, "reset_seconds": breaker_reset_seconds}
+        self.__guards = {}
+        self.__lock = threading.Lock()
+
+    def guard(self, provider: str) -> ProviderGuard:
+        with self.__lock:
+            if provider not in self.__guards:
+                requests_per_minute, tokens_per_minute = self.rate_limits.get(provider, (0, 0))
+                self.__guards[provider] = ProviderGuard(
+                    provider,
+                    requests_per_minute=requests_per_minute,
+                    tokens_per_minute=tokens_per_minute,
+                    breaker=CircuitBreaker(**self.__breaker),
+                    **self.__options
+                )
+            return self.__guards[provider]
+
+    def stats(self) -> dict:
+        with self.__lock:
+            guards = dict(self.__guards)
+        return {provider: guard.stats() for provider, guard in guards.items()}
@@ -0,0 +1,164 @@
+import threading
+
+# Rules of the pre-classifier, in the order they are tried
+RULES = ("no_hosts_up", "all_filtered", "complete_service_scan")
+# Rules tried when the interpretor configuration does not choose them. complete_service_scan
+# is left out: it ends suggest runs without the follow-up scans the model would propose.
+DEFAULT_RULES = ("no_hosts_up", "all_filtered")
+# Service names nmap reports when it could not identify a service
+UNKNOWN_SERVICES = ("", "unknown", "tcpwrapped")
+# nmap arguments running service detection
+SERVICE_DETECTION_ARGS = ("-sV", "-A")
+
+
+class RuleClassifier:
+    """
+    Deterministic classification of the scans that do not need an LLM.
+
+    Every rule looks at the scan records (and at the nmap arguments of the scan, when known)
+    and either passes or returns a classification with its confidence:
+    - "no_hosts_up": the scan has no record at all. No host answered, or every host dropped
+      the probes (nmap does not list the ports of a host when they are all filtered).
+      Incomplete, suggesting to skip host discovery (-Pn).
+    - "all_filtered": every port recorded is filtered. The scan learnt nothing past a
+      firewall; Incomplete, suggesting a TCP connect scan without host discovery.
+    - "complete_service_scan": service detection ran (-sV or -A) and a probe identified the
+      service of every open port. Completed. nmap names a port from its port table even when
+      no probe matched, so a port only counts as identified with a product or a version,
+      which only a probe match (method="probed", conf=10) fills in. When the arguments of the
+      scan are unknown, the rule matches with less confidence.
+
+    The first rule matching with at least `min_confidence` classifies the scan; otherwise the
+    scan goes to the LLM. The interpretation has the fields of an LLM interpretation, filled
+    like the prompts of the interpret_runner mode ask for.
+    """
+
+    def __init__(self, rules: list[str] = DEFAULT_RULES, min_confidence: float = 0.9) -> None:
+        """
+        :param rules: Names of the rules to try, in order (see RULES).
+        :param min_confidence: Confidence a rule needs for its classification to be kept.
+        """
+        unknown = [rule for rule in rules if rule not in RULES]
+        if unknown:
+            raise ValueError(f"Unsupported pre-classifier rules: {unknown}")
+        self.rules = list(rules)
+        self.min_confidence = min_confidence
+
+    @staticmethod
+    def no_hosts_up(records: list[dict], nmap_args: list[str] | None) -> tuple | None:
+        if records:
+            return None
+        return (
+            "Incomplete", 0.95,
+            "No host reported any port: the targets are down, or they drop the host discovery "
+            "probes or every port probe.",
+            ["-Pn"]
+        )
+
+    @staticmethod
+    def all_filtered(records: list[dict], nmap_args: list[str] | None) -> tuple | None:
+        if not records or any(record.get("State") != "filtered" for record in records):
+            return None
+        return (
+            "Incomplete", 0.9,
+            f"All {len(records)} ports recorded are filtered: a firewall drops the probes and "
+            "the scan tells nothing about the services behind it.",
+            ["-Pn", "-sT"]
+        )
+
+    @staticmethod
+    def complete_service_scan(records: list[dict], nmap_args: list[str] | None) -> tuple | None:
+        open_ports = [record for record in records if record.get("State") == "open"]
+        if not open_ports:
+            return None
+        for record in open_ports:
+            if (record.get("Name") or "").lower() in UNKNOWN_SERVICES:
+                return None
+            if not (record.get("Product") or record.get("Version")):
+                # Named from the port table only: the service was not identified by a probe
+                return None
+        if nmap_args is None:
+            confidence = 0.8
+        elif any(arg in SERVICE_DETECTION_ARGS for arg in nmap_args):
+            confidence = 0.95
+        else:
+            return None
+        hosts = len({record.get("IP") for record in open_ports})
+        return (
+            "Completed", confidence,
+            f"Service detection identified the service of all {len(open_ports)} open ports "
+            f"on {hosts} host(s); nothing is left unknown.",
+            []
+        )
+
+    def classify(self, records: list[dict], interpret_runner: str, nmap_args: list[str] = None) -> dict | None:
+        """
+        The first rule matching confidently, None when the LLM is needed.
+
+        :param interpret_runner: "normal", "restricted" or "suggest", shaping the interpretation.
+        :param nmap_args: nmap arguments of the scan, None when unknown.
+        :return: {"rule", "confidence", "result"}, `result` being the interpretation.
+        """
+        for rule in self.rules:
+            match = getattr(self, rule)(records, nmap_args)
+            if match is None:
+                continue
+            classification, confidence, description, next_arguments = match
+            if confidence < self.min_confidence:
+                continue
+            return {
+                "rule": rule,
+                "confidence": confidence,
+                "result": {
+                    "error": None,
+                    "result": classification,
+                    "analysis_description": None if interpret_runner == "restricted" else description,
+                    "next_arguments": next_arguments if interpret_runner == "suggest" else None
+                }
+            }
+        return None
+
+
+class RuleClassifierStats:
+    """Interpretations short-circuited by the pre-classifier, and the model latency they saved."""
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__counters = {"interpretations": 0, "short_circuited": 0, "unestimated": 0}
+        self.__rules = {}
+        self.__classifier_seconds = 0.0
+        self.__saved_seconds = 0.0
+
+    def record(self, rule: str | None, seconds: float, saved_seconds: float = None) -> None:
+        """
+        Record a pre-classification.
+
+        :param rule: Rule that classified the scan, None when it went to the LLM.
+        :param seconds: Time the rules took.
+        :param saved_seconds: Estimated model latency avoided (None when the model's latency is unknown).
+        """
+        with self.__lock:
+            self.__counters["interpretations"] += 1
+            self.__classifier_seconds += seconds
+            if rule is None:
+                return
+            self.__counters["short_circuited"] += 1
+            self.__rules[rule] = self.__rules.get(rule, 0) + 1
+            if saved_seconds is None:
+                self.__counters["unestimated"] += 1
+            else:
+                self.__saved_seconds += saved_seconds
+
+    def stats(self) -> dict:
+        with self.__lock:
+            counters = dict(self.__counters)
+            rules = dict(self.__rules)
+            classifier_seconds = self.__classifier_seconds
+            saved_seconds = self.__saved_seconds
+        return {
+            **counters,
+            "short_circuit_rate": round(counters["short_circuited"] / counters["interpretations"], 3) if counters["interpretations"] else None,
+            "rules": rules,
+            "classifier_seconds": round(classifier_seconds, 6),
+            "latency_saved_seconds": round(saved_seconds, 3)
+        }
@@ -0,0 +1,5 @@
+# src/nmap_automator/jobs/__init__.py
+from .job_store import JobStore
+from .job_manager import JobManager
+from .schedule_store import ScheduleStore
+from .scheduler import ScanScheduler
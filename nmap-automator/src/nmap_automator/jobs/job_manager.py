@@ -0,0 +1,172 @@
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from nmap_automator.config_loader import Config, NmapScanRequest
+from nmap_automator.scanner import CancelToken
+from .job_store import JobStore
+
+
+class JobManager:
+    """
+    Runs scan jobs in the background on a bounded worker pool.
+
+    Three kinds of jobs are supported:
+    - "nmap_scan": the Nmap scan only (same payload as /nmap_scan).
+    - "scan": the Nmap scan followed by the LLM interpretation (same payload as /scan).
+    - "resume_scan": the resumption of an interrupted scan ({"scan_id": ...}).
+    """
+
+    FINAL_STATUSES = ("completed", "failed", "cancelled", "interrupted")
+
+    def __init__(self, store: JobStore, runner_factory: Callable, max_workers: int = 2) -> None:
+        """
+        :param store: JobStore persisting the job state.
+        :param runner_factory: Callable returning a `Runner` used to execute the scan stages.
+        :param max_workers: Number of jobs running at the same time; the others wait in the queue.
+        """
+        self.store = store
+        self.runner_factory = runner_factory
+        self.__pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan-job")
+        self.__cancel_tokens = {}
+        self.__futures = {}
+        self.__lock = threading.Lock()
+
+        interrupted = self.store.mark_interrupted()
+        if interrupted:
+            print(f"Marked {interrupted} unfinished job(s) from a previous run as interrupted.")
+
+    def submit(self, kind: str, request: dict) -> dict:
+        """
+        Queue a new job and return its initial state right away.
+
+        :param kind: "scan", "nmap_scan" or "resume_scan".
+        :param request: Validated request payload of the job.
+        :return: The job record.
+        """
+        if kind == "scan":
+            targets_total = len(Config(**request).scanner.target)
+        elif kind == "nmap_scan":
+            targets_total = len(NmapScanRequest(**request).scanner.target)
+        elif kind == "resume_scan":
+            # Known once the scan's journal is read
+            targets_total = 0
+        else:
+            raise ValueError(f"Unsupported job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        job = self.store.create_job(job_id, kind, request, targets_total=targets_total)
+        token = CancelToken()
+        with self.__lock:
+            self.__cancel_tokens[job_id] = token
+            self.__futures[job_id] = self.__pool.submit(self._run_job, job_id, kind, request, token)
+        return job
+
+    def get_job(self, job_id: str) -> dict | None:
+        return self.store.get_job(job_id)
+
+    def list_jobs(self, limit: int = 50, status: str = None) -> list[dict]:
+        return self.store.list_jobs(limit=limit, status=status)
+
+    def cancel(self, job_id: str) -> dict | None:
+        """
+        Cancel a queued or running job. Running nmap processes are terminated.
+
+        :return: The updated job record, or None if the job does not exist.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] in self.FINAL_STATUSES:
+            return job
+
+        with self.__lock:
+            token = self.__cancel_tokens.get(job_id)
+            future = self.__futures.get(job_id)
+        if token is not None:
+            token.cancel()
+        if future is not None and future.cancel():
+            # The job never started, so nothing else will update its state
+            self.store.update_job(job_id, status="cancelled")
+            self.__forget(job_id)
+        return self.store.get_job(job_id)
+
+    def __forget(self, job_id: str) -> None:
+        with self.__lock:
+            self.__cancel_tokens.pop(job_id, None)
+            self.__futures.pop(job_id, None)
+
+    def _run_job(self, job_id: str, kind: str, request: dict, token: CancelToken) -> None:
+        try:
+            if token.cancelled:
+                self.store.update_job(job_id, status="cancelled")
+                return
+
+            self.store.update_job(job_id, status="running")
+            runner = self.runner_factory()
+            if kind == "resume_scan":
+                self._resume_scan(job_id, runner, request["scan_id"], token)
+                return
+            if kind == "scan":
+                conf = Config(**request)
+                scanner_conf = conf.scanner
+            else:
+                conf = None
+                scanner_conf = NmapScanRequest(**request).scanner
+
+            scan_dir = runner.create_save_dir(scanner_conf=scanner_conf)
+            self.store.update_job(job_id, scan_dir=scan_dir)
+
+            all_results = runner.scan_targets(
+                scanner_conf=scanner_conf,
+                scan_dir=scan_dir,
+                cancel_token=token,
+                on_result=lambda _: self.store.increment_progress(job_id),
+                on_plan=lambda plan: self.store.update_job(job_id, targets_total=len(plan.requested))
+            )
+            result = {
+                "data": all_results,
+                "scan_id": runner.scan_id_from_dir(scan_dir),
+                "scan_dir_path": scan_dir,
+                "targets": runner.target_plan.stats(),
+                "limits": runner.scan_limits
+            }
+
+            if token.cancelled:
+                self.store.update_job(job_id, status="cancelled", result=result)
+                return
+
+            if conf is not None:
+                scan_rows = [row for scan_result in all_results for row in scan_result.get("results", [])]
+                result["interpreted_results"], interpretation = runner.run_llm_interpretation(
+                    interpreter_conf=conf.interpretor,
+                    results=scan_rows,
+                    save_dir=scan_dir,
+                    nmap_args=conf.scanner.nmap_args
+                )
+                result.update(runner.interpretation_fields(interpretation))
+
+            self.store.update_job(job_id, status="completed", result=result)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.update_job(job_id, status="failed", error=str(e))
+        finally:
+            self.__forget(job_id)
+
+    def _resume_scan(self, job_id: str, runner, scan_id: str, token: CancelToken) -> None:
+        scan = runner.context.results_store.get_scan(scan_id)
+        if scan is not None:
+            self.store.update_job(job_id, scan_dir=scan["scan_dir"])
+        result = runner.resume_scan(
+            scan_id,
+            cancel_token=token,
+            on_result=lambda _: self.store.increment_progress(job_id),
+            on_plan=lambda plan: self.store.update_job(job_id, targets_total=len(plan.requested))
+        )
+        self.store.update_job(job_id, status="cancelled" if token.cancelled else "completed", result=result)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.__lock:
+            tokens = list(self.__cancel_tokens.values())
+        for token in tokens:
+            token.cancel()
+        self.__pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+
+from nmap_automator.storage import SqliteStore
+
+
+class JobStore(SqliteStore):
+    """SQLite-backed store keeping the state of scan jobs across server restarts."""
+
+    _COLUMNS = (
+        "job_id", "kind", "status", "request", "targets_done", "targets_total",
+        "scan_dir", "result", "error", "created_at", "started_at", "finished_at"
+    )
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            request TEXT NOT NULL,
+            targets_done INTEGER NOT NULL DEFAULT 0,
+            targets_total INTEGER NOT NULL DEFAULT 0,
+            scan_dir TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)",
+    )
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def create_job(self, job_id: str, kind: str, request: dict, targets_total: int) -> dict:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, request, targets_total, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, "queued", json.dumps(request), targets_total, self._now())
+            )
+        return self.get_job(job_id)
+
+    def update_job(self, job_id: str, **fields) -> None:
+        """
+        Update the given columns of a job.
+
+        `result` is serialized to JSON, and `started_at` / `finished_at` are filled in
+        automatically when the status moves to running or to a final state.
+        """
+        unknown = set(fields) - set(self._COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        status = fields.get("status")
+        if status == "running":
+            fields.setdefault("started_at", self._now())
+        elif status in ("completed", "failed", "cancelled", "interrupted"):
+            fields.setdefault("finished_at", self._now())
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def increment_progress(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET targets_done = targets_done + 1 WHERE job_id = ?", (job_id,))
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self._reader() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def list_jobs(self, limit: int = 50, status: str = None) -> list[dict]:
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def mark_interrupted(self) -> int:
+        """
+        Flag the jobs left queued or running by a previous server process.
+
+        :return: Number of interrupted jobs.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'interrupted', finished_at = ?, error = ? WHERE status IN ('queued', 'running')",
+                (self._now(), "Server restarted before the job finished.")
+            )
+        return cursor.rowcount
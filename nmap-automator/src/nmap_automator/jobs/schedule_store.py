@@ -0,0 +1,141 @@
+import datetime
+import json
+import sqlite3
+import time
+
+from nmap_automator.storage import SqliteStore
+
+
+class ScheduleStore(SqliteStore):
+    """SQLite-backed store of the recurring scans and of when each target was last scanned by one."""
+
+    _COLUMNS = (
+        "schedule_id", "name", "request", "interval_seconds", "priority", "overlap",
+        "min_target_interval", "enabled", "next_run_at", "pending", "last_job_id",
+        "last_run_at", "runs", "skipped", "coalesced", "deferred", "created_at"
+    )
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS schedules (
+            schedule_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            request TEXT NOT NULL,
+            interval_seconds INTEGER NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            overlap TEXT NOT NULL,
+            min_target_interval INTEGER NOT NULL DEFAULT 0,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            next_run_at REAL NOT NULL,
+            pending INTEGER NOT NULL DEFAULT 0,
+            last_job_id TEXT,
+            last_run_at TEXT,
+            runs INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            coalesced INTEGER NOT NULL DEFAULT 0,
+            deferred INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS schedule_target_runs (
+            target TEXT PRIMARY KEY,
+            last_run_at REAL NOT NULL
+        )
+        """,
+    )
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        schedule = dict(row)
+        schedule["request"] = json.loads(schedule["request"])
+        schedule["enabled"] = bool(schedule["enabled"])
+        schedule["pending"] = bool(schedule["pending"])
+        return schedule
+
+    def create_schedule(
+        self,
+        schedule_id: str,
+        name: str,
+        request: dict,
+        interval_seconds: int,
+        priority: int = 0,
+        overlap: str = "skip",
+        min_target_interval: int = 0,
+        enabled: bool = True
+    ) -> dict:
+        """Record a recurring scan; its first run is due right away."""
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO schedules (schedule_id, name, request, interval_seconds, priority, overlap,
+                                       min_target_interval, enabled, next_run_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (schedule_id, name, json.dumps(request), interval_seconds, priority, overlap,
+                 min_target_interval, int(enabled), time.time(), self._now())
+            )
+        return self.get_schedule(schedule_id)
+
+    def update_schedule(self, schedule_id: str, **fields) -> None:
+        unknown = set(fields) - set(self._COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown schedule fields: {sorted(unknown)}")
+        if "request" in fields:
+            fields["request"] = json.dumps(fields["request"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE schedules SET {assignments} WHERE schedule_id = ?", (*fields.values(), schedule_id))
+
+    def increment(self, schedule_id: str, counter: str, amount: int = 1) -> None:
+        if counter not in ("runs", "skipped", "coalesced", "deferred"):
+            raise ValueError(f"Unknown schedule counter: {counter}")
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE schedules SET {counter} = {counter} + ? WHERE schedule_id = ?", (amount, schedule_id))
+
+    def get_schedule(self, schedule_id: str) -> dict | None:
+        with self._reader() as conn:
+            row = conn.execute("SELECT * FROM schedules WHERE schedule_id = ?", (schedule_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def list_schedules(self, enabled_only: bool = False) -> list[dict]:
+        query = "SELECT * FROM schedules"
+        if enabled_only:
+            query += " WHERE enabled = 1"
+        query += " ORDER BY priority DESC, created_at"
+        with self._reader() as conn:
+            rows = conn.execute(query).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def delete_schedule(self, schedule_id: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM schedules WHERE schedule_id = ?", (schedule_id,))
+        return cursor.rowcount > 0
+
+    def target_runs(self, targets: list[str]) -> dict[str, float]:
+        """Time each of `targets` was last scanned by a recurring scan (targets never scanned are left out)."""
+        if not targets:
+            return {}
+        placeholders = ", ".join("?" * len(targets))
+        with self._reader() as conn:
+            rows = conn.execute(
+                f"SELECT target, last_run_at FROM schedule_target_runs WHERE target IN ({placeholders})",
+                targets
+            ).fetchall()
+        return {row["target"]: row["last_run_at"] for row in rows}
+
+    def record_target_runs(self, targets: list[str], at: float) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO schedule_target_runs (target, last_run_at) VALUES (?, ?)
+                ON CONFLICT (target) DO UPDATE SET last_run_at = excluded.last_run_at
+                """,
+                [(target, at) for target in targets]
+            )
+
+    @staticmethod
+    def format_time(timestamp: float | None) -> str | None:
+        if timestamp is None:
+            return None
+        return datetime.datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
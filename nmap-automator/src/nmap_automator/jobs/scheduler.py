@@ -0,0 +1,179 @@
+import heapq
+import math
+import threading
+import time
+import uuid
+
+from .job_manager import JobManager
+from .schedule_store import ScheduleStore
+
+
+class ScanScheduler:
+    """
+    Runs the recurring scans of a ScheduleStore as background jobs.
+
+    Every `poll_interval` seconds, the schedules that are due go through a priority queue
+    (highest priority first, then earliest due) and are submitted to the JobManager, at most
+    `max_running` runs being in flight at once. Due runs that do not fit wait for the next
+    pass, so low priority schedules yield to the others when the server is busy.
+
+    A run is never started while the previous run of the same schedule is still going. Its
+    occurrence is skipped (overlap "skip"), or the occurrences missed meanwhile are coalesced
+    into a single run started as soon as the previous one finishes (overlap "coalesce").
+
+    Targets scanned by any schedule less than the minimum target interval ago are left out of
+    a run; a run left without targets is deferred to its next occurrence.
+    """
+
+    def __init__(
+        self,
+        store: ScheduleStore,
+        job_manager: JobManager,
+        max_running: int = 2,
+        min_target_interval: int = 0,
+        poll_interval: float = 5
+    ) -> None:
+        """
+        :param store: ScheduleStore holding the recurring scans.
+        :param job_manager: JobManager running the scans (they are stored like any other job's).
+        :param max_running: Number of runs in flight at once.
+        :param min_target_interval: Server-wide minimum number of seconds between two scans of a target.
+        :param poll_interval: Seconds between two passes.
+        """
+        self.store = store
+        self.job_manager = job_manager
+        self.max_running = max_running
+        self.min_target_interval = min_target_interval
+        self.poll_interval = poll_interval
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def create(self, name: str, request: dict, interval_seconds: int, **options) -> dict:
+        """
+        Record a recurring scan, due right away.
+
+        :param request: Job request of every run ("scanner", and "interpretor" to interpret the results).
+        :param options: priority, overlap, min_target_interval and enabled (see ScheduleRequest).
+        """
+        schedule = self.store.create_schedule(uuid.uuid4().hex, name, request, interval_seconds, **options)
+        self.wake()
+        return schedule
+
+    def run_now(self, schedule_id: str) -> None:
+        """Make a schedule due right away (subject to the same overlap rules as its regular runs)."""
+        self.store.update_schedule(schedule_id, next_run_at=time.time())
+        self.wake()
+
+    def start(self) -> None:
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__loop, name="scan-scheduler", daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def wake(self) -> None:
+        """Run a pass now instead of waiting for the next poll (when the scheduler is started)."""
+        if self.__thread is not None:
+            threading.Thread(target=self.tick, name="scan-scheduler-wake", daemon=True).start()
+
+    def __loop(self) -> None:
+        while not self.__stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Scheduler pass failed: {e}")
+            self.__stop.wait(self.poll_interval)
+
+    def is_running(self, schedule: dict) -> bool:
+        """Whether the last run of a schedule is still queued or running."""
+        if schedule["last_job_id"] is None:
+            return False
+        job = self.job_manager.get_job(schedule["last_job_id"])
+        return job is not None and job["status"] not in JobManager.FINAL_STATUSES
+
+    @staticmethod
+    def next_occurrence(schedule: dict, now: float) -> tuple[float, int]:
+        """
+        The first occurrence of a schedule after `now`, and the number of occurrences due until then.
+        """
+        if schedule["next_run_at"] > now:
+            return schedule["next_run_at"], 0
+        missed = math.floor((now - schedule["next_run_at"]) / schedule["interval_seconds"]) + 1
+        return schedule["next_run_at"] + missed * schedule["interval_seconds"], missed
+
+    def tick(self, now: float = None) -> list[dict]:
+        """
+        Dispatch the due schedules once.
+
+        :return: The jobs submitted by this pass.
+        """
+        with self.__lock:
+            now = now if now is not None else time.time()
+            running = 0
+            due = []
+            for schedule in self.store.list_schedules(enabled_only=True):
+                busy = self.is_running(schedule)
+                running += busy
+                next_run_at, occurrences = self.next_occurrence(schedule, now)
+                if not occurrences and not schedule["pending"]:
+                    continue
+                if busy:
+                    if occurrences and schedule["overlap"] == "coalesce":
+                        self.store.update_schedule(schedule["schedule_id"], next_run_at=next_run_at, pending=1)
+                        self.store.increment(schedule["schedule_id"], "coalesced", occurrences)
+                        print(f"Recurring scan {schedule['name']} is still running, coalescing {occurrences} run(s).")
+                    elif occurrences:
+                        self.store.update_schedule(schedule["schedule_id"], next_run_at=next_run_at)
+                        self.store.increment(schedule["schedule_id"], "skipped", occurrences)
+                        print(f"Recurring scan {schedule['name']} is still running, skipping {occurrences} run(s).")
+                    continue
+                heapq.heappush(due, (-schedule["priority"], min(schedule["next_run_at"], now), schedule["schedule_id"], schedule))
+
+            jobs = []
+            while due and running < self.max_running:
+                *_, schedule = heapq.heappop(due)
+                job = self.dispatch(schedule, now)
+                if job is not None:
+                    jobs.append(job)
+                    running += 1
+            return jobs
+
+    def dispatch(self, schedule: dict, now: float) -> dict | None:
+        """
+        Submit one run of a schedule, without the targets scanned too recently.
+
+        :return: The submitted job, or None when the run was deferred.
+        """
+        next_run_at, _ = self.next_occurrence(schedule, now)
+        request = schedule["request"]
+        targets = request["scanner"]["target"]
+        min_interval = max(schedule["min_target_interval"], self.min_target_interval)
+        if min_interval:
+            last_runs = self.store.target_runs(targets)
+            targets = [target for target in targets if now - last_runs.get(target, -math.inf) >= min_interval]
+
+        if not targets:
+            print(f"Deferring recurring scan {schedule['name']}: all its targets were scanned less than {min_interval}s ago.")
+            self.store.update_schedule(schedule["schedule_id"], next_run_at=next_run_at, pending=0)
+            self.store.increment(schedule["schedule_id"], "deferred")
+            return None
+
+        run_request = {**request, "scanner": {**request["scanner"], "target": targets}}
+        kind = "scan" if request.get("interpretor") else "nmap_scan"
+        job = self.job_manager.submit(kind, run_request)
+        self.store.record_target_runs(targets, now)
+        self.store.update_schedule(
+            schedule["schedule_id"],
+            next_run_at=next_run_at,
+            pending=0,
+            last_job_id=job["job_id"],
+            last_run_at=self.store.format_time(now)
+        )
+        self.store.increment(schedule["schedule_id"], "runs")
+        print(f"Started recurring scan {schedule['name']} on {len(targets)} target(s) as job {job['job_id']}")
+        return job
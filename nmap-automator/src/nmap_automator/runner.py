@@ -1,10 +1,66 @@
 # src/nmap_automator/runner.py
-from nmap_automator.server import create_api_server
+import argparse
+import signal
 
 
-def main():
-    app = create_api_server()
-    app.run(host="127.0.0.1", port=5000, debug=True)
+def run_server():
+    from dotenv import load_dotenv
+    from werkzeug.serving import is_running_from_reloader
+    from nmap_automator.config_loader import ServerConfig
+    from nmap_automator.server import create_api_server
+
+    debug = True
+    load_dotenv()
+    server_conf = ServerConfig.from_env()
+    if debug and not is_running_from_reloader():
+        # With the reloader, this process only watches the sources and restarts a child process
+        # that serves the API: only that child runs the scheduler, so due scans fire once
+        server_conf = server_conf.model_copy(update={"scheduler_enabled": False})
+    app = create_api_server(server_conf)
+    app.run(host="127.0.0.1", port=5000, debug=debug)
+
+
+def run_worker(args: argparse.Namespace):
+    from dotenv import load_dotenv
+    from nmap_automator.config_loader import ServerConfig
+    from nmap_automator.distributed import ShardWorker, SqliteShardQueue
+
+    load_dotenv()
+    server_conf = ServerConfig.from_env()
+    queue_path = args.queue or server_conf.shard_queue
+    if not queue_path:
+        raise SystemExit("No shard queue: pass --queue or set NMAP_AUTOMATOR_SHARD_QUEUE.")
+    worker = ShardWorker(
+        SqliteShardQueue(queue_path),
+        worker_id=args.worker_id,
+        lease_seconds=args.lease or server_conf.worker_lease_seconds,
+        poll_interval=args.poll_interval
+    )
+    # Finish cleanly on `kill`: the running shard is handed back to the queue
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run(max_shards=args.max_shards, exit_when_idle=args.exit_when_idle)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog="nmap-automator")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("server", help="Run the API server (default).")
+    worker = subparsers.add_parser("worker", help="Scan the shards queued by the API server.")
+    worker.add_argument("--queue", help="SQLite file of the shard queue (defaults to NMAP_AUTOMATOR_SHARD_QUEUE).")
+    worker.add_argument("--worker-id", help="Unique name of the worker (defaults to <hostname>-<pid>-<random>).")
+    worker.add_argument("--lease", type=float, help="Lease duration in seconds (defaults to NMAP_AUTOMATOR_WORKER_LEASE_SECONDS).")
+    worker.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between two polls of an empty queue.")
+    worker.add_argument("--max-shards", type=int, help="Stop after scanning this many shards.")
+    worker.add_argument("--exit-when-idle", action="store_true", help="Stop as soon as the queue is empty.")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        run_worker(args)
+    else:
+        run_server()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
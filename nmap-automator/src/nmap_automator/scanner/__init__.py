@@ -1,2 +1,7 @@
 # src/nmap_automator/scanner/__init__.py
-from .nmap_scanner import NmapScanner
\ No newline at end of file
+from .nmap_scanner import NmapScanner
+from .scan_executor import ScanExecutor, CancelToken
+from .xml_parser import NmapXmlParser, HostRecord, PortRecord, iter_hosts, iter_hosts_from_file
+from .target_planner import TargetPlanner, TargetPlan, normalize_target
+from .shard_pool import ShardPool, split_range
+from .governor import ScanGovernor, GovernedScan
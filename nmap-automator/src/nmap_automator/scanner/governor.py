@@ -0,0 +1,213 @@
+import statistics
+import threading
+import uuid
+
+
+class _CountingSemaphore:
+    """BoundedSemaphore that counts how often an acquisition had to wait for a free slot."""
+
+    def __init__(self, value: int) -> None:
+        self.__semaphore = threading.BoundedSemaphore(value)
+        self.value = value
+        self.in_use = 0
+        self.waits = 0
+        self.__lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = None) -> bool:
+        acquired = self.__semaphore.acquire(blocking=False)
+        if not acquired and blocking:
+            with self.__lock:
+                self.waits += 1
+            acquired = self.__semaphore.acquire(timeout=timeout)
+        if acquired:
+            with self.__lock:
+                self.in_use += 1
+        return acquired
+
+    def release(self) -> None:
+        with self.__lock:
+            self.in_use -= 1
+        self.__semaphore.release()
+
+
+class GovernedScan:
+    """
+    Limits of one scan, handed out by ScanGovernor.track().
+
+    It stands in for the server-wide scan slots in the executors of the scan, so that it
+    knows how many nmap processes the scan is running, and it records every limit the
+    scan hit: hosts nmap gave up on, targets whose nmap process was killed, the job
+    timeout, waits for a free process slot and decreases of the packet rate.
+    """
+
+    # Bounds of the factor applied to the packet rate share of the scan
+    MIN_RATE_FACTOR = 0.1
+    MAX_RATE_FACTOR = 1.0
+    # A median RTT this many times above the best one seen is read as congestion
+    RTT_INFLATION = 2.0
+
+    def __init__(self, governor: "ScanGovernor", scan_id: str, host_timeout: int = None, target_timeout: int = None, job_timeout: int = None, max_rate: int = None) -> None:
+        self.governor = governor
+        self.scan_id = scan_id
+        self.host_timeout = host_timeout
+        self.target_timeout = target_timeout
+        self.job_timeout = job_timeout
+        self.max_rate = max_rate
+        self.running = 0
+        self.rate_factor = self.MAX_RATE_FACTOR
+        self.baseline_rtt = None
+        self.job_timed_out = False
+        self.host_timeouts = 0
+        self.timed_out_targets = []
+        self.process_waits = 0
+        self.rate_decreases = 0
+        self.rates = []
+        self.__lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = None) -> bool:
+        slots = self.governor.process_slots
+        waits = slots.waits
+        acquired = slots.acquire(blocking=blocking, timeout=timeout)
+        with self.__lock:
+            if slots.waits != waits:
+                self.process_waits += 1
+            if acquired:
+                self.running += 1
+        return acquired
+
+    def release(self) -> None:
+        with self.__lock:
+            self.running = max(0, self.running - 1)
+        self.governor.process_slots.release()
+
+    def arguments(self, arguments: str, processes: int = None) -> str:
+        """
+        Append the --host-timeout and --max-rate options of the scan to nmap `arguments`.
+
+        :param arguments: Nmap arguments of the scan.
+        :param processes: Number of nmap processes sharing the rate (defaults to the running ones).
+        """
+        extra = []
+        if self.host_timeout:
+            extra.append(f"--host-timeout {self.host_timeout}s")
+        rate = self.governor.rate_for(self, processes if processes is not None else self.running)
+        if rate is not None:
+            with self.__lock:
+                self.rates.append(rate)
+            extra.append(f"--max-rate {rate}")
+        return " ".join([arguments] + extra)
+
+    def observe(self, target: str, stats: dict, timed_out: bool = False) -> None:
+        """
+        Record the measurements of a finished nmap run and adapt the packet rate of the scan.
+
+        The rate share is halved when nmap reported dropped probes or when the median RTT of
+        the run inflated well above the best one seen by the scan, and grows back slowly
+        (additive increase) otherwise.
+
+        :param target: Target of the run.
+        :param stats: NmapScanner.run_stats of the run.
+        :param timed_out: Whether the nmap process was killed by the target timeout.
+        """
+        with self.__lock:
+            self.host_timeouts += stats.get("host_timeouts", 0)
+            if timed_out:
+                self.timed_out_targets.append(target)
+            srtt = stats.get("srtt") or []
+            if not srtt and not stats.get("dropped_probes"):
+                return
+            median = statistics.median(srtt) if srtt else None
+            if median is not None:
+                self.baseline_rtt = median if self.baseline_rtt is None else min(self.baseline_rtt, median)
+            congested = stats.get("dropped_probes", 0) > 0 or (median is not None and median > self.RTT_INFLATION * self.baseline_rtt)
+            if congested:
+                self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+                self.rate_decreases += 1
+            else:
+                self.rate_factor = min(self.MAX_RATE_FACTOR, round(self.rate_factor + 0.1, 2))
+
+    def report(self) -> dict:
+        """Limits of the scan and the ones it hit, as returned by the API."""
+        return {
+            "host_timeout": self.host_timeout,
+            "target_timeout": self.target_timeout,
+            "job_timeout": self.job_timeout,
+            "packet_rate": {
+                "budget": self.governor.packet_rate or None,
+                "max_rate": self.max_rate,
+                "min_applied": min(self.rates) if self.rates else None,
+                "last_applied": self.rates[-1] if self.rates else None,
+                "rate_factor": self.rate_factor,
+                "decreases": self.rate_decreases
+            },
+            "hit": {
+                "host_timeouts": self.host_timeouts,
+                "target_timeouts": list(self.timed_out_targets),
+                "job_timeout": self.job_timed_out,
+                "process_cap_waits": self.process_waits
+            }
+        }
+
+
+class ScanGovernor:
+    """
+    Server-wide limits of the nmap processes.
+
+    - At most `max_processes` nmap processes run at once (`process_slots` replaces the
+      former scan slots semaphore and is shared by every executor and the shard pool).
+    - `packet_rate` packets per second are shared evenly between the active scans; the share of a
+      scan is split between its running nmap processes and passed to nmap as `--max-rate`.
+    """
+
+    # nmap gets at least this many packets per second, however many scans share the budget
+    MIN_PROCESS_RATE = 10
+
+    def __init__(self, max_processes: int = 4, packet_rate: int = 0) -> None:
+        """
+        :param max_processes: Maximum number of nmap processes running at once.
+        :param packet_rate: Packets per second shared by all scans (0 for no budget).
+        """
+        self.process_slots = _CountingSemaphore(max_processes)
+        self.packet_rate = packet_rate
+        self.__scans: dict[int, GovernedScan] = {}
+        self.__lock = threading.Lock()
+
+    def track(self, scan_id: str = None, host_timeout: int = None, target_timeout: int = None, job_timeout: int = None, max_rate: int = None) -> GovernedScan:
+        """Register an active scan; call `untrack()` once it is over."""
+        governed = GovernedScan(self, scan_id or uuid.uuid4().hex, host_timeout, target_timeout, job_timeout, max_rate)
+        with self.__lock:
+            self.__scans[id(governed)] = governed
+        return governed
+
+    def untrack(self, governed: GovernedScan) -> None:
+        with self.__lock:
+            self.__scans.pop(id(governed), None)
+
+    def rate_for(self, governed: GovernedScan, processes: int) -> int | None:
+        """
+        Packets per second one nmap process of `governed` may send, or None when unlimited.
+
+        :param governed: Scan the process belongs to.
+        :param processes: Number of nmap processes of the scan sharing its rate.
+        """
+        if not self.packet_rate and not governed.max_rate:
+            return None
+        with self.__lock:
+            active = max(1, len(self.__scans))
+        share = self.packet_rate / active if self.packet_rate else governed.max_rate
+        if governed.max_rate:
+            share = min(share, governed.max_rate)
+        rate = share * governed.rate_factor / max(1, processes)
+        return max(self.MIN_PROCESS_RATE, int(rate))
+
+    def stats(self) -> dict:
+        with self.__lock:
+            scans = list(self.__scans.values())
+        return {
+            "max_processes": self.process_slots.value,
+            "running_processes": self.process_slots.in_use,
+            "process_cap_waits": self.process_slots.waits,
+            "packet_rate_budget": self.packet_rate or None,
+            "active_scans": len(scans),
+            "rate_factors": {scan.scan_id: scan.rate_factor for scan in scans}
+        }
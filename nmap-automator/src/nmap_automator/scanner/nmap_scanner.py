@@ -1,18 +1,149 @@
 import os
-import csv
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from typing import Iterator
 import nmap
 
+from .xml_parser import HostRecord, PortRecord, iter_hosts
+
 class NmapScanner:
-    def __init__(self):
-        self.__scanner = nmap.PortScanner()
+    """
+    Runs nmap and turns its output into port records.
 
-    def __run_scan(self, target: str, arguments: str) -> list[dict]:
+    Two backends are available:
+    - "native" (default): nmap's XML output is parsed incrementally, host by host.
+    - "python-nmap": the whole output is parsed by `nmap.PortScanner` (previous behaviour).
+    """
+
+    BACKENDS = ("native", "python-nmap")
+
+    # TCP scan types, of which nmap runs one per scan
+    TCP_SCAN_TYPES = ("-sS", "-sT", "-sA", "-sW", "-sM", "-sN", "-sF", "-sX")
+    # Options choosing the ports to scan that take a value, besides -p
+    PORT_OPTIONS = ("--top-ports", "--port-ratio", "--exclude-ports")
+
+    # nmap warns on stderr when it gives up retransmitting probes, a sign the network drops packets
+    DROPPED_PROBES = re.compile(r"giving up on port because retransmission cap hit|Increasing send delay", re.IGNORECASE)
+
+    def __init__(self, backend: str = "native", timeout: float = None):
+        """
+        :param backend: "native" or "python-nmap".
+        :param timeout: Optional number of seconds after which a running nmap process is killed.
+            The hosts nmap had already finished are still returned.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unsupported scanner backend: {backend}")
+        self.backend = backend
+        self.timeout = timeout
+        # PortScanner probes the nmap binary on creation, so only build it when it is used
+        self.__scanner = nmap.PortScanner() if backend == "python-nmap" else None
+        self.__nmap_path = shutil.which("nmap") or "nmap"
+        self.__process = None
+        self.__cancelled = False
+        self.__timed_out = False
+        self.__error = None
+        self.__timer = None
+        self.__lock = threading.Lock()
+        self.run_stats = self.__empty_stats()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancelled
+
+    @property
+    def timed_out(self) -> bool:
+        """Whether the last nmap run was killed because it exceeded `timeout`."""
+        return self.__timed_out
+
+    @property
+    def error(self) -> str | None:
+        """Why the last scan failed, None when nmap ran."""
+        return self.__error
+
+    @staticmethod
+    def __empty_stats() -> dict:
+        # Measurements of the last nmap run: host RTTs (microseconds), hosts nmap gave up on
+        # because of --host-timeout, and warnings about dropped probes
+        return {"srtt": [], "host_timeouts": 0, "dropped_probes": 0}
+
+    def __expire(self, process: subprocess.Popen) -> None:
+        with self.__lock:
+            if process.poll() is None:
+                print(f"Nmap process exceeded its {self.timeout}s timeout, terminating it.")
+                self.__timed_out = True
+                process.terminate()
+
+    def __stop_timer(self) -> None:
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def __record_stderr(self, nmap_err: bytes) -> None:
+        self.run_stats["dropped_probes"] += len(self.DROPPED_PROBES.findall(nmap_err.decode(errors="replace")))
+
+    def __record_host(self, host: HostRecord) -> None:
+        if host.srtt:
+            self.run_stats["srtt"].append(host.srtt)
+        if host.timed_out:
+            self.run_stats["host_timeouts"] += 1
+
+    def cancel(self) -> None:
+        """Stop the running scan by terminating its nmap subprocess."""
+        with self.__lock:
+            self.__cancelled = True
+            if self.__process is not None and self.__process.poll() is None:
+                print("Terminating running Nmap process.")
+                self.__process.terminate()
+
+    def __start_nmap(self, target: str, arguments: str, stderr=subprocess.PIPE, resume_log: str = None) -> subprocess.Popen | None:
+        # Launch nmap ourselves (instead of PortScanner.scan) so the process can be cancelled
+        if resume_log is not None and self.can_resume(resume_log):
+            # nmap reads the original arguments (including -oX - and -oG) back from the log
+            args = [self.__nmap_path, "--resume", resume_log]
+        else:
+            args = [self.__nmap_path, "-oX", "-"] + shlex.split(target) + shlex.split(arguments)
+            if resume_log is not None:
+                args += ["-oG", resume_log]
+        with self.__lock:
+            if self.__cancelled:
+                return None
+            self.__process = subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=stderr
+            )
+            self.__timed_out = False
+            self.run_stats = self.__empty_stats()
+            if self.timeout:
+                self.__timer = threading.Timer(self.timeout, self.__expire, args=(self.__process,))
+                self.__timer.daemon = True
+                self.__timer.start()
+            return self.__process
+
+    def __run_python_nmap(self, target: str, arguments: str) -> list[dict]:
+        process = self.__start_nmap(target, arguments)
+        if process is None:
+            return []
         try:
-            print(f"Starting Nmap scan on target: {target} with arguments: {arguments}")
-            self.__scanner.scan(hosts=target, arguments=arguments)
-        except Exception as e:
-            print(f"Error running Nmap scan: {e}")
+            nmap_output, nmap_err = process.communicate()
+        finally:
+            self.__stop_timer()
+        self.__record_stderr(nmap_err)
+        if self.__cancelled:
             return []
+        if self.__timed_out:
+            # python-nmap cannot parse a truncated document, so nothing of the run is kept
+            return []
+        self.__scanner.analyse_nmap_xml_scan(
+            nmap_xml_output=nmap_output.decode(errors="replace"),
+            nmap_err=nmap_err.decode(errors="replace")
+        )
 
         results = []
         for host in self.__scanner.all_hosts():
@@ -30,39 +161,206 @@ class NmapScanner:
                     })
         return results
 
-    def __save_results_to_csv(self, results: list[dict], filename: str, subdomain: str) -> None:
-        if results:
-            # Add Subdomain information to each result
-            for result in results:
-                result["Subdomain"] = subdomain
-
-            dirs = os.path.dirname(filename)
-            if dirs:
-                os.makedirs(dirs, exist_ok=True)
-
-            keys = results[0].keys()
-            with open(filename, 'w', newline='') as output_file:
-                dict_writer = csv.DictWriter(output_file, fieldnames=keys)
-                dict_writer.writeheader()
-                dict_writer.writerows(results)
-            print(f"Results saved to: {filename}")
+    @staticmethod
+    def can_resume(resume_log: str) -> bool:
+        """Whether `resume_log` is the grepable log of an nmap run that was interrupted before the end."""
+        try:
+            with open(resume_log, errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return False
+        return bool(lines) and lines[0].startswith("# Nmap") and not any(line.startswith("# Nmap done") for line in lines)
+
+    @staticmethod
+    def grepable_hosts(resume_log: str) -> list[HostRecord]:
+        """
+        Hosts recorded in a grepable (`-oG`) nmap log.
+
+        The grepable format merges product and version, so both end up in `product`.
+        """
+        hosts = {}
+        try:
+            with open(resume_log, errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+        for line in lines:
+            fields = dict(field.split(": ", 1) for field in line.split("\t") if ": " in field)
+            if "Host" not in fields or "Ports" not in fields:
+                continue
+            ip = fields["Host"].split(" ", 1)[0]
+            ports = []
+            for entry in fields["Ports"].split(", "):
+                parts = entry.split("/")
+                if len(parts) < 7 or not parts[0].isdigit():
+                    continue
+                ports.append(PortRecord(ip, parts[2], int(parts[0]), parts[1], parts[4], parts[6], ""))
+            hosts[ip] = HostRecord(ip, "up", (), tuple(ports))
+        return list(hosts.values())
+
+    def iter_hosts(self, target: str, arguments: str = "-A -T3 -v", resume_log: str = None) -> Iterator[HostRecord]:
+        """
+        Run nmap with `-oX -` and yield each host as soon as nmap has finished it.
+
+        The XML output is parsed incrementally, so only one host is held in memory at a
+        time. Closing the generator early terminates the nmap process.
+
+        With `resume_log`, nmap also writes a grepable log there. If that log belongs to an
+        interrupted run, the run is continued with `nmap --resume` instead: only the hosts
+        nmap had not finished are scanned (and yielded).
+
+        :param target: Target IP, hostname, or range.
+        :param arguments: Nmap arguments (e.g., "-A -T3 -v").
+        :param resume_log: Optional path of the log nmap resumes interrupted runs from.
+        :return: Generator of compact HostRecord tuples.
+        """
+        # stderr goes to a temporary file so a chatty nmap can never block on a full pipe
+        with tempfile.TemporaryFile() as nmap_err:
+            process = self.__start_nmap(target, arguments, stderr=nmap_err, resume_log=resume_log)
+            if process is None:
+                return
+
+            hosts = 0
+            malformed = None
+            try:
+                for host in iter_hosts(process.stdout):
+                    hosts += 1
+                    self.__record_host(host)
+                    yield host
+                process.wait()
+            except ET.ParseError as e:
+                # A terminated nmap leaves a truncated document behind
+                if self.__cancelled or self.__timed_out:
+                    return
+                # A failing nmap writes no document at all: its exit status and stderr tell why
+                malformed = e
+            finally:
+                self.__stop_timer()
+                if process.poll() is None:
+                    process.terminate()
+                    process.wait()
+                nmap_err.seek(0)
+                errors = nmap_err.read()
+                self.__record_stderr(errors)
+
+            if process.returncode != 0 and hosts == 0 and not self.__cancelled and not self.__timed_out:
+                raise RuntimeError(errors.decode(errors="replace").strip() or f"nmap exited with code {process.returncode}")
+            if malformed is not None:
+                raise malformed
+
+    def __run_scan(self, target: str, arguments: str) -> list[dict]:
+        results = []
+        self.__error = None
+        try:
+            print(f"Starting Nmap scan on target: {target} with arguments: {arguments}")
+            if self.backend == "python-nmap":
+                results = self.__run_python_nmap(target, arguments)
+            else:
+                # Collected host by host so the hosts finished before a timeout are kept
+                for host in self.iter_hosts(target, arguments):
+                    results.extend(port.to_dict() for port in host.ports)
+        except Exception as e:
+            print(f"Error running Nmap scan: {e}")
+            self.__error = str(e)
+            return []
+
+        if self.__cancelled:
+            print(f"Nmap scan on target {target} was cancelled.")
+            return []
+        if self.__timed_out:
+            print(f"Nmap scan on target {target} timed out, keeping {len(results)} results.")
+        return results
+
+    @staticmethod
+    def is_privileged() -> bool:
+        """Whether nmap may send raw packets, which a SYN scan needs (on Unix, only as root)."""
+        return not hasattr(os, "geteuid") or os.geteuid() == 0
+
+    @classmethod
+    def split_port_options(cls, args: list[str]) -> tuple[list[str], list[str]]:
+        """
+        Separate the options choosing the ports to scan (with their values) from the other arguments.
+
+        :return: (port options, other arguments), both in their original order.
+        """
+        port_options, others = [], []
+        args = iter(args)
+        for arg in args:
+            option = arg.split("=", 1)[0]
+            if arg == "-F" or (arg.startswith("-p") and len(arg) > 2):
+                port_options.append(arg)
+            elif arg == "-p" or (option in cls.PORT_OPTIONS and "=" not in arg):
+                port_options.extend([arg, next(args, "")])
+            elif option in cls.PORT_OPTIONS:
+                port_options.append(arg)
+            else:
+                others.append(arg)
+        return port_options, others
+
+    @classmethod
+    def sweep_arguments(cls, arguments: str) -> str:
+        """
+        Arguments of the fast port sweep run before service detection in two-phase scans.
+
+        The sweep keeps the TCP scan type of `arguments`. Without one, it is a SYN scan when
+        nmap runs privileged and a connect scan (-sT) otherwise, as nmap itself defaults to;
+        a UDP-only scan (-sU) stays UDP only. The ports requested (-p, -F, --top-ports, ...)
+        and the UDP scan are kept, so the sweep covers the same ports as a single pass.
+        Service, OS and script detection are dropped.
+        """
+        port_options, args = cls.split_port_options(shlex.split(arguments))
+        scan_types = [arg for arg in args if arg in cls.TCP_SCAN_TYPES][:1]
+        udp = "-sU" in args
+        if not scan_types and not udp:
+            scan_types = ["-sS" if cls.is_privileged() or "--privileged" in args else "-sT"]
+        return shlex.join(scan_types + (["-sU"] if udp else []) + port_options + ["-T4"])
+
+    @classmethod
+    def service_arguments(cls, arguments: str, ports: list[int], udp_ports: list[int] = ()) -> str:
+        """
+        Arguments of the service detection run on hosts found by the sweep, limited to their open ports.
+
+        The port options of `arguments` are replaced by the open ports. The UDP scan is only
+        kept when UDP ports are open, and the TCP scan type only when TCP ports are.
+        Host discovery is skipped (-Pn) since the sweep already found the hosts up.
+        """
+        _, args = cls.split_port_options(shlex.split(arguments))
+        if not udp_ports:
+            args = [arg for arg in args if arg != "-sU"]
+            spec = ",".join(str(port) for port in ports)
         else:
-            print(f"No results to save in {filename}.")
+            if not ports:
+                args = [arg for arg in args if arg not in cls.TCP_SCAN_TYPES]
+            spec = ",".join([f"T:{port}" for port in ports] + [f"U:{port}" for port in udp_ports])
+        return shlex.join(args + ["-Pn", "-p", spec])
 
-    def scan(self, target: str, arguments: str = "-A -T3 -v", save_dir: str = "./results") -> list[dict]:
+    def stream(self, target: str, arguments: str = "-A -T3 -v"):
+        """
+        Run an Nmap scan and yield each host as soon as nmap has finished it.
+
+        Closing the generator early (e.g. when an API client disconnects) terminates
+        the nmap process.
+
+        :param target: Target IP, hostname, or range.
+        :param arguments: Nmap arguments (e.g., "-A -T3 -v").
+        :return: Generator of host dictionaries ({"IP", "status", "hostnames", "results"}).
+        """
+        print(f"Starting streaming Nmap scan on target: {target} with arguments: {arguments}")
+        for host in self.iter_hosts(target, arguments):
+            yield host.to_dict(subdomain=target)
+
+    def scan(self, target: str, arguments: str = "-A -T3 -v") -> list[dict]:
         """
         Perform an Nmap scan on the specified target using the given arguments.
         
         :param target: Target IP, hostname, or range.
         :param arguments: Nmap arguments (e.g., "-A -T3 -v").
-        :param save_dir: Directory to save scan results.
         :return: List of results as dictionaries.
         """
-        initial_results_file = os.path.join(save_dir, "initial_scan_results.csv")
-
         # Run the scan
         results = self.__run_scan(target, arguments)
 
-        # Save the results
-        self.__save_results_to_csv(results, initial_results_file, subdomain=target)
+        # Add Subdomain information to each result
+        for result in results:
+            result["Subdomain"] = target
         return results
@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class CancelToken:
+    """
+    Shared cancellation flag for a scan that spans several targets.
+
+    Scanners register themselves while they run so that `cancel()` can terminate
+    their nmap subprocesses; targets that have not started yet are skipped.
+    """
+
+    def __init__(self) -> None:
+        self.__event = threading.Event()
+        self.__scanners = set()
+        self.__lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__event.is_set()
+
+    def register(self, scanner) -> None:
+        with self.__lock:
+            self.__scanners.add(scanner)
+        if self.cancelled:
+            scanner.cancel()
+
+    def unregister(self, scanner) -> None:
+        with self.__lock:
+            self.__scanners.discard(scanner)
+
+    def cancel(self) -> None:
+        self.__event.set()
+        with self.__lock:
+            scanners = list(self.__scanners)
+        for scanner in scanners:
+            scanner.cancel()
+
+
+class ScanExecutor:
+    """
+    Runs a scan function over many targets at once.
+
+    Every target runs in its own worker thread (and therefore its own nmap
+    subprocess). A failing target only produces an error entry for itself,
+    and results are always returned in the order the targets were given.
+    """
+
+    def __init__(
+        self,
+        scan_fn: Callable[[str], dict],
+        concurrency: int = 4,
+        scan_slots: threading.Semaphore = None,
+        cancel_token: CancelToken = None,
+        on_result: Callable[[dict], None] = None
+    ) -> None:
+        """
+        :param scan_fn: Callable scanning a single target and returning its result dictionary.
+        :param concurrency: Maximum number of targets scanned in parallel by this executor.
+        :param scan_slots: Optional server-wide semaphore shared with other executors.
+        :param cancel_token: Optional token used to skip the targets that have not started yet.
+        :param on_result: Optional callback invoked with each target result as soon as it completes.
+        """
+        self.scan_fn = scan_fn
+        self.concurrency = max(1, concurrency)
+        self.scan_slots = scan_slots
+        self.cancel_token = cancel_token
+        self.on_result = on_result
+
+    def _scan_target(self, target: str) -> dict:
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            return {"target": target, "error": "Scan cancelled.", "cancelled": True, "elapsed_seconds": 0.0}
+        if self.scan_slots is not None:
+            self.scan_slots.acquire()
+        # Timing starts once a slot is available, so queueing time is not counted
+        start = time.perf_counter()
+        try:
+            result = self.scan_fn(target)
+        except Exception as e:
+            print(f"Error scanning target {target}: {e}")
+            result = {"target": target, "error": str(e)}
+        finally:
+            if self.scan_slots is not None:
+                self.scan_slots.release()
+        result["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _run_target(self, target: str) -> dict:
+        result = self._scan_target(target)
+        if self.on_result is not None:
+            self.on_result(result)
+        return result
+
+    def run(self, targets: list[str]) -> list[dict]:
+        """
+        Scan all targets and return one result per target, in input order.
+
+        :param targets: List of targets (IPs, hostnames or ranges).
+        :return: List of result dictionaries, each carrying its own `elapsed_seconds`.
+        """
+        if not targets:
+            return []
+
+        workers = min(self.concurrency, len(targets))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nmap-scan") as pool:
+            # map() keeps the input order regardless of completion order
+            return list(pool.map(self._run_target, targets))
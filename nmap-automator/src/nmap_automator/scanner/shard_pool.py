@@ -0,0 +1,196 @@
+import collections
+import ipaddress
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable
+
+from .nmap_scanner import NmapScanner
+from .scan_executor import CancelToken
+
+
+def split_range(target: str, shard_size: int) -> list[str]:
+    """
+    Split a CIDR range larger than `shard_size` addresses into ranges of `shard_size` addresses.
+
+    Other targets (and ranges that are small enough) are returned as a single shard.
+    """
+    try:
+        network = ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return [target]
+    if network.num_addresses <= shard_size:
+        return [target]
+    new_prefix = network.max_prefixlen - (shard_size.bit_length() - 1)
+    return [str(subnet) for subnet in network.subnets(new_prefix=new_prefix)]
+
+
+def scan_shard(shard: str, arguments: str, backend: str, cancel_flag: str) -> dict:
+    """
+    Scan one shard in a worker process.
+
+    The nmap process is terminated as soon as the `cancel_flag` file exists.
+    """
+    scanner = NmapScanner(backend=backend)
+    done = threading.Event()
+
+    def watch_cancel() -> None:
+        while not done.wait(0.2):
+            if os.path.exists(cancel_flag):
+                scanner.cancel()
+                return
+
+    if os.path.exists(cancel_flag):
+        return {"shard": shard, "error": "Scan cancelled.", "cancelled": True}
+    threading.Thread(target=watch_cancel, daemon=True).start()
+    start = time.perf_counter()
+    try:
+        results = scanner.scan(target=shard, arguments=arguments)
+    finally:
+        done.set()
+    if scanner.error is not None and not scanner.cancelled:
+        # A failed nmap run is not an empty shard: report it, so it is neither journaled nor cached
+        return {"shard": shard, "error": f"nmap failed: {scanner.error}"}
+    return {
+        "shard": shard,
+        "results": results,
+        "cancelled": scanner.cancelled,
+        "elapsed_seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+class _FlagCanceller:
+    """Lets a CancelToken cancel the shards of one run, through a flag file seen by the worker processes."""
+
+    def __init__(self) -> None:
+        fd, self.path = tempfile.mkstemp(prefix="nmap-shards-", suffix=".cancel")
+        os.close(fd)
+        os.remove(self.path)
+
+    @property
+    def cancelled(self) -> bool:
+        return os.path.exists(self.path)
+
+    def cancel(self) -> None:
+        open(self.path, "a").close()
+
+    def close(self) -> None:
+        if self.cancelled:
+            os.remove(self.path)
+
+
+class ShardPool:
+    """
+    Scans the shards of large ranges across worker processes.
+
+    Each nmap run of a shard is driven (and its XML output parsed) by its own process, so
+    parsing is not limited to one core. Shards are handed out one at a time from a shared
+    queue: a worker takes the next pending shard as soon as it is done with its previous
+    one, so a slow subnet only holds up the worker scanning it.
+
+    The worker processes are started on first use and reused by every later run.
+    """
+
+    def __init__(self, workers: int = 4, scan_slots: threading.Semaphore = None) -> None:
+        """
+        :param workers: Number of worker processes.
+        :param scan_slots: Optional server-wide semaphore; every running shard holds a slot.
+        """
+        self.workers = max(1, workers)
+        self.scan_slots = scan_slots
+        self.__pool = None
+        self.__lock = threading.Lock()
+
+    def __get_pool(self) -> ProcessPoolExecutor:
+        with self.__lock:
+            if self.__pool is None:
+                # Worker processes are spawned rather than forked, since the server process runs threads
+                self.__pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.__pool
+
+    def shutdown(self) -> None:
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.shutdown(cancel_futures=True)
+                self.__pool = None
+
+    def __acquire_slot(self, blocking: bool) -> bool:
+        if self.scan_slots is None:
+            return True
+        return self.scan_slots.acquire(blocking=blocking)
+
+    def __release_slot(self) -> None:
+        if self.scan_slots is not None:
+            self.scan_slots.release()
+
+    def run(
+        self,
+        shards: list[str],
+        arguments: str,
+        backend: str = "native",
+        cancel_token: CancelToken = None,
+        on_shard_start: Callable[[str], None] = None,
+        on_shard_done: Callable[[dict], None] = None
+    ) -> list[dict]:
+        """
+        Scan every shard and return one result per shard, in input order.
+
+        :param shards: Targets to scan (usually the output of `split_range`).
+        :param arguments: Nmap arguments.
+        :param backend: NmapScanner backend used by the workers.
+        :param cancel_token: Optional token skipping pending shards and terminating running ones.
+        :param on_shard_start: Optional callback invoked with each shard as it starts.
+        :param on_shard_done: Optional callback invoked with each shard result as it completes.
+        :return: List of {"shard", "results", "cancelled", "elapsed_seconds"} (or {"shard", "error"}).
+        """
+        if not shards:
+            return []
+
+        pool = self.__get_pool()
+        canceller = _FlagCanceller()
+        if cancel_token is not None:
+            cancel_token.register(canceller)
+
+        pending = collections.deque(shards)
+        results = {}
+        in_flight = {}
+
+        def finish(result: dict) -> None:
+            results[result["shard"]] = result
+            if on_shard_done is not None:
+                on_shard_done(result)
+
+        try:
+            while pending or in_flight:
+                if canceller.cancelled:
+                    while pending:
+                        finish({"shard": pending.popleft(), "error": "Scan cancelled.", "cancelled": True})
+                # Hand shards to idle workers only, so the others stay in the shared queue
+                while pending and len(in_flight) < self.workers and self.__acquire_slot(blocking=not in_flight):
+                    shard = pending.popleft()
+                    if on_shard_start is not None:
+                        on_shard_start(shard)
+                    in_flight[pool.submit(scan_shard, shard, arguments, backend, canceller.path)] = shard
+                if not in_flight:
+                    continue
+
+                done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = in_flight.pop(future)
+                    self.__release_slot()
+                    try:
+                        finish(future.result())
+                    except Exception as e:
+                        print(f"Error scanning shard {shard}: {e}")
+                        finish({"shard": shard, "error": str(e)})
+        finally:
+            for future in in_flight:
+                future.cancel()
+                self.__release_slot()
+            if cancel_token is not None:
+                cancel_token.unregister(canceller)
+            canceller.close()
+        return [results[shard] for shard in shards]
@@ -0,0 +1,165 @@
+import re
+import socket
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+# A DNS name made of letters, digits and hyphens (e.g. "mail.megacorpone.com")
+_HOSTNAME = re.compile(r"^(?=.{1,253}$)([a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?)(\.[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?)*$")
+
+
+def normalize_target(target: str) -> str:
+    """Canonical form of a target: lowercase hostnames without trailing dot, compressed IPs and CIDRs."""
+    target = target.strip().lower().rstrip(".")
+    try:
+        return str(ipaddress.ip_address(target))
+    except ValueError:
+        pass
+    try:
+        return str(ipaddress.ip_network(target, strict=False))
+    except ValueError:
+        return target
+
+
+def resolve_ipv4(name: str) -> str | None:
+    """First IPv4 address of a name, which is the address nmap itself scans for it."""
+    try:
+        return socket.getaddrinfo(name, None, family=socket.AF_INET, type=socket.SOCK_STREAM)[0][4][0]
+    except (socket.gaierror, UnicodeError, IndexError):
+        return None
+
+
+class TargetPlan:
+    """
+    The targets to scan for a list of requested targets, and how to attribute the results back.
+
+    Every requested target is covered by exactly one scan target: itself, the IP its name
+    resolves to, or a larger range containing it.
+    """
+
+    def __init__(self, requested_count: int) -> None:
+        self.requested_count = requested_count
+        # Requested target -> (scan target, network to keep the rows of, or None for all rows)
+        self.routes: dict[str, tuple[str, ipaddress.IPv4Network | ipaddress.IPv6Network | None]] = {}
+        self.unresolved: list[str] = []
+        self.__by_scan_target = None
+
+    @property
+    def requested(self) -> list[str]:
+        return list(self.routes)
+
+    @property
+    def scan_targets(self) -> list[str]:
+        return list(dict.fromkeys(scan_target for scan_target, _ in self.routes.values()))
+
+    def requested_by(self, scan_target: str) -> list[str]:
+        """Requested targets covered by a scan target."""
+        if self.__by_scan_target is None:
+            self.__by_scan_target = {}
+            for requested, (target, _) in self.routes.items():
+                self.__by_scan_target.setdefault(target, []).append(requested)
+        return self.__by_scan_target.get(scan_target, [])
+
+    def fan_out(self, requested: str, scan_result: dict) -> dict:
+        """
+        Result of a requested target, taken from the result of the scan target covering it.
+
+        Rows are limited to the addresses of the requested target and attributed to it (`Subdomain`).
+        """
+        scan_target, network = self.routes[requested]
+        result = {**scan_result, "target": requested}
+        if scan_target != requested:
+            result["scanned_as"] = scan_target
+        if "results" in scan_result:
+            result["results"] = [
+                dict(row, Subdomain=requested) for row in scan_result["results"]
+                if network is None or ipaddress.ip_address(row["IP"]) in network
+            ]
+        return result
+
+    def fan_out_host(self, requested: str, host: dict) -> dict | None:
+        """
+        A host of the scan target covering `requested`, as seen by `requested`.
+
+        :param host: Host dictionary ({"IP", "status", "hostnames", "results"}).
+        :return: The host with its rows attributed to `requested`, None when it is not part of `requested`.
+        """
+        _, network = self.routes[requested]
+        if network is not None and ipaddress.ip_address(host["IP"]) not in network:
+            return None
+        return {**host, "results": [dict(row, Subdomain=requested) for row in host["results"]]}
+
+    def stats(self) -> dict:
+        planned = len(self.scan_targets)
+        return {
+            "requested": self.requested_count,
+            "unique": len(self.routes),
+            "planned": planned,
+            "deduplicated": self.requested_count - planned,
+            "unresolved": self.unresolved
+        }
+
+
+class TargetPlanner:
+    """
+    Plans the nmap runs of a list of targets so that nothing is scanned twice.
+
+    - Targets are normalized (case, trailing dot, IP and CIDR notation) and deduplicated.
+    - Overlapping and adjacent IPs and CIDR ranges are merged into the fewest ranges.
+    - Hostnames are resolved concurrently; names sharing an IP, or whose IP is part of a
+      requested range, are scanned once through that IP or range.
+    Names that do not resolve and other nmap target syntaxes (e.g. "10.0.0.1-20") are scanned as given.
+    """
+
+    def __init__(self, resolver: Callable[[str], str | None] = resolve_ipv4, max_workers: int = 16) -> None:
+        self.resolver = resolver
+        self.max_workers = max_workers
+
+    @staticmethod
+    def passthrough(targets: list[str]) -> TargetPlan:
+        """Plan scanning every distinct target exactly as given."""
+        plan = TargetPlan(len(targets))
+        for target in targets:
+            plan.routes[target] = (target, None)
+        return plan
+
+    def plan(self, targets: list[str]) -> TargetPlan:
+        plan = TargetPlan(len(targets))
+        requested = list(dict.fromkeys(normalize_target(target) for target in targets))
+
+        networks = {}
+        names = []
+        for target in requested:
+            try:
+                networks[target] = ipaddress.ip_network(target)
+            except ValueError:
+                # nmap ranges such as "10.0.1.1-20" look like names, but no DNS name ends with a number
+                if _HOSTNAME.match(target) and not target.rsplit(".", 1)[-1].replace("-", "").isdigit():
+                    names.append(target)
+
+        addresses = {}
+        if names:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(names)), thread_name_prefix="resolve") as pool:
+                addresses = dict(zip(names, pool.map(self.resolver, names)))
+        plan.unresolved = [name for name in names if addresses[name] is None]
+        resolved = {name: ipaddress.ip_network(ip) for name, ip in addresses.items() if ip is not None}
+
+        # Merge every address to scan into the fewest ranges, per IP version
+        merged = []
+        for version in (4, 6):
+            merged.extend(ipaddress.collapse_addresses(
+                network for network in (*networks.values(), *resolved.values()) if network.version == version
+            ))
+
+        for target in requested:
+            network = networks.get(target) or resolved.get(target)
+            if network is None:
+                plan.routes[target] = (target, None)
+                continue
+            scan_network = next(
+                candidate for candidate in merged
+                if candidate.version == network.version and network.subnet_of(candidate)
+            )
+            scan_target = str(scan_network.network_address) if scan_network.num_addresses == 1 else str(scan_network)
+            plan.routes[target] = (scan_target, None if scan_network == network and target in networks else network)
+        return plan
@@ -0,0 +1,157 @@
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterator, NamedTuple
+
+
+class PortRecord(NamedTuple):
+    """One port of one host, as reported by nmap."""
+    ip: str
+    protocol: str
+    port: int
+    state: str
+    name: str
+    product: str
+    version: str
+
+    def to_dict(self, subdomain: str = None) -> dict:
+        """Convert to the record shape used across the project (CSV rows, API responses, prompts)."""
+        result = {
+            'IP': self.ip,
+            'Protocol': self.protocol,
+            'Port': self.port,
+            'State': self.state,
+            'Name': self.name,
+            'Product': self.product,
+            'Version': self.version
+        }
+        if subdomain is not None:
+            result['Subdomain'] = subdomain
+        return result
+
+
+class HostRecord(NamedTuple):
+    """One host of an nmap run with its ports."""
+    ip: str
+    status: str
+    hostnames: tuple[str, ...]
+    ports: tuple[PortRecord, ...]
+    # Smoothed round-trip time measured by nmap, in microseconds (0 when unknown)
+    srtt: int = 0
+    # Whether nmap gave up on the host because of --host-timeout
+    timed_out: bool = False
+
+    def to_dict(self, subdomain: str = None) -> dict:
+        return {
+            "IP": self.ip,
+            "status": self.status,
+            "hostnames": list(self.hostnames),
+            "results": [port.to_dict(subdomain) for port in self.ports]
+        }
+
+
+class NmapXmlParser:
+    """
+    Incremental parser for nmap's XML output (`-oX`).
+
+    Data is fed in arbitrary chunks and every <host> element is turned into a compact
+    HostRecord as soon as its closing tag is seen. The element is then dropped from the
+    tree, so memory stays bounded by the largest single host rather than the whole run.
+    """
+
+    def __init__(self) -> None:
+        self.__parser = ET.XMLPullParser(events=("start", "end"))
+        self.__root = None
+
+    @staticmethod
+    def _host_record(host: ET.Element) -> HostRecord | None:
+        address = None
+        for addr in host.iterfind("address"):
+            if addr.get("addrtype") in ("ipv4", "ipv6"):
+                address = addr.get("addr")
+                break
+        if address is None:
+            return None
+
+        status = host.find("status")
+        hostnames = tuple(hostname.get("name") for hostname in host.iterfind("hostnames/hostname"))
+        ports = []
+        for port in host.iterfind("ports/port"):
+            state = port.find("state")
+            service = port.find("service")
+            if service is None:
+                name = product = version = ''
+            else:
+                name = service.get("name", '')
+                product = service.get("product", '')
+                version = service.get("version", '')
+            ports.append(PortRecord(
+                address,
+                port.get("protocol"),
+                int(port.get("portid")),
+                state.get("state") if state is not None else '',
+                name,
+                product,
+                version
+            ))
+        times = host.find("times")
+        srtt = times.get("srtt", "") if times is not None else ""
+        return HostRecord(
+            address,
+            status.get("state") if status is not None else '',
+            hostnames,
+            tuple(ports),
+            int(srtt) if srtt.isdigit() else 0,
+            host.get("timedout") == "true"
+        )
+
+    def feed(self, data: bytes) -> Iterator[HostRecord]:
+        """
+        Feed a chunk of XML and yield the hosts completed by it.
+
+        :param data: Next chunk of nmap's XML output.
+        :return: Generator of HostRecord.
+        """
+        self.__parser.feed(data)
+        for event, element in self.__parser.read_events():
+            if event == "start":
+                if self.__root is None:
+                    self.__root = element
+                continue
+            if element.tag != "host":
+                continue
+            record = self._host_record(element)
+            # Drop the finished host from the tree to keep memory bounded
+            if self.__root is not None and element in self.__root:
+                self.__root.remove(element)
+            element.clear()
+            if record is not None:
+                yield record
+
+    def close(self) -> None:
+        self.__parser.close()
+
+
+def iter_hosts(stream: BinaryIO, chunk_size: int = 65536) -> Iterator[HostRecord]:
+    """
+    Parse nmap XML from a binary stream (a file or nmap's stdout) one host at a time.
+
+    `read1` is used when available so that hosts are yielded as soon as nmap writes them
+    to a pipe, instead of waiting for a full chunk.
+
+    :param stream: Binary file-like object producing nmap XML.
+    :param chunk_size: Maximum number of bytes read at once.
+    :return: Generator of HostRecord.
+    """
+    parser = NmapXmlParser()
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    parser.close()
+
+
+def iter_hosts_from_file(path: str) -> Iterator[HostRecord]:
+    """Parse a saved nmap XML file one host at a time."""
+    with open(path, "rb") as xml_file:
+        yield from iter_hosts(xml_file)
@@ -1,64 +1,245 @@
 from flask import Flask, request, jsonify
+import io
 import os
+import json
+import math
+import ipaddress
+import time
+import queue
+import threading
 import datetime
+from contextlib import contextmanager
+from typing import Callable
 from dotenv import load_dotenv
-from nmap_automator.interpretors import InterpretorFactory
-from nmap_automator.scanner import NmapScanner
-from nmap_automator.config_loader import Config, NmapScanRequest, LLMInterpretRequest, ScannerConfig, InterpretorConfig, SubdomainRequest
-from nmap_automator.utils.api_utils import parse_request_data, read_results_from_csv
+from nmap_automator.interpretors import InterpretorFactory, ChunkedInterpretation, EnsembleInterpretor, RuleClassifier
+from nmap_automator.scanner import NmapScanner, ScanExecutor, CancelToken, TargetPlanner, TargetPlan, split_range
+from nmap_automator.config_loader import Config, NmapScanRequest, LLMInterpretRequest, ScannerConfig, InterpretorConfig, EnsembleMemberConfig, SubdomainRequest, ServerConfig, ResultsQueryRequest, ScanDiffRequest, ScheduleRequest, ScheduleUpdateRequest
+from nmap_automator.jobs import JobManager, JobStore, ScheduleStore, ScanScheduler
+from nmap_automator.storage import ScanCache, ScanJournal, diff_scans, diff_to_results
+from nmap_automator.server.context import ServerContext, get_server_context
+from nmap_automator.utils.api_utils import parse_request_data, read_scan, read_scan_results, stream_events, stream_format
 from pydantic import ValidationError
 
 api_server = Flask(__name__)
+# Environment variable holding the API key of each interpretor type
+API_KEY_VARIABLES = {"gpt": "OPENAI_API_KEY", "gemini": "GOOGLE_API_KEY"}
+# Name of the interpretors, naming the interpretation file of a scan (<name>_results.json)
+INTERPRETOR_NAME = "Nmap Automator"
 
 class Runner:
-    def __init__(self):
+    def __init__(self, context: ServerContext = None):
         load_dotenv()
+        self.context = context or ServerContext()
+        # Wall-clock time of each phase of the last two-phase scan
+        self.phase_timing = None
+        # Targets planned for the last scan
+        self.target_plan = None
+        # Limits of the running scan (see ScanGovernor), and those of the last scan once it is over
+        self.governed = None
+        self.scan_limits = None
 
     def _create_interpretor(self, conf: InterpretorConfig):
         api_key = None
-        if conf.interpretor_type == "gpt":
-            api_key = os.getenv("OPENAI_API_KEY")
-        elif conf.interpretor_type == "gemini":
-            api_key = os.getenv("GOOGLE_API_KEY")
+        if conf.interpretor_type in API_KEY_VARIABLES:
+            api_key = os.getenv(API_KEY_VARIABLES[conf.interpretor_type])
 
         interpretor = InterpretorFactory.create_interpretor(
           conf.interpretor_type,
-          "Nmap Automator",
+          INTERPRETOR_NAME,
           conf.model_flavor,
           api_key=api_key
         )
+        interpretor.use_clients(self.context.interpretor_clients)
+        interpretor.use_resilience(self.context.interpretor_resilience)
+        if conf.interpretor_type == "ensemble":
+            interpretor.use_members([
+                (member.interpretor_type, member.model_flavor, self.__member_factory(conf, member))
+                for member in conf.ensemble
+            ])
+            interpretor.use_latencies(self.context.interpretor_latencies)
+            interpretor.hedge_delay = conf.hedge_delay
+            interpretor.min_confidence = conf.cascade_min_confidence
         interpretor.configure()
+        interpretor.prompt_format = conf.prompt_format
+        if self.context.interpretation_cache is not None:
+            interpretor.use_cache(
+                self.context.interpretation_cache,
+                bypass=conf.force_refresh,
+                deterministic_only=self.context.server_conf.interpretation_cache_scope == "deterministic"
+            )
         return interpretor
     
+    @staticmethod
+    def save_interpretation(res: dict, save_dir: str) -> None:
+        """Save an interpretation made without the LLM where the interpretors save theirs."""
+        with io.open(os.path.join(save_dir, f"{INTERPRETOR_NAME}_results.json"), "w") as f:
+            f.write(json.dumps(res, indent=4))
+
+    def __member_factory(self, conf: InterpretorConfig, member: EnsembleMemberConfig) -> Callable:
+        """Factory of an ensemble member, configured like the ensemble (prompt format, cache, ...)."""
+        member_conf = conf.model_copy(update={
+            "interpretor_type": member.interpretor_type,
+            "model_flavor": member.model_flavor,
+            "ensemble": None
+        })
+        return lambda: self._create_interpretor(member_conf)
+
+    def create_scanner(self) -> NmapScanner:
+        timeout = self.governed.target_timeout if self.governed is not None else None
+        return NmapScanner(backend=self.context.server_conf.scanner_backend, timeout=timeout)
+
+    @property
+    def scan_slots(self):
+        """Process slots the executors of the running scan take before starting nmap."""
+        return self.governed if self.governed is not None else self.context.scan_slots
+
+    def governed_arguments(self, arguments: str, processes: int = None) -> str:
+        """Nmap arguments with the host timeout and packet rate of the running scan."""
+        if self.governed is None:
+            return arguments
+        return self.governed.arguments(arguments, processes)
+
+    def observe_run(self, scanner: NmapScanner, target: str) -> None:
+        if self.governed is not None:
+            self.governed.observe(target, scanner.run_stats, timed_out=scanner.timed_out)
+
+    @contextmanager
+    def govern(self, scanner_conf: ScannerConfig, scan_id: str, cancel_token: CancelToken = None):
+        """
+        Register the scan with the server's governor for the duration of the block.
+
+        Yields the cancel token the scan must use: with a `job_timeout`, it is a token of its
+        own, cancelled by `cancel_token` or when the timeout expires, so that a timed out
+        scan is not reported as cancelled by its requester. The limits the scan hit are
+        left in `scan_limits`.
+        """
+        governed = self.governed = self.context.governor.track(
+            scan_id,
+            host_timeout=scanner_conf.host_timeout,
+            target_timeout=scanner_conf.target_timeout,
+            job_timeout=scanner_conf.job_timeout,
+            max_rate=scanner_conf.max_rate
+        )
+        timer = None
+        if scanner_conf.job_timeout:
+            scan_token = CancelToken()
+            if cancel_token is not None:
+                cancel_token.register(scan_token)
+
+            def expire() -> None:
+                print(f"Scan {scan_id} exceeded its {scanner_conf.job_timeout}s job timeout, cancelling it.")
+                governed.job_timed_out = True
+                scan_token.cancel()
+
+            timer = threading.Timer(scanner_conf.job_timeout, expire)
+            timer.daemon = True
+            timer.start()
+        else:
+            scan_token = cancel_token
+        try:
+            yield scan_token
+        finally:
+            if timer is not None:
+                timer.cancel()
+                if cancel_token is not None:
+                    cancel_token.unregister(scan_token)
+            self.context.governor.untrack(governed)
+            self.governed = None
+            self.scan_limits = governed.report()
+
     def create_save_dir(self, scanner_conf: ScannerConfig) -> str:
-        scan_name = f"scan_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+        # Microseconds keep concurrent jobs started in the same second apart
+        scan_name = f"scan_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S_%f')}"
         full_path = os.path.join(scanner_conf.save_dir, scan_name)
         os.makedirs(full_path, exist_ok=True)
+        ScanJournal(full_path).start(scanner_conf.model_dump())
+        self.context.results_store.create_scan(
+            scan_id=self.scan_id_from_dir(full_path),
+            scan_dir=full_path,
+            nmap_args=scanner_conf.nmap_args,
+            targets=scanner_conf.target
+        )
         return full_path
 
-    def scan_with_nmap(self, scanner_conf: ScannerConfig, target: str, scan_dir: str) -> dict:
+    @staticmethod
+    def scan_id_from_dir(scan_dir: str) -> str:
+        """The scan ID is the name of the scan directory (e.g. "scan_2025-01-01_12-00-00_000000")."""
+        return os.path.basename(os.path.normpath(scan_dir))
+
+    def save_target_results(self, scanner_conf: ScannerConfig, target: str, scan_dir: str, results: list[dict]) -> None:
+        self.context.results_store.add_results(
+            scan_id=self.scan_id_from_dir(scan_dir),
+            target=target,
+            nmap_args=scanner_conf.nmap_args,
+            results=results
+        )
+
+    # Ranges of at least this many addresses scanned by a single nmap run are resumable with `nmap --resume`
+    RESUMABLE_RANGE_SIZE = 256
+
+    def scan_with_nmap(
+        self,
+        scanner_conf: ScannerConfig,
+        target: str,
+        cancel_token: CancelToken = None,
+        journal: ScanJournal = None
+    ) -> dict:
         """
         Perform an Nmap scan for a single target.
 
         :param scanner_conf: ScannerConfig object with nmap_args and save_dir.
         :param target: The specific target to scan (single IP or hostname).
+        :param cancel_token: Optional token that terminates the nmap process when cancelled.
+        :param journal: Optional journal of the scan; large ranges are then scanned resumably.
         :return: Dictionary containing scan results and metadata.
         """
-        scanner = NmapScanner()
-        nmap_args = " ".join(scanner_conf.nmap_args)
+        scanner = self.create_scanner()
+        nmap_args = self.governed_arguments(" ".join(scanner_conf.nmap_args))
 
+        if cancel_token is not None:
+            cancel_token.register(scanner)
         try:
             print(f"Scanning target: {target} with args: {nmap_args}")
-            scan_results = scanner.scan(
-                target=target,
-                arguments=nmap_args,
-                save_dir=scan_dir
-            )
-            return {
+            if journal is not None and self.is_large_range(target):
+                scan_fn = lambda: self.scan_resumable(scanner, target, nmap_args, journal)
+            else:
+                scan_fn = lambda: scanner.scan(target=target, arguments=nmap_args)
+
+            def run_scan() -> tuple[list[dict], bool, bool]:
+                scan_results = scan_fn()
+                self.observe_run(scanner, target)
+                if scanner.error is not None and not scanner.cancelled:
+                    raise RuntimeError(f"nmap failed: {scanner.error}")
+                return scan_results, scanner.cancelled, scanner.timed_out
+
+            flight_key = self.scan_flight_key(scanner_conf, target)
+            while True:
+                # Identical scans running at the same time share a single nmap process
+                (scan_results, flight_cancelled, timed_out), coalesced = self.context.scan_flights.do(flight_key, run_scan)
+                # A shared scan cancelled by its own requester is run again for this one
+                if not (coalesced and flight_cancelled) or scanner.cancelled:
+                    break
+            if scanner.cancelled:
+                return {
+                    "target": target,
+                    "error": "Scan cancelled.",
+                    "cancelled": True,
+                    "nmap_args": scanner_conf.nmap_args
+                }
+            # Empty results may come from a failed scan, and those of a timed out scan are
+            # partial, so only complete findings are cached
+            if self.context.scan_cache is not None and scan_results and not timed_out:
+                self.context.scan_cache.put(target, scanner_conf.nmap_args, scan_results)
+            result = {
                 "target": target,
                 "results": scan_results,
-                "nmap_args": scanner_conf.nmap_args
+                "nmap_args": scanner_conf.nmap_args,
+                "cache": {"hit": False},
+                "coalesced": coalesced
             }
+            if timed_out:
+                result["timed_out"] = True
+            return result
         except Exception as e:
             print(f"Error scanning target {target}: {e}")
             return {
@@ -66,11 +247,712 @@ class Runner:
                 "error": str(e),
                 "nmap_args": scanner_conf.nmap_args
             }
+        finally:
+            if cancel_token is not None:
+                cancel_token.unregister(scanner)
     
-    def run_llm_interpretation(self, interpreter_conf: InterpretorConfig, results: list[dict], save_dir: str) -> list[dict]:
+    @staticmethod
+    def scan_flight_key(scanner_conf: ScannerConfig, target: str) -> tuple:
+        """
+        Key of the scans of `target` that may share a single nmap run.
+
+        They have the same nmap arguments (in any order), scan mode and limits, so that the
+        results one request gets are those its own scan would have produced.
+        """
+        return (
+            ScanCache.cache_key(target, scanner_conf.nmap_args),
+            scanner_conf.scan_mode,
+            scanner_conf.host_timeout,
+            scanner_conf.target_timeout,
+            scanner_conf.max_rate
+        )
+
+    @classmethod
+    def is_large_range(cls, target: str) -> bool:
+        try:
+            return ipaddress.ip_network(target, strict=False).num_addresses >= cls.RESUMABLE_RANGE_SIZE
+        except ValueError:
+            return False
+
+    def scan_resumable(self, scanner: NmapScanner, target: str, arguments: str, journal: ScanJournal) -> list[dict]:
+        """
+        Scan a large range with a single nmap run that can be continued after an interruption.
+
+        Every host is journaled as soon as nmap finishes it. If a previous run of the range was
+        interrupted, `nmap --resume` only scans the hosts it had not finished; the others are
+        taken from the journal (or from nmap's log, for hosts nmap logged just before the
+        interruption but the journal did not record).
+
+        :return: The result rows of the whole range.
+        """
+        resume_log = journal.resume_log(target)
+        hosts = {}
+        if NmapScanner.can_resume(resume_log):
+            hosts = dict(journal.hosts.get(target, {}))
+            for host in NmapScanner.grepable_hosts(resume_log):
+                hosts.setdefault(host.ip, [port.to_dict() for port in host.ports])
+            print(f"Resuming the nmap run of {target}: {len(hosts)} hosts already scanned")
+
+        for host in scanner.iter_hosts(target, arguments, resume_log=resume_log):
+            rows = [port.to_dict() for port in host.ports]
+            journal.record_host(target, host.ip, rows)
+            hosts[host.ip] = rows
+        if scanner.cancelled:
+            return []
+        return [dict(row, Subdomain=target) for rows in hosts.values() for row in rows]
+
+    def scan_sharded(
+        self,
+        scanner_conf: ScannerConfig,
+        target: str,
+        scan_dir: str,
+        cancel_token: CancelToken = None,
+        journal: ScanJournal = None
+    ) -> dict:
+        """
+        Scan a large range as shards of `scanner_conf.shard_size` addresses across worker processes.
+
+        The progress of every shard is recorded with the scan, and the shard results are
+        merged into a single result for the range. Shards completed by an interrupted run
+        of the scan (found in the journal) are not scanned again.
+
+        :param scanner_conf: ScannerConfig object with nmap_args and shard_size.
+        :param target: CIDR range to scan.
+        :param scan_dir: Directory of the scan the shard progress is recorded under.
+        :param cancel_token: Optional token skipping pending shards and terminating running ones.
+        :param journal: Optional journal the completed shards are recorded in.
+        :return: Dictionary shaped like scan_with_nmap's, with a summary of the shards.
+        """
+        store = self.context.results_store
+        scan_id = self.scan_id_from_dir(scan_dir)
+        shards = split_range(target, scanner_conf.shard_size)
+        shard_rows = dict(journal.shards.get(target, {})) if journal is not None else {}
+        store.add_shards(scan_id, target, shards)
+        for shard, rows in shard_rows.items():
+            store.update_shard(scan_id, shard, "completed", hosts=len({row["IP"] for row in rows}))
+        print(f"Scanning target: {target} as {len(shards)} shards of {scanner_conf.shard_size} addresses")
+        if shard_rows:
+            print(f"Resuming target: {target}, {len(shard_rows)} shards already scanned")
+
+        def on_shard_done(result: dict) -> None:
+            if result.get("cancelled"):
+                status = "cancelled"
+            elif "error" in result:
+                status = "failed"
+            else:
+                status = "completed"
+            hosts = len({row["IP"] for row in result.get("results", [])})
+            if status == "completed":
+                shard_rows[result["shard"]] = result["results"]
+                if journal is not None:
+                    journal.record_shard(target, result["shard"], result["results"])
+            store.update_shard(scan_id, result["shard"], status, hosts=hosts, error=result.get("error"), worker_id=result.get("worker_id"))
+
+        pending = [shard for shard in shards if shard not in shard_rows]
+        # The packet rate of the scan is split between the shards scanned at once
+        shard_arguments = self.governed_arguments(
+            " ".join(scanner_conf.nmap_args),
+            processes=min(len(pending), self.context.server_conf.shard_workers)
+        )
+        shard_results = self.context.shard_pool.run(
+            pending,
+            shard_arguments,
+            backend=self.context.server_conf.scanner_backend,
+            cancel_token=cancel_token,
+            on_shard_start=lambda shard: store.update_shard(scan_id, shard, "running"),
+            on_shard_done=on_shard_done
+        )
+        if (cancel_token is not None and cancel_token.cancelled) or any(result.get("cancelled") for result in shard_results):
+            return {"target": target, "error": "Scan cancelled.", "cancelled": True, "nmap_args": scanner_conf.nmap_args}
+
+        scan_results = [dict(row, Subdomain=target) for shard in shards for row in shard_rows.get(shard, [])]
+        failed = [result["shard"] for result in shard_results if "error" in result]
+        if self.context.scan_cache is not None and scan_results and not failed:
+            self.context.scan_cache.put(target, scanner_conf.nmap_args, scan_results)
+        return {
+            "target": target,
+            "results": scan_results,
+            "nmap_args": scanner_conf.nmap_args,
+            "cache": {"hit": False},
+            "shards": {"total": len(shards), "completed": len(shards) - len(failed), "failed": failed}
+        }
+
+    def run_nmap(self, target: str, arguments: str, cancel_token: CancelToken = None) -> tuple[list[dict], bool]:
+        """
+        Run a single nmap invocation, cancellable through `cancel_token`.
+
+        :return: The result rows and whether the scan was cancelled.
+        :raises RuntimeError: When nmap failed (e.g. a SYN scan without privileges).
+        """
+        scanner = self.create_scanner()
+        arguments = self.governed_arguments(arguments)
+        if cancel_token is not None:
+            cancel_token.register(scanner)
+        try:
+            print(f"Scanning target: {target} with args: {arguments}")
+            results = scanner.scan(target=target, arguments=arguments)
+            self.observe_run(scanner, target)
+            if scanner.error is not None and not scanner.cancelled:
+                raise RuntimeError(f"nmap failed: {scanner.error}")
+            return results, scanner.cancelled
+        finally:
+            if cancel_token is not None:
+                cancel_token.unregister(scanner)
+
+    def scan_two_phase(
+        self,
+        scanner_conf: ScannerConfig,
+        targets: list[str],
+        cancel_token: CancelToken = None,
+        on_result: Callable[[dict], None] = None
+    ) -> list[dict]:
+        """
+        Scan the targets in two phases.
+
+        Phase 1 sweeps every target in parallel for open ports. Phase 2 runs the requested
+        nmap_args only on the open ports found. Hosts are grouped by their open ports into at
+        most `concurrency` batches, so that nmap still scans the hosts of a batch in parallel.
+        The detailed rows replace the open ports of the sweep, and every row keeps the target
+        it was found from.
+
+        :param scanner_conf: ScannerConfig object with nmap_args and concurrency.
+        :param targets: Targets to scan.
+        :param cancel_token: Optional token cancelling both phases.
+        :param on_result: Optional callback invoked as each target completes.
+        :return: One result dictionary per target, in input order.
+        """
+        nmap_args = " ".join(scanner_conf.nmap_args)
+
+        def run_phase(scan_fn: Callable[[str], dict], items: list[str]) -> tuple[list[dict], float]:
+            executor = ScanExecutor(
+                scan_fn=scan_fn,
+                concurrency=scanner_conf.concurrency,
+                scan_slots=self.scan_slots,
+                cancel_token=cancel_token
+            )
+            start = time.perf_counter()
+            return executor.run(items), time.perf_counter() - start
+
+        def run_step(target: str, arguments: str) -> dict:
+            rows, cancelled = self.run_nmap(target, arguments, cancel_token)
+            if cancelled:
+                return {"target": target, "error": "Scan cancelled.", "cancelled": True}
+            return {"target": target, "results": rows}
+
+        # Phase 1: fast sweep of every target
+        sweeps, sweep_seconds = run_phase(lambda target: run_step(target, NmapScanner.sweep_arguments(nmap_args)), targets)
+        # IP -> {(protocol, port)}
+        open_ports = {}
+        for sweep in sweeps:
+            for row in sweep.get("results", []):
+                if row["State"] == "open" and row["Protocol"] in ("tcp", "udp"):
+                    open_ports.setdefault(row["IP"], set()).add((row["Protocol"], int(row["Port"])))
+
+        # Phase 2: service detection on the open ports, on batches of hosts with similar ports
+        hosts = sorted(open_ports, key=lambda ip: (sorted(open_ports[ip]), ip))
+        batch_size = math.ceil(len(hosts) / scanner_conf.concurrency) if hosts else 1
+        batches = [hosts[i:i + batch_size] for i in range(0, len(hosts), batch_size)]
+        batch_ports = {
+            " ".join(batch): sorted(set().union(*(open_ports[ip] for ip in batch)))
+            for batch in batches
+        }
+
+        def detect(batch: str) -> dict:
+            ports = batch_ports[batch]
+            arguments = NmapScanner.service_arguments(
+                nmap_args,
+                [port for protocol, port in ports if protocol == "tcp"],
+                [port for protocol, port in ports if protocol == "udp"]
+            )
+            return run_step(batch, arguments)
+
+        detections, detection_seconds = run_phase(detect, list(batch_ports))
+        detected = {}
+        for batch, detection in zip(batch_ports, detections):
+            for ip in batch.split():
+                detected[ip] = {
+                    **detection,
+                    "batch": batch,
+                    # Only keep the ports found open on this host, not the rest of the batch's ports
+                    "results": [
+                        row for row in detection.get("results", [])
+                        if row["IP"] == ip and (row["Protocol"], int(row["Port"])) in open_ports[ip]
+                    ]
+                }
+        self.phase_timing = {
+            "sweep_seconds": round(sweep_seconds, 3),
+            "service_detection_seconds": round(detection_seconds, 3),
+            "hosts_with_open_ports": len(hosts),
+            "service_detection_batches": len(batches),
+            "open_ports": sum(len(ports) for ports in open_ports.values())
+        }
+
+        results = []
+        for sweep in sweeps:
+            target = sweep["target"]
+            if "error" not in sweep and cancel_token is not None and cancel_token.cancelled:
+                sweep = {"target": target, "error": "Scan cancelled.", "cancelled": True}
+            if "error" in sweep:
+                result = {**sweep, "nmap_args": scanner_conf.nmap_args}
+            else:
+                rows = []
+                target_batches = {}
+                failed_batches = set()
+                for ip in dict.fromkeys(row["IP"] for row in sweep["results"]):
+                    detection = detected.get(ip)
+                    if detection is None or "error" in detection:
+                        # Keep the sweep rows of hosts without open ports or whose detection failed
+                        rows.extend(row for row in sweep["results"] if row["IP"] == ip)
+                        if detection is not None:
+                            failed_batches.add(detection["batch"])
+                        continue
+                    target_batches[detection["batch"]] = detection["elapsed_seconds"]
+                    detected_ports = {(row["Protocol"], int(row["Port"])) for row in detection["results"]}
+                    # Sweep rows are kept for the ports the detection did not report
+                    rows.extend(
+                        row for row in sweep["results"]
+                        if row["IP"] == ip and (row["Protocol"], int(row["Port"])) not in detected_ports
+                    )
+                    rows.extend(dict(row, Subdomain=target) for row in detection["results"])
+                rows.sort(key=lambda row: (row["IP"], row["Protocol"], int(row["Port"])))
+                # The batches of a target run in parallel
+                detection_elapsed = max(target_batches.values(), default=0.0)
+
+                # Sweep rows standing in for a failed detection are not the findings of nmap_args
+                if self.context.scan_cache is not None and rows and not failed_batches:
+                    self.context.scan_cache.put(target, scanner_conf.nmap_args, rows)
+                result = {
+                    "target": target,
+                    "results": rows,
+                    "nmap_args": scanner_conf.nmap_args,
+                    "cache": {"hit": False},
+                    "phases": {
+                        "sweep_seconds": sweep["elapsed_seconds"],
+                        "service_detection_seconds": round(detection_elapsed, 3)
+                    },
+                    "elapsed_seconds": round(sweep["elapsed_seconds"] + detection_elapsed, 3)
+                }
+                if failed_batches:
+                    # The target still has the rows of its sweep, so it is not failed as a whole
+                    result["service_detection_error"] = "; ".join(
+                        detected[batch.split()[0]]["error"] for batch in sorted(failed_batches)
+                    )
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+        return results
+
+    def cached_scan(self, scanner_conf: ScannerConfig, target: str) -> dict | None:
+        """
+        Return the cached result of a target, or None on a cache miss.
+
+        :param scanner_conf: ScannerConfig object with nmap_args.
+        :param target: The target to look up.
+        :return: Result dictionary shaped like scan_with_nmap's, with the age of the cached data.
+        """
+        if self.context.scan_cache is None:
+            return None
+        cached = self.context.scan_cache.get(target, scanner_conf.nmap_args)
+        if cached is None:
+            return None
+
+        print(f"Using cached results for target: {target} ({cached['age_seconds']}s old)")
+        scan_results = [dict(row, Subdomain=target) for row in cached["results"]]
+        return {
+            "target": target,
+            "results": scan_results,
+            "nmap_args": scanner_conf.nmap_args,
+            "cache": {"hit": True, "cached_at": cached["cached_at"], "age_seconds": cached["age_seconds"]},
+            "elapsed_seconds": 0.0
+        }
+
+    def plan_targets(self, scanner_conf: ScannerConfig) -> TargetPlan:
+        """Plan the nmap runs of the configured targets (see TargetPlanner)."""
+        if not scanner_conf.plan_targets:
+            return TargetPlanner.passthrough(scanner_conf.target)
+        plan = TargetPlanner().plan(scanner_conf.target)
+        print(f"Planned {len(plan.scan_targets)} scan targets for {len(scanner_conf.target)} requested targets")
+        return plan
+
+    def scan_targets(
+        self,
+        scanner_conf: ScannerConfig,
+        scan_dir: str,
+        cancel_token: CancelToken = None,
+        on_result: Callable[[dict], None] = None,
+        on_plan: Callable[[TargetPlan], None] = None,
+        journal: ScanJournal = None
+    ) -> list[dict]:
+        """
+        Scan every target of the scanner configuration concurrently.
+
+        The targets are planned first, so that duplicate names, names sharing an IP and
+        overlapping ranges are scanned once; each requested target then receives its own
+        rows of the shared scan. At most `scanner_conf.concurrency` nmap runs of this request
+        run at once, and no more than the server-wide `max_scan_concurrency` across all requests.
+
+        Finished targets are written to the scan's journal before their rows are stored.
+        Targets already finished in `journal` (when resuming a scan) are not scanned again.
+
+        :param scanner_conf: ScannerConfig object with nmap_args, targets and concurrency.
+        :param scan_dir: Directory of this scan; its name is the scan ID the results are stored under.
+        :param cancel_token: Optional token cancelling the remaining and running targets.
+        :param on_result: Optional callback invoked as each target completes (used for job progress).
+        :param on_plan: Optional callback invoked with the target plan before scanning.
+        :param journal: Journal of the scan, loaded when resuming it (defaults to the scan directory's).
+        :return: One result dictionary per distinct requested target, in request order.
+        """
+        journal = journal or ScanJournal(scan_dir)
+        scan_id = self.scan_id_from_dir(scan_dir)
+        # A scan running in this process is never resumed at the same time
+        with self.context.track_scan(scan_id), self.govern(scanner_conf, scan_id, cancel_token) as cancel_token:
+            plan = self.target_plan = self.plan_targets(scanner_conf)
+            if on_plan is not None:
+                on_plan(plan)
+
+            results = {}
+            for requested in plan.requested:
+                if requested in journal.targets:
+                    results[requested] = journal.targets[requested]
+                    if on_result is not None:
+                        on_result(results[requested])
+
+            def on_scanned(scan_result: dict) -> None:
+                # Hand the rows of a scan target out to every requested target it covers
+                for requested in plan.requested_by(scan_result["target"]):
+                    if requested in results:
+                        continue
+                    result = plan.fan_out(requested, scan_result)
+                    if "results" in result:
+                        journal.record_target(result)
+                        self.save_target_results(scanner_conf, requested, scan_dir, result["results"])
+                    results[requested] = result
+                    if on_result is not None:
+                        on_result(result)
+
+            # Cache hits are answered up front, without waiting for a scan slot
+            targets = []
+            for target in plan.scan_targets:
+                if all(requested in results for requested in plan.requested_by(target)):
+                    continue
+                cached = None if scanner_conf.force_refresh else self.cached_scan(scanner_conf, target)
+                if cached is not None:
+                    on_scanned(cached)
+                else:
+                    targets.append(target)
+
+            if scanner_conf.scan_mode == "two_phase":
+                self.scan_two_phase(scanner_conf, targets, cancel_token=cancel_token, on_result=on_scanned)
+            else:
+                # Large ranges are spread over the shard workers one at a time, the other targets run side by side
+                sharded = [target for target in targets if len(split_range(target, scanner_conf.shard_size)) > 1]
+                for target in sharded:
+                    on_scanned(self.scan_sharded(scanner_conf, target, scan_dir, cancel_token=cancel_token, journal=journal))
+                targets = [target for target in targets if target not in sharded]
+                executor = ScanExecutor(
+                    scan_fn=lambda target: self.scan_with_nmap(scanner_conf, target, cancel_token=cancel_token, journal=journal),
+                    concurrency=scanner_conf.concurrency,
+                    scan_slots=self.scan_slots,
+                    cancel_token=cancel_token,
+                    on_result=on_scanned
+                )
+                executor.run(targets)
+            if self.governed.job_timed_out:
+                # Targets cut short by the job timeout are reported as such, not as cancelled by the requester
+                for requested, result in results.items():
+                    if result.get("cancelled"):
+                        results[requested] = {
+                            **result,
+                            "error": f"Job timeout of {scanner_conf.job_timeout}s reached.",
+                            "cancelled": False,
+                            "timed_out": True
+                        }
+            return [results[requested] for requested in plan.requested]
+
+    def resume_scan(
+        self,
+        scan_id: str,
+        cancel_token: CancelToken = None,
+        on_result: Callable[[dict], None] = None,
+        on_plan: Callable[[TargetPlan], None] = None
+    ) -> dict:
+        """
+        Resume an interrupted scan from its journal, under the same scan ID.
+
+        The results store is first brought back in line with the journal: rows of targets the
+        journal does not list as finished are removed (they are scanned again), and finished
+        targets whose rows never reached the store are recorded. Only the remaining targets
+        are then scanned; finished shards and hosts of large ranges are kept as well.
+
+        :param scan_id: ID of the scan to resume.
+        :return: Dictionary with every target result ("data"), the scan ID and directory, and resume counters.
+        """
+        store = self.context.results_store
+        scan = store.get_scan(scan_id)
+        if scan is None:
+            raise ValueError(f"Scan not found: {scan_id}")
+        scan_dir = scan["scan_dir"]
+        journal = ScanJournal(scan_dir)
+        if not journal.exists:
+            raise ValueError(f"Scan {scan_id} has no journal to resume from.")
+        scanner_conf = ScannerConfig(**journal.load().scanner)
+
+        with self.context.track_scan(scan_id):
+            recorded = store.recorded_targets(scan_id)
+            store.delete_results(scan_id, recorded - set(journal.targets))
+            for target, result in journal.targets.items():
+                if target not in recorded:
+                    self.save_target_results(scanner_conf, target, scan_dir, result["results"])
+
+            finished = len(journal.targets)
+            print(f"Resuming scan {scan_id}: {finished} targets already finished")
+            all_results = self.scan_targets(scanner_conf, scan_dir, cancel_token=cancel_token, on_result=on_result, on_plan=on_plan, journal=journal)
+        return {
+            "data": all_results,
+            "scan_id": scan_id,
+            "scan_dir_path": scan_dir,
+            "targets": self.target_plan.stats(),
+            "limits": self.scan_limits,
+            "resumed": {
+                "finished_before": finished,
+                "scanned": len(all_results) - finished
+            }
+        }
+
+    def stream_targets(self, scanner_conf: ScannerConfig, scan_dir: str):
+        """
+        Scan every target concurrently and yield scan events as they happen.
+
+        The targets are planned like in `scan_targets`: duplicate names, names sharing an IP
+        and overlapping ranges are scanned once, and every requested target receives its own
+        events for the shared scan.
+
+        Targets with cached results (see `cached_scan`) are answered from the cache, their
+        hosts being sent with `"cached": true`; the results of the others are cached.
+        Identical scans running at the same time share a single nmap run (see `scan_flight_key`):
+        the hosts of a scan joined while it was running are sent with `"coalesced": true` once
+        it is over.
+
+        Events are dictionaries with an "event" key:
+        - "plan": the targets planned, before scanning.
+        - "host": one host finished by nmap (or read from the cache), with its port records,
+          for a requested target.
+        - "target_done": one requested target finished (with its timing, or its error).
+        - "scan_done": every target finished.
+
+        Closing the generator cancels the scan and terminates the running nmap processes.
+
+        :param scanner_conf: ScannerConfig object with nmap_args, targets and concurrency.
+        :param scan_dir: Directory of this scan.
+        :return: Generator of event dictionaries.
+        """
+        events = queue.Queue()
+        cancel_token = CancelToken()
+        journal = ScanJournal(scan_dir)
+        nmap_args = " ".join(scanner_conf.nmap_args)
+        start = time.perf_counter()
+        # Token the running nmap processes register with (the scan's own one with a job timeout)
+        scan_token = cancel_token
+        plan = None
+
+        def send_host(target: str, host: dict, **flags) -> None:
+            for requested in plan.requested_by(target):
+                requested_host = plan.fan_out_host(requested, host)
+                if requested_host is not None:
+                    events.put({"event": "host", "target": requested, "host": requested_host, **flags})
+
+        def send_rows(target: str, rows: list[dict], **flags) -> None:
+            # Cached and shared results are rows only: they are sent grouped by host
+            hosts = {}
+            for row in rows:
+                hosts.setdefault(row["IP"], []).append(row)
+            for ip, host_rows in hosts.items():
+                send_host(target, {"IP": ip, "status": "up", "hostnames": [], "results": host_rows}, **flags)
+
+        def stream_target(target: str) -> dict:
+            scanner = self.create_scanner()
+            scan_token.register(scanner)
+            try:
+                def run_scan() -> tuple[list[dict], bool, bool]:
+                    results = []
+                    for host in scanner.stream(target=target, arguments=self.governed_arguments(nmap_args)):
+                        results.extend(host["results"])
+                        send_host(target, host)
+                    self.observe_run(scanner, target)
+                    return results, scanner.cancelled, scanner.timed_out
+
+                flight_key = self.scan_flight_key(scanner_conf, target)
+                while True:
+                    (results, flight_cancelled, timed_out), coalesced = self.context.scan_flights.do(flight_key, run_scan)
+                    # A shared scan cancelled by its own requester is run again for this one
+                    if not (coalesced and flight_cancelled) or scanner.cancelled:
+                        break
+                if scanner.cancelled:
+                    return {"target": target, "error": "Scan cancelled.", "cancelled": True, "nmap_args": scanner_conf.nmap_args}
+                if coalesced:
+                    send_rows(target, results, coalesced=True)
+                # Only complete findings are cached, as in scan_with_nmap
+                if self.context.scan_cache is not None and results and not timed_out:
+                    self.context.scan_cache.put(target, scanner_conf.nmap_args, results)
+                result = {
+                    "target": target,
+                    "results": results,
+                    "nmap_args": scanner_conf.nmap_args,
+                    "cache": {"hit": False},
+                    "coalesced": coalesced
+                }
+                if timed_out:
+                    result["timed_out"] = True
+                return result
+            finally:
+                scan_token.unregister(scanner)
+
+        def send_cached(cached: dict) -> None:
+            send_rows(cached["target"], cached["results"], cached=True)
+            on_result(cached)
+
+        def on_result(scan_result: dict) -> None:
+            # Hand the rows of a scan target out to every requested target it covers
+            for requested in plan.requested_by(scan_result["target"]):
+                result = plan.fan_out(requested, scan_result)
+                if "results" in result:
+                    journal.record_target(result)
+                    self.save_target_results(scanner_conf, requested, scan_dir, result["results"])
+                event = {key: value for key, value in result.items() if key != "results"}
+                event["hosts"] = len({row["IP"] for row in result.get("results", [])})
+                events.put({"event": "target_done", **event})
+
+        def run_scan() -> None:
+            nonlocal scan_token, plan
+            scan_id = self.scan_id_from_dir(scan_dir)
+            try:
+                with self.govern(scanner_conf, scan_id, cancel_token) as scan_token:
+                    plan = self.target_plan = self.plan_targets(scanner_conf)
+                    events.put({"event": "plan", "targets": plan.stats()})
+                    # Cache hits are answered up front, without waiting for a scan slot
+                    targets = []
+                    for target in plan.scan_targets:
+                        cached = None if scanner_conf.force_refresh else self.cached_scan(scanner_conf, target)
+                        if cached is not None:
+                            send_cached(cached)
+                        else:
+                            targets.append(target)
+                    executor = ScanExecutor(
+                        scan_fn=stream_target,
+                        concurrency=scanner_conf.concurrency,
+                        scan_slots=self.scan_slots,
+                        cancel_token=scan_token,
+                        on_result=on_result
+                    )
+                    executor.run(targets)
+                events.put({
+                    "event": "scan_done",
+                    "scan_id": scan_id,
+                    "scan_dir_path": scan_dir,
+                    "timing": {
+                        "total_seconds": round(time.perf_counter() - start, 3),
+                        "concurrency": scanner_conf.concurrency
+                    },
+                    "targets": plan.stats(),
+                    "limits": self.scan_limits
+                })
+            except Exception as e:
+                events.put({"event": "error", "error": str(e)})
+            finally:
+                events.put(None)
+
+        threading.Thread(target=run_scan, name="nmap-stream", daemon=True).start()
+        try:
+            while (event := events.get()) is not None:
+                yield event
+        finally:
+            # The consumer went away (or the scan is over): stop any nmap process still running
+            cancel_token.cancel()
+
+    def preclassify(self, interpreter_conf: InterpretorConfig, results: list[dict], nmap_args: list[str] = None) -> dict | None:
+        """
+        Classify the scan with the rules of `interpreter_conf.preclassify` (see RuleClassifier).
+
+        :return: The rule that matched, its confidence, the time it took and the model latency
+                 it saved (the p50 of the model's recent interpretations, when known); None when
+                 the scan needs the LLM.
+        """
+        start = time.perf_counter()
+        classifier = RuleClassifier(interpreter_conf.preclassify, min_confidence=interpreter_conf.preclassify_min_confidence)
+        match = classifier.classify(results, interpreter_conf.interpret_runner, nmap_args)
+        seconds = time.perf_counter() - start
+        if match is None:
+            self.context.preclassifier_stats.record(None, seconds)
+            return None
+
+        model_p50 = self.context.interpretor_latencies.percentile(
+            f"{interpreter_conf.interpretor_type}/{interpreter_conf.model_flavor}", 50
+        )
+        saved = max(0.0, model_p50 - seconds) if model_p50 is not None else None
+        self.context.preclassifier_stats.record(match["rule"], seconds, saved)
+        return {
+            **match,
+            "seconds": round(seconds, 6),
+            "estimated_saved_seconds": round(saved, 3) if saved is not None else None
+        }
+
+    @staticmethod
+    def interpretation_fields(info: dict = None) -> dict:
+        """Response fields reporting how an interpretation was made (see run_llm_interpretation), all None without one."""
+        info = info or {}
+        return {f"interpretation_{key}": info.get(key) for key in ("cache", "chunks", "ensemble", "rule")}
+
+    def run_llm_interpretation(
+        self,
+        interpreter_conf: InterpretorConfig,
+        results: list[dict],
+        save_dir: str,
+        nmap_args: list[str] = None,
+        preclassify: bool = True,
+        on_progress: Callable[[dict], None] = None
+    ) -> tuple[dict, dict]:
+        """
+        Interpret the scan results, without the LLM when a pre-classifier rule is confident enough.
+
+        :param nmap_args: nmap arguments of the scan, used by the pre-classifier (None when unknown).
+        :param preclassify: Whether the pre-classifier may answer (the results being a full scan).
+        :param on_progress: Optional callback invoked with a "chunk" event as each chunk of a chunked
+            interpretation is interpreted, and a "member" event as each call of an ensemble starts and ends.
+        :return: The interpretation, and how it was made: {"cache", "prompt", "chunks", "ensemble", "rule"},
+            respectively the cache outcome, the prompt size, the chunks (see ChunkedInterpretation),
+            the ensemble calls and the pre-classifier rule, each None when it does not apply.
+        """
+        runner_type = interpreter_conf.interpret_runner
+        info = {"cache": None, "prompt": None, "chunks": None, "ensemble": None, "rule": None}
+        if preclassify and interpreter_conf.preclassify and not isinstance(results, str):
+            rule = self.preclassify(interpreter_conf, results, nmap_args)
+            if rule is not None:
+                print(f"Classified by the {rule['rule']} rule, without the LLM")
+                res = rule.pop("result")
+                self.save_interpretation(res, save_dir)
+                info["rule"] = rule
+                return res, info
+
+        # Only created once the LLM is needed: creating it configures the provider's clients
         interpretor = self._create_interpretor(interpreter_conf)
         print("Interpreting with", interpreter_conf.interpretor_type, " via ", interpreter_conf.model_flavor)
-        runner_type = interpreter_conf.interpret_runner
+        if interpreter_conf.chunking != "off" and not isinstance(results, str) and results:
+            chunked = ChunkedInterpretation(
+                lambda: self._create_interpretor(interpreter_conf),
+                runner_type,
+                chunk_tokens=interpreter_conf.chunk_tokens,
+                concurrency=interpreter_conf.chunk_concurrency,
+                reduce=interpreter_conf.reduce
+            )
+            if interpreter_conf.chunking == "always" or chunked.needs_chunks(interpretor, results):
+                on_chunk = None if on_progress is None else lambda chunk: on_progress({"event": "chunk", **chunk})
+                res = chunked.run(results, save_dir, on_chunk=on_chunk)
+                info["chunks"] = chunked.stats
+                return res, info
+
+        if on_progress is not None and isinstance(interpretor, EnsembleInterpretor):
+            interpretor.on_attempt = lambda attempt: on_progress({"event": "member", **attempt})
+        start = time.perf_counter()
         if runner_type == "normal":
             res = interpretor.interpret(results, save_dir)
         elif runner_type == "restricted":
@@ -79,14 +961,135 @@ class Runner:
             res = interpretor.interpret_with_suggestions(results, save_dir)
         else:
             raise Exception(f"Invalid interpret_runner: {runner_type}")
-        
-        return res
+        if res.get("error") is None and not (interpretor.last_cache or {}).get("hit"):
+            # Model latency, to estimate what the pre-classifier saves
+            self.context.interpretor_latencies.record(
+                f"{interpreter_conf.interpretor_type}/{interpreter_conf.model_flavor}", time.perf_counter() - start
+            )
+
+        info["cache"] = interpretor.last_cache
+        info["prompt"] = interpretor.last_prompt
+        info["ensemble"] = getattr(interpretor, "last_ensemble", None)
+        return res, info
+
+    def stream_llm_interpretation(
+        self,
+        interpreter_conf: InterpretorConfig,
+        results: list[dict],
+        save_dir: str,
+        nmap_args: list[str] = None
+    ):
+        """
+        Interpret the scan results and yield the answer of the model as it is generated.
+
+        Events are dictionaries with an "event" key:
+        - "token": a piece of the model's answer, as it arrives.
+        - "chunk": a chunk of a chunked interpretation was interpreted (its classification or error).
+        - "member": a call of an ensemble started or ended (see EnsembleInterpretor.last_ensemble).
+        - "result": the parsed interpretation, once the answer is complete. It is saved like
+          that of `run_llm_interpretation`, and carries the timing of the stream: time to the
+          first token and total time.
+        - "error": the interpretation could not run.
+
+        Interpretations answered by a pre-classifier rule or from the cache only yield their
+        result. Chunked and ensemble interpretations are not streamed token by token: they run in
+        the background and yield their progress, then their result. Closing the generator closes
+        the provider stream; a chunked or ensemble interpretation still runs to its end.
+
+        :param nmap_args: nmap arguments of the scan, used by the pre-classifier (None when unknown).
+        :return: Generator of event dictionaries.
+        """
+        try:
+            if interpreter_conf.preclassify and not isinstance(results, str):
+                rule = self.preclassify(interpreter_conf, results, nmap_args)
+                if rule is not None:
+                    res = rule.pop("result")
+                    self.save_interpretation(res, save_dir)
+                    yield {"event": "result", "interpreted_results": res, "streamed": False, "rule": rule}
+                    return
+
+            interpretor = self._create_interpretor(interpreter_conf)
+            runner_type = interpreter_conf.interpret_runner
+            chunked = interpreter_conf.chunking != "off" and not isinstance(results, str) and results and (
+                interpreter_conf.chunking == "always" or ChunkedInterpretation(
+                    lambda: self._create_interpretor(interpreter_conf), runner_type, chunk_tokens=interpreter_conf.chunk_tokens
+                ).needs_chunks(interpretor, results)
+            )
+            if interpreter_conf.interpretor_type == "ensemble" or chunked:
+                yield from self.__interpret_with_progress(interpreter_conf, results, save_dir)
+                return
+
+            print("Streaming interpretation with", interpreter_conf.interpretor_type, " via ", interpreter_conf.model_flavor)
+            if runner_type == "normal":
+                events = interpretor.interpret_stream(results, save_dir)
+            elif runner_type == "restricted":
+                events = interpretor.interpret_restricted_stream(results, save_dir)
+            elif runner_type == "suggest":
+                events = interpretor.interpret_with_suggestions_stream(results, save_dir)
+            else:
+                raise Exception(f"Invalid interpret_runner: {runner_type}")
+
+            try:
+                for event in events:
+                    if event["event"] == "token":
+                        yield event
+                    else:
+                        res = event["result"]
+            finally:
+                events.close()
+
+            model = f"{interpreter_conf.interpretor_type}/{interpreter_conf.model_flavor}"
+            stream = interpretor.last_stream
+            if res.get("error") is None and stream is not None:
+                # Cached interpretations have no stream, and are not timed
+                self.context.interpretor_latencies.record(model, stream["total_seconds"])
+                if stream["ttft_seconds"] is not None:
+                    self.context.interpretor_ttft.record(model, stream["ttft_seconds"])
+            yield {
+                "event": "result",
+                "interpreted_results": res,
+                "streamed": stream is not None,
+                "interpretation_cache": interpretor.last_cache,
+                "prompt": interpretor.last_prompt,
+                "timing": stream
+            }
+        except Exception as e:
+            yield {"event": "error", "error": str(e)}
+
+    def __interpret_with_progress(self, interpreter_conf: InterpretorConfig, results: list[dict], save_dir: str):
+        """Run `run_llm_interpretation` in the background, yielding its progress events, then its "result" event."""
+        events = queue.Queue()
+
+        def interpret() -> None:
+            try:
+                res, info = self.run_llm_interpretation(
+                    interpreter_conf, results, save_dir, preclassify=False, on_progress=events.put
+                )
+                events.put({
+                    "event": "result",
+                    "interpreted_results": res,
+                    "streamed": False,
+                    "interpretation_cache": info["cache"],
+                    "chunks": info["chunks"],
+                    "ensemble": info["ensemble"]
+                })
+            except Exception as e:
+                events.put({"event": "error", "error": str(e)})
+            finally:
+                events.put(None)
+
+        threading.Thread(target=interpret, name="llm-progress", daemon=True).start()
+        while (event := events.get()) is not None:
+            yield event
 
     def process_scan(self, conf: Config):
         save_dir = self.create_save_dir(conf.scanner)
-        nmap_results = self.scan_with_nmap(scanner_conf=conf.scanner, save_dir=save_dir)
-        interpreter_results = self.run_llm_interpretation(interpreter_conf=conf.interpretor, results=nmap_results, save_dir=save_dir)
-        return interpreter_results, nmap_results
+        nmap_results = self.scan_targets(scanner_conf=conf.scanner, scan_dir=save_dir)
+        scan_rows = [row for scan_result in nmap_results for row in scan_result.get("results", [])]
+        interpreter_results, interpretation = self.run_llm_interpretation(
+            interpreter_conf=conf.interpretor, results=scan_rows, save_dir=save_dir, nmap_args=conf.scanner.nmap_args
+        )
+        return interpreter_results, interpretation, nmap_results
     
 def scan():
     """Combined operation: Nmap scan + LLM interpretation."""
@@ -95,11 +1098,12 @@ def scan():
         return error_response
 
     try:
-        runner = Runner()
-        interpreted_results, raw_results = runner.process_scan(conf)
+        runner = Runner(get_server_context())
+        interpreted_results, interpretation, raw_results = runner.process_scan(conf)
         return jsonify({
             "raw_results": raw_results,
             "interpreted_results": interpreted_results,
+            **runner.interpretation_fields(interpretation)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -115,21 +1119,28 @@ def nmap_scan():
         scanner_config = request_model.scanner
 
         # Initialize runner
-        runner = Runner()
+        runner = Runner(get_server_context())
 
         # Create a save directory for the scan
         scan_dir = runner.create_save_dir(scanner_conf=scanner_config)
 
         # Run the scan for all targets
-        all_results = []
-        for target in scanner_config.target:
-            scan_result = runner.scan_with_nmap(scanner_conf=scanner_config, target=target, scan_dir=scan_dir)
-            all_results.append(scan_result)
+        start = time.perf_counter()
+        all_results = runner.scan_targets(scanner_conf=scanner_config, scan_dir=scan_dir)
 
         return jsonify({
             "data": all_results,
+            "scan_id": runner.scan_id_from_dir(scan_dir),
+            # Kept for clients written against the CSV files: /llm_interpret finds the stored scan from its directory
             "scan_file_path": os.path.join(scan_dir, "initial_scan_results.csv"),
-            "scan_dir_path": scan_dir
+            "scan_dir_path": scan_dir,
+            "timing": {
+                "total_seconds": round(time.perf_counter() - start, 3),
+                "concurrency": scanner_config.concurrency,
+                "phases": runner.phase_timing
+            },
+            "targets": runner.target_plan.stats(),
+            "limits": runner.scan_limits
         })
     except ValidationError as e:
         print(f"Validation Error: {e}")
@@ -140,6 +1151,32 @@ def nmap_scan():
 
 
 
+def nmap_scan_stream():
+    """
+    Run the Nmap scan and stream each host's results as soon as nmap finishes it.
+
+    The response is NDJSON (one JSON event per line) by default, or Server-Sent Events
+    when the client sends `Accept: text/event-stream` or `?format=sse`.
+    """
+    try:
+        request_model = NmapScanRequest(**request.get_json())
+        scanner_config = request_model.scanner
+
+        runner = Runner(get_server_context())
+        scan_dir = runner.create_save_dir(scanner_conf=scanner_config)
+        events = runner.stream_targets(scanner_conf=scanner_config, scan_dir=scan_dir)
+        return stream_events(events, stream_format())
+    except ValidationError as e:
+        return jsonify({"error": e.errors()}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _scan_nmap_args(context: ServerContext, scan_id: str | None, scan_dir: str) -> list[str] | None:
+    """nmap arguments of a stored scan, for the pre-classifier (None for scans only saved as CSV)."""
+    scan_id = scan_id or context.results_store.find_scan_id(scan_dir)
+    scan = context.results_store.get_scan(scan_id) if scan_id else None
+    return scan["nmap_args"].split() if scan is not None else None
+
 def llm_interpret():
     """Run only the LLM interpretation on provided scan results."""
     try:
@@ -149,16 +1186,66 @@ def llm_interpret():
         # Validate and extract configurations
         # conf = Config(scanner=request_model.scanner, interpretor=request_model.interpretor)
         conf = request_model.interpretor
-        raw_results = read_results_from_csv(request_model.scan_file_path)
+        context = get_server_context()
+        raw_results, scan_dir = read_scan_results(
+            context.results_store,
+            scan_id=request_model.scan_id,
+            scan_dir_path=request_model.scan_dir_path,
+            scan_file_path=request_model.scan_file_path
+        )
+
+        nmap_args = _scan_nmap_args(context, request_model.scan_id, scan_dir)
 
-        runner = Runner()
-        interpreted_results = runner.run_llm_interpretation(conf, raw_results, request_model.scan_dir_path)
+        runner = Runner(context)
+        # Identical interpretations requested at the same time share a single LLM call
+        flight_key = (
+            os.path.abspath(scan_dir), conf.interpretor_type, conf.model_flavor, conf.interpret_runner, conf.prompt_format,
+            conf.force_refresh, conf.chunking, conf.chunk_tokens, conf.reduce,
+            tuple((member.interpretor_type, member.model_flavor) for member in conf.ensemble or ()),
+            conf.hedge_delay, conf.cascade_min_confidence, tuple(conf.preclassify), conf.preclassify_min_confidence
+        )
+        (interpreted_results, interpretation), coalesced = context.interpretation_flights.do(
+            flight_key,
+            lambda: runner.run_llm_interpretation(conf, raw_results, scan_dir, nmap_args=nmap_args)
+        )
         return jsonify({
             "interpreted_results": interpreted_results,
+            "coalesced": coalesced,
+            "interpretation_cache": interpretation["cache"],
+            "prompt": interpretation["prompt"],
+            "chunks": interpretation["chunks"],
+            "ensemble": interpretation["ensemble"],
+            "rule": interpretation["rule"]
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def llm_interpret_stream():
+    """
+    Run only the LLM interpretation, streaming the model's answer as it is generated.
+
+    The response is NDJSON (one JSON event per line) by default, or Server-Sent Events
+    when the client sends `Accept: text/event-stream` or `?format=sse`.
+    """
+    try:
+        request_model = LLMInterpretRequest(**request.get_json())
+        context = get_server_context()
+        raw_results, scan_dir = read_scan_results(
+            context.results_store,
+            scan_id=request_model.scan_id,
+            scan_dir_path=request_model.scan_dir_path,
+            scan_file_path=request_model.scan_file_path
+        )
+        nmap_args = _scan_nmap_args(context, request_model.scan_id, scan_dir)
+
+        runner = Runner(context)
+        events = runner.stream_llm_interpretation(request_model.interpretor, raw_results, scan_dir, nmap_args=nmap_args)
+        return stream_events(events, stream_format())
+    except ValidationError as e:
+        return jsonify({"error": e.errors(include_context=False)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 def enumerate_subdomains():
     """Dummy function to return hardcoded subdomains for megacorpone.com."""
     try:
@@ -200,10 +1287,335 @@ def enumerate_subdomains():
 
 
 
-def create_api_server() -> Flask:
+def query_results():
+    """Query the results of every recorded scan (filters, pagination and sorting in the query string)."""
+    try:
+        query = ResultsQueryRequest(**request.args.to_dict())
+        return jsonify(get_server_context().results_store.query_results(**query.model_dump()))
+    except ValidationError as e:
+        return jsonify({"error": e.errors(include_context=False)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def get_scan(scan_id: str):
+    """Return a recorded scan, with the progress of its shards."""
+    store = get_server_context().results_store
+    scan = store.get_scan(scan_id)
+    if scan is None:
+        return jsonify({"error": f"Scan not found: {scan_id}"}), 404
+    shards = store.get_shards(scan_id)
+    progress = {}
+    for shard in shards:
+        progress[shard["status"]] = progress.get(shard["status"], 0) + 1
+    return jsonify({**scan, "shard_progress": progress, "shards": shards})
+
+def resume_scan(scan_id: str):
+    """Resume an interrupted scan: only the targets it had not finished are scanned, under the same scan ID."""
+    context = get_server_context()
+    if scan_id in context.running_scans:
+        return jsonify({"error": f"Scan {scan_id} is already running."}), 409
+    try:
+        runner = Runner(context)
+        start = time.perf_counter()
+        result = runner.resume_scan(scan_id)
+        return jsonify({
+            **result,
+            "timing": {
+                "total_seconds": round(time.perf_counter() - start, 3),
+                "phases": runner.phase_timing
+            }
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def list_scans():
+    """List the recorded scans, most recent first."""
+    page = max(1, request.args.get("page", default=1, type=int))
+    page_size = min(max(1, request.args.get("page_size", default=50, type=int)), 1000)
+    return jsonify(get_server_context().results_store.list_scans(page=page, page_size=page_size))
+
+def diff_scan_results():
+    """Compare two scans: new and disappeared hosts, opened and closed ports, service changes."""
+    try:
+        request_model = ScanDiffRequest(**request.get_json())
+        context = get_server_context()
+        base_rows, _ = read_scan(context.results_store, request_model.base_scan_id, request_model.base_scan_dir_path)
+        new_rows, scan_dir = read_scan(context.results_store, request_model.scan_id, request_model.scan_dir_path)
+        diff = diff_scans(base_rows, new_rows)
+
+        response = {"diff": diff}
+        if request_model.interpretor is not None:
+            # Only the changes go to the LLM, which is far smaller than the full scan
+            changes = diff_to_results(diff)
+            runner = Runner(context)
+            # The pre-classifier rules are about full scans, not about changes between two of them
+            response["interpreted_results"], interpretation = runner.run_llm_interpretation(
+                request_model.interpretor, changes, scan_dir, preclassify=False
+            ) if changes else ([], None)
+            response.update(runner.interpretation_fields(interpretation))
+        return jsonify(response)
+    except ValidationError as e:
+        return jsonify({"error": e.errors(include_context=False)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def metrics():
+    """Server counters."""
+    context = get_server_context()
+    return jsonify({
+        "single_flight": {
+            "scans": context.scan_flights.stats(),
+            "interpretations": context.interpretation_flights.stats()
+        },
+        "interpretation_cache": context.interpretation_cache.stats() if context.interpretation_cache is not None else None,
+        "governor": context.governor.stats(),
+        "interpretor_clients": context.interpretor_clients.stats(),
+        "interpretor_resilience": context.interpretor_resilience.stats(),
+        "interpretor_latencies": context.interpretor_latencies.stats(),
+        "interpretor_ttft": context.interpretor_ttft.stats(),
+        "preclassifier": context.preclassifier_stats.stats()
+    })
+
+def reload_interpretor_keys():
+    """Read the API keys again from .env and the environment; clients of replaced keys are rebuilt on next use."""
+    context = get_server_context()
+    load_dotenv(override=True)
+    dropped = context.interpretor_clients.reload(
+        {interpretor_type: os.getenv(variable) for interpretor_type, variable in API_KEY_VARIABLES.items()}
+    )
+    print(f"Reloaded the interpretor API keys, dropped {dropped} client(s)")
+    return jsonify({"dropped_clients": dropped, "interpretor_clients": context.interpretor_clients.stats()})
+
+def list_workers():
+    """Distributed scan workers: liveness, leased shards and throughput."""
+    context = get_server_context()
+    if not context.server_conf.shard_queue:
+        return jsonify({"error": "Distributed workers are disabled (NMAP_AUTOMATOR_SHARD_QUEUE is not set)."}), 404
+    return jsonify(context.shard_pool.workers())
+
+def _job_summary(job: dict) -> dict:
+    """Public view of a job record, without its (potentially large) result."""
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": {
+            "targets_done": job["targets_done"],
+            "targets_total": job["targets_total"]
+        },
+        "scan_dir_path": job["scan_dir"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+
+def submit_scan_job():
+    """Queue a combined Nmap scan + LLM interpretation job and return its ID right away."""
+    conf, error_response = parse_request_data()
+    if error_response:
+        return error_response
+
+    try:
+        job = get_server_context().job_manager.submit("scan", conf.model_dump())
+        return jsonify(_job_summary(job)), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def submit_nmap_scan_job():
+    """Queue an Nmap scan job and return its ID right away."""
+    try:
+        request_model = NmapScanRequest(**request.get_json())
+        job = get_server_context().job_manager.submit("nmap_scan", request_model.model_dump())
+        return jsonify(_job_summary(job)), 202
+    except ValidationError as e:
+        return jsonify({"error": e.errors()}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def submit_resume_scan_job(scan_id: str):
+    """Queue the resumption of an interrupted scan and return the job ID right away."""
+    context = get_server_context()
+    if context.results_store.get_scan(scan_id) is None:
+        return jsonify({"error": f"Scan not found: {scan_id}"}), 404
+    try:
+        job = context.job_manager.submit("resume_scan", {"scan_id": scan_id})
+        return jsonify(_job_summary(job)), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def list_jobs():
+    """List the most recent jobs, optionally filtered by status."""
+    limit = request.args.get("limit", default=50, type=int)
+    status = request.args.get("status")
+    jobs = get_server_context().job_manager.list_jobs(limit=limit, status=status)
+    return jsonify({"jobs": [_job_summary(job) for job in jobs]})
+
+def get_job(job_id: str):
+    """Return the status and progress of a job."""
+    job = get_server_context().job_manager.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(_job_summary(job))
+
+def get_job_results(job_id: str):
+    """Return the results of a finished job."""
+    job = get_server_context().job_manager.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    if job["result"] is None:
+        return jsonify({**_job_summary(job), "error": job["error"] or "Job has no results yet."}), 409
+    return jsonify({**_job_summary(job), "results": job["result"]})
+
+def cancel_job(job_id: str):
+    """Cancel a queued or running job, terminating its nmap processes."""
+    job = get_server_context().job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(_job_summary(job))
+
+def _schedule_summary(schedule: dict) -> dict:
+    """Public view of a recurring scan, with the state of its last run."""
+    context = get_server_context()
+    last_job = context.job_manager.get_job(schedule["last_job_id"]) if schedule["last_job_id"] else None
+    return {
+        "schedule_id": schedule["schedule_id"],
+        "name": schedule["name"],
+        "request": schedule["request"],
+        "interval_seconds": schedule["interval_seconds"],
+        "priority": schedule["priority"],
+        "overlap": schedule["overlap"],
+        "min_target_interval": schedule["min_target_interval"],
+        "enabled": schedule["enabled"],
+        "next_run_at": ScheduleStore.format_time(schedule["next_run_at"]),
+        "pending": schedule["pending"],
+        "last_run_at": schedule["last_run_at"],
+        "last_job": _job_summary(last_job) if last_job is not None else None,
+        "counters": {
+            "runs": schedule["runs"],
+            "skipped": schedule["skipped"],
+            "coalesced": schedule["coalesced"],
+            "deferred": schedule["deferred"]
+        },
+        "created_at": schedule["created_at"]
+    }
+
+def create_schedule():
+    """Record a recurring scan; its first run is due right away."""
+    try:
+        request_model = ScheduleRequest(**request.get_json())
+        job_request = {"scanner": request_model.scanner.model_dump()}
+        if request_model.interpretor is not None:
+            job_request["interpretor"] = request_model.interpretor.model_dump()
+        schedule = get_server_context().scheduler.create(
+            request_model.name,
+            job_request,
+            request_model.interval_seconds,
+            priority=request_model.priority,
+            overlap=request_model.overlap,
+            min_target_interval=request_model.min_target_interval,
+            enabled=request_model.enabled
+        )
+        return jsonify(_schedule_summary(schedule)), 201
+    except ValidationError as e:
+        return jsonify({"error": e.errors(include_context=False)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def list_schedules():
+    """List the recurring scans, highest priority first."""
+    schedules = get_server_context().scheduler.store.list_schedules()
+    return jsonify({"schedules": [_schedule_summary(schedule) for schedule in schedules]})
+
+def get_schedule(schedule_id: str):
+    """Return a recurring scan with its counters and the state of its last run."""
+    schedule = get_server_context().scheduler.store.get_schedule(schedule_id)
+    if schedule is None:
+        return jsonify({"error": f"Schedule not found: {schedule_id}"}), 404
+    return jsonify(_schedule_summary(schedule))
+
+def update_schedule(schedule_id: str):
+    """Change the interval, priority, overlap policy, minimum target interval or state of a recurring scan."""
+    store = get_server_context().scheduler.store
+    if store.get_schedule(schedule_id) is None:
+        return jsonify({"error": f"Schedule not found: {schedule_id}"}), 404
+    try:
+        update = ScheduleUpdateRequest(**request.get_json()).model_dump(exclude_none=True)
+        if "enabled" in update:
+            update["enabled"] = int(update["enabled"])
+        if update:
+            store.update_schedule(schedule_id, **update)
+        return jsonify(_schedule_summary(store.get_schedule(schedule_id)))
+    except ValidationError as e:
+        return jsonify({"error": e.errors(include_context=False)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def delete_schedule(schedule_id: str):
+    """Delete a recurring scan. A run in progress is left to finish."""
+    if not get_server_context().scheduler.store.delete_schedule(schedule_id):
+        return jsonify({"error": f"Schedule not found: {schedule_id}"}), 404
+    return jsonify({"deleted": schedule_id})
+
+def run_schedule(schedule_id: str):
+    """Make a recurring scan due right away."""
+    scheduler = get_server_context().scheduler
+    if scheduler.store.get_schedule(schedule_id) is None:
+        return jsonify({"error": f"Schedule not found: {schedule_id}"}), 404
+    scheduler.run_now(schedule_id)
+    return jsonify(_schedule_summary(scheduler.store.get_schedule(schedule_id))), 202
+
+
+def create_api_server(server_conf: ServerConfig = None) -> Flask:
+    load_dotenv()
     api_server = Flask(__name__)
+    context = ServerContext(server_conf)
+    context.job_manager = JobManager(
+        store=JobStore(os.path.join(context.server_conf.data_dir, "jobs.db")),
+        runner_factory=lambda: Runner(context),
+        max_workers=context.server_conf.job_workers
+    )
+    context.scheduler = ScanScheduler(
+        store=ScheduleStore(os.path.join(context.server_conf.data_dir, "schedules.db")),
+        job_manager=context.job_manager,
+        max_running=context.server_conf.scheduler_max_running,
+        min_target_interval=context.server_conf.scheduler_min_target_interval,
+        poll_interval=context.server_conf.scheduler_poll_seconds
+    )
+    if context.server_conf.scheduler_enabled:
+        context.scheduler.start()
+    api_server.extensions["nmap_automator"] = context
     api_server.add_url_rule('/scan', 'scan', scan, methods=['POST'])
     api_server.add_url_rule('/nmap_scan', 'nmap_scan', nmap_scan, methods=['POST'])
+    api_server.add_url_rule('/nmap_scan/stream', 'nmap_scan_stream', nmap_scan_stream, methods=['POST'])
     api_server.add_url_rule('/llm_interpret', 'llm_interpret', llm_interpret, methods=['POST'])
+    api_server.add_url_rule('/llm_interpret/stream', 'llm_interpret_stream', llm_interpret_stream, methods=['POST'])
     api_server.add_url_rule('/enumerate_subdomains', 'enumerate_subdomains', enumerate_subdomains, methods=['POST'])
+    api_server.add_url_rule('/results', 'query_results', query_results, methods=['GET'])
+    api_server.add_url_rule('/scans', 'list_scans', list_scans, methods=['GET'])
+    api_server.add_url_rule('/scans/<scan_id>', 'get_scan', get_scan, methods=['GET'])
+    api_server.add_url_rule('/scans/<scan_id>/resume', 'resume_scan', resume_scan, methods=['POST'])
+    api_server.add_url_rule('/scans/diff', 'diff_scan_results', diff_scan_results, methods=['POST'])
+    api_server.add_url_rule('/metrics', 'metrics', metrics, methods=['GET'])
+    api_server.add_url_rule('/workers', 'list_workers', list_workers, methods=['GET'])
+    api_server.add_url_rule('/jobs/scan', 'submit_scan_job', submit_scan_job, methods=['POST'])
+    api_server.add_url_rule('/jobs/nmap_scan', 'submit_nmap_scan_job', submit_nmap_scan_job, methods=['POST'])
+    api_server.add_url_rule('/jobs/scans/<scan_id>/resume', 'submit_resume_scan_job', submit_resume_scan_job, methods=['POST'])
+    api_server.add_url_rule('/jobs', 'list_jobs', list_jobs, methods=['GET'])
+    api_server.add_url_rule('/jobs/<job_id>', 'get_job', get_job, methods=['GET'])
+    api_server.add_url_rule('/jobs/<job_id>/results', 'get_job_results', get_job_results, methods=['GET'])
+    api_server.add_url_rule('/jobs/<job_id>/cancel', 'cancel_job', cancel_job, methods=['POST'])
+    api_server.add_url_rule('/schedules', 'create_schedule', create_schedule, methods=['POST'])
+    api_server.add_url_rule('/schedules', 'list_schedules', list_schedules, methods=['GET'])
+    api_server.add_url_rule('/schedules/<schedule_id>', 'get_schedule', get_schedule, methods=['GET'])
+    api_server.add_url_rule('/schedules/<schedule_id>', 'update_schedule', update_schedule, methods=['PATCH'])
+    api_server.add_url_rule('/schedules/<schedule_id>', 'delete_schedule', delete_schedule, methods=['DELETE'])
+    api_server.add_url_rule('/schedules/<schedule_id>/run', 'run_schedule', run_schedule, methods=['POST'])
+    api_server.add_url_rule('/interpretors/reload', 'reload_interpretor_keys', reload_interpretor_keys, methods=['POST'])
     return api_server
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from flask import current_app
+
+from nmap_automator.config_loader import ServerConfig
+from nmap_automator.storage import ResultsStore, ScanCache, InterpretationCache
+from nmap_automator.interpretors import InterpretorClients, InterpretorResilience, LatencyTracker, RuleClassifierStats
+from nmap_automator.scanner import ShardPool, ScanGovernor
+from nmap_automator.distributed import SqliteShardQueue, ShardCoordinator
+from nmap_automator.server.single_flight import SingleFlight
+
+
+class ServerContext:
+    """Process-wide state shared by every request handled by the API server."""
+
+    def __init__(self, server_conf: ServerConfig = None):
+        self.server_conf = server_conf or ServerConfig.from_env()
+        # Caps the number of nmap processes running at once across all requests and shares
+        # the packet rate budget between the running scans
+        self.governor = ScanGovernor(
+            max_processes=self.server_conf.max_scan_concurrency,
+            packet_rate=self.server_conf.packet_rate_budget
+        )
+        self.scan_slots = self.governor.process_slots
+        self.results_store = ResultsStore(os.path.join(self.server_conf.data_dir, "results.db"))
+        self.scan_cache = None
+        if self.server_conf.scan_cache_ttl > 0:
+            self.scan_cache = ScanCache(
+                os.path.join(self.server_conf.data_dir, "scan_cache.db"),
+                ttl=self.server_conf.scan_cache_ttl,
+                max_bytes=self.server_conf.scan_cache_max_mb * 1024 * 1024
+            )
+        self.interpretation_cache = None
+        if self.server_conf.interpretation_cache_ttl > 0:
+            self.interpretation_cache = InterpretationCache(
+                os.path.join(self.server_conf.data_dir, "interpretation_cache.db"),
+                ttl=self.server_conf.interpretation_cache_ttl,
+                max_bytes=self.server_conf.interpretation_cache_max_mb * 1024 * 1024
+            )
+        # LLM provider clients (and their connection pools) shared by the interpretors of every request
+        self.interpretor_clients = InterpretorClients()
+        # Recent latencies of each model, setting the delay of hedged ensemble interpretations and
+        # estimating the latency the pre-classifier saves
+        self.interpretor_latencies = LatencyTracker()
+        # Time to the first token of each model's streamed interpretations
+        self.interpretor_ttft = LatencyTracker()
+        # Interpretations the rule-based pre-classifier answered without the LLM
+        self.preclassifier_stats = RuleClassifierStats()
+        # Rate limits, retries, deadline and circuit breaker of the calls to each LLM provider
+        self.interpretor_resilience = InterpretorResilience(
+            rate_limits={
+                provider: (
+                    getattr(self.server_conf, f"{provider}_requests_per_minute"),
+                    getattr(self.server_conf, f"{provider}_tokens_per_minute")
+                )
+                for provider in ("gpt", "gemini", "ollama")
+            },
+            max_retries=self.server_conf.llm_max_retries,
+            retry_base_seconds=self.server_conf.llm_retry_base_seconds,
+            retry_max_seconds=self.server_conf.llm_retry_max_seconds,
+            deadline=self.server_conf.llm_call_deadline,
+            breaker_failures=self.server_conf.llm_breaker_failures,
+            breaker_reset_seconds=self.server_conf.llm_breaker_reset_seconds
+        )
+        # Worker processes scanning the shards of large ranges, shared by every request: local
+        # ones, or `nmap-automator worker` processes (on any host) taking them from the shard queue
+        if self.server_conf.shard_queue:
+            self.shard_pool = ShardCoordinator(
+                SqliteShardQueue(self.server_conf.shard_queue),
+                lease_seconds=self.server_conf.worker_lease_seconds
+            )
+        else:
+            self.shard_pool = ShardPool(workers=self.server_conf.shard_workers, scan_slots=self.scan_slots)
+        # Coalesce identical scans and interpretations running at the same time
+        self.scan_flights = SingleFlight()
+        self.interpretation_flights = SingleFlight()
+        # Scans running in this process: scan ID -> [thread running it, nesting depth]
+        self.running_scans = {}
+        self.__running_scans_lock = threading.Lock()
+        # Background job manager, attached by create_api_server
+        self.job_manager = None
+        # Recurring scan scheduler, attached by create_api_server
+        self.scheduler = None
+
+    @contextmanager
+    def track_scan(self, scan_id: str):
+        """
+        Mark a scan as running for the duration of the block.
+
+        A scan cannot run in two threads at once; the thread running it may nest blocks.
+        """
+        thread = threading.get_ident()
+        with self.__running_scans_lock:
+            owner = self.running_scans.setdefault(scan_id, [thread, 0])
+            if owner[0] != thread:
+                raise RuntimeError(f"Scan {scan_id} is already running.")
+            owner[1] += 1
+        try:
+            yield
+        finally:
+            with self.__running_scans_lock:
+                owner[1] -= 1
+                if owner[1] == 0:
+                    del self.running_scans[scan_id]
+
+
+def get_server_context() -> ServerContext:
+    """Return the context of the API server handling the current request."""
+    return current_app.extensions["nmap_automator"]
@@ -0,0 +1,64 @@
+import copy
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing the same key into a single execution.
+
+    The first caller of a key runs the function; callers arriving while it is still
+    running wait for it and receive (a copy of) its result, or its exception.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__flights: dict[Hashable, _Flight] = {}
+        self.__executed = 0
+        self.__coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Run `fn`, unless a call with the same key is already in flight.
+
+        :param key: Identifies identical work.
+        :param fn: Function doing the work.
+        :return: The result and whether it was shared from another caller's execution.
+        """
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.__flights[key] = _Flight()
+                self.__executed += 1
+            else:
+                self.__coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # Followers get their own copy, so that callers may annotate their result
+            return copy.deepcopy(flight.result), True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"executed": self.__executed, "coalesced": self.__coalesced, "in_flight": len(self.__flights)}
@@ -0,0 +1,8 @@
+# src/nmap_automator/storage/__init__.py
+from .sqlite_store import SqliteStore
+from .ttl_cache import TtlCache
+from .results_store import ResultsStore
+from .scan_cache import ScanCache
+from .interpretation_cache import InterpretationCache
+from .scan_journal import ScanJournal
+from .scan_diff import diff_scans, diff_to_results
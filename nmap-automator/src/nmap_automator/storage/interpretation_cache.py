@@ -0,0 +1,91 @@
+import json
+import hashlib
+import threading
+
+from .ttl_cache import TtlCache
+
+
+class InterpretationCache(TtlCache):
+    """
+    Persistent cache of LLM interpretations, keyed on the interpretor type, model flavor,
+    prompt and scan results.
+
+    Entries expire after `ttl` seconds. When the cached interpretations exceed `max_bytes`,
+    the least recently used entries are evicted first.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS interpretation_cache (
+            cache_key TEXT PRIMARY KEY,
+            interpretor_type TEXT NOT NULL,
+            model_flavor TEXT NOT NULL,
+            prompt_key TEXT NOT NULL,
+            result TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_interpretation_cache_last_used ON interpretation_cache (last_used_at)",
+    )
+
+    TABLE = "interpretation_cache"
+    VALUE_COLUMN = "result"
+
+    def __init__(self, db_path: str, ttl: int = 86400, max_bytes: int = 50 * 1024 * 1024) -> None:
+        super().__init__(db_path, ttl, max_bytes)
+        self.__counters = {"hits": 0, "misses": 0, "bypassed": 0}
+        self.__counters_lock = threading.Lock()
+
+    @staticmethod
+    def canonical_results(scan_results) -> str:
+        """
+        Scan results in a form that does not depend on row order or on value types.
+
+        Rows read back from a CSV file (strings) and from the results store (integers)
+        describe the same scan, so they share cache entries.
+        """
+        if isinstance(scan_results, str):
+            return scan_results.strip()
+        rows = [
+            json.dumps({str(key): "" if value is None else str(value) for key, value in row.items()}, sort_keys=True)
+            for row in scan_results
+        ]
+        return "\n".join(sorted(rows))
+
+    @classmethod
+    def cache_key(cls, interpretor_type: str, model_flavor: str, prompt_key: str, scan_results) -> str:
+        payload = "\0".join((interpretor_type, model_flavor, prompt_key, cls.canonical_results(scan_results)))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def __count(self, counter: str) -> None:
+        with self.__counters_lock:
+            self.__counters[counter] += 1
+
+    def record_bypass(self) -> None:
+        self.__count("bypassed")
+
+    def get(self, key: str) -> dict | None:
+        """
+        Look up a cached interpretation.
+
+        :return: {"result", "cached_at", "age_seconds"}, or None when missing or expired.
+        """
+        entry = self._get(key)
+        self.__count("misses" if entry is None else "hits")
+        return entry
+
+    def put(self, key: str, interpretor_type: str, model_flavor: str, prompt_key: str, result: dict) -> None:
+        """Cache an interpretation, then evict expired and least recently used entries."""
+        self._put(key, result, interpretor_type=interpretor_type, model_flavor=model_flavor, prompt_key=prompt_key)
+
+    def stats(self) -> dict:
+        with self.__counters_lock:
+            counters = dict(self.__counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+            **self.usage()
+        }
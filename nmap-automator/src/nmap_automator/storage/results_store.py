@@ -0,0 +1,404 @@
+import json
+import sqlite3
+import ipaddress
+from itertools import islice
+from typing import Iterable
+
+from .sqlite_store import SqliteStore
+
+
+def ip_version(ip: str) -> int:
+    try:
+        return ipaddress.ip_address(ip).version
+    except ValueError:
+        return 0
+
+def ip_key(ip: str) -> str:
+    """
+    Fixed-width hex form of an IP address.
+
+    Keys of the same IP version sort like the addresses themselves, so a CIDR
+    filter becomes an indexed range scan (`ip_key BETWEEN first AND last`).
+    """
+    try:
+        return f"{int(ipaddress.ip_address(ip)):032x}"
+    except ValueError:
+        return ''
+
+
+class ResultsStore(SqliteStore):
+    """
+    Indexed store of every host/port row produced by the scans.
+
+    Each row keeps the scan ID, the target it was scanned for, the nmap arguments
+    and the time it was recorded, so results from many scans can be read back
+    without re-parsing any file.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS scans (
+            scan_id TEXT PRIMARY KEY,
+            scan_dir TEXT NOT NULL,
+            nmap_args TEXT NOT NULL,
+            targets TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_results (
+            id INTEGER PRIMARY KEY,
+            scan_id TEXT NOT NULL REFERENCES scans (scan_id),
+            target TEXT NOT NULL,
+            ip TEXT NOT NULL,
+            protocol TEXT NOT NULL,
+            port INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            name TEXT NOT NULL,
+            product TEXT NOT NULL,
+            version TEXT NOT NULL,
+            nmap_args TEXT NOT NULL,
+            scanned_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scan_results_scan ON scan_results (scan_id)",
+        "CREATE INDEX IF NOT EXISTS idx_scan_results_ip ON scan_results (ip)",
+        "CREATE INDEX IF NOT EXISTS idx_scan_results_port ON scan_results (port, protocol)",
+        "CREATE INDEX IF NOT EXISTS idx_scan_results_service ON scan_results (name)",
+        "CREATE INDEX IF NOT EXISTS idx_scan_results_scan_dir ON scans (scan_dir)",
+    )
+
+    MIGRATIONS = (
+        # 1: indexed IP ranges, time ranges, and product/version substrings for historical queries
+        (
+            "ALTER TABLE scan_results ADD COLUMN ip_version INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE scan_results ADD COLUMN ip_key TEXT NOT NULL DEFAULT ''",
+            "UPDATE scan_results SET ip_version = ip_version(ip), ip_key = ip_key(ip)",
+            "CREATE INDEX IF NOT EXISTS idx_scan_results_ip_key ON scan_results (ip_version, ip_key)",
+            "CREATE INDEX IF NOT EXISTS idx_scan_results_scanned_at ON scan_results (scanned_at)",
+            "CREATE INDEX IF NOT EXISTS idx_scan_results_port_state ON scan_results (port, state)",
+            "CREATE INDEX IF NOT EXISTS idx_scan_results_product ON scan_results (product)",
+            "CREATE INDEX IF NOT EXISTS idx_scan_results_version ON scan_results (version)",
+            "CREATE INDEX IF NOT EXISTS idx_scans_created_at ON scans (created_at)",
+            # Products and versions repeat across rows, so only their distinct values are
+            # indexed for substring search (trigrams), then matched back through the indexes above
+            """
+            CREATE TABLE IF NOT EXISTS service_values (
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (kind, value)
+            )
+            """,
+            "CREATE VIRTUAL TABLE IF NOT EXISTS service_values_fts USING fts5(kind UNINDEXED, value, tokenize='trigram')",
+            """
+            CREATE TRIGGER IF NOT EXISTS service_values_fts_insert AFTER INSERT ON service_values BEGIN
+                INSERT INTO service_values_fts (kind, value) VALUES (new.kind, new.value);
+            END
+            """,
+            "INSERT OR IGNORE INTO service_values SELECT DISTINCT 'product', product FROM scan_results WHERE product != ''",
+            "INSERT OR IGNORE INTO service_values SELECT DISTINCT 'version', version FROM scan_results WHERE version != ''",
+        ),
+        # 2: progress of the shards large ranges are split into
+        (
+            """
+            CREATE TABLE IF NOT EXISTS scan_shards (
+                scan_id TEXT NOT NULL REFERENCES scans (scan_id),
+                target TEXT NOT NULL,
+                shard TEXT NOT NULL,
+                status TEXT NOT NULL,
+                hosts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                PRIMARY KEY (scan_id, shard)
+            )
+            """,
+        ),
+        # 3: distributed worker that scanned each shard
+        ("ALTER TABLE scan_shards ADD COLUMN worker_id TEXT",),
+    )
+
+    # Columns the query API can sort on. Rows are inserted in recording order, so sorting
+    # by id is equivalent to sorting by scanned_at and lets SQLite read an index in order.
+    SORT_COLUMNS = {
+        "scanned_at": "id",
+        "ip": "ip_version, ip_key",
+        "port": "port",
+        "protocol": "protocol",
+        "state": "state",
+        "name": "name",
+        "product": "product",
+        "version": "version",
+        "scan_id": "scan_id",
+    }
+
+    def __init__(self, db_path: str, batch_size: int = 1000) -> None:
+        """
+        :param db_path: Path of the SQLite database file.
+        :param batch_size: Number of rows sent to SQLite per executemany() call.
+        """
+        self.batch_size = batch_size
+        super().__init__(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = super()._connect()
+        conn.create_function("ip_version", 1, ip_version, deterministic=True)
+        conn.create_function("ip_key", 1, ip_key, deterministic=True)
+        return conn
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> dict:
+        """Convert a stored row back to the record shape produced by NmapScanner."""
+        return {
+            'IP': row["ip"],
+            'Protocol': row["protocol"],
+            'Port': row["port"],
+            'State': row["state"],
+            'Name': row["name"],
+            'Product': row["product"],
+            'Version': row["version"],
+            'Subdomain': row["target"]
+        }
+
+    def create_scan(self, scan_id: str, scan_dir: str, nmap_args: list[str], targets: list[str]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO scans (scan_id, scan_dir, nmap_args, targets, created_at) VALUES (?, ?, ?, ?, ?)",
+                (scan_id, scan_dir, " ".join(nmap_args), json.dumps(targets), self._now())
+            )
+
+    def add_results(self, scan_id: str, target: str, nmap_args: list[str], results: Iterable[dict]) -> int:
+        """
+        Record the rows of one scanned target, inserted in batches within one transaction.
+
+        :param scan_id: ID of the scan the rows belong to.
+        :param target: Target the rows were scanned for.
+        :param nmap_args: nmap arguments of the scan.
+        :param results: Rows in the NmapScanner record shape.
+        :return: Number of inserted rows.
+        """
+        args = " ".join(nmap_args)
+        scanned_at = self._now()
+        rows = (
+            (
+                scan_id, target, r['IP'], ip_version(r['IP']), ip_key(r['IP']), r['Protocol'], int(r['Port']),
+                r['State'], r.get('Name') or '', r.get('Product') or '', r.get('Version') or '', args, scanned_at
+            )
+            for r in results
+        )
+
+        inserted = 0
+        with self._transaction() as conn:
+            while batch := list(islice(rows, self.batch_size)):
+                conn.executemany(
+                    """
+                    INSERT INTO scan_results
+                        (scan_id, target, ip, ip_version, ip_key, protocol, port, state, name, product, version, nmap_args, scanned_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    batch
+                )
+                inserted += len(batch)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO service_values (kind, value) VALUES (?, ?)",
+                    {
+                        (kind, value)
+                        for row in batch
+                        for kind, value in (("product", row[9]), ("version", row[10]))
+                        if value
+                    }
+                )
+        return inserted
+
+    def recorded_targets(self, scan_id: str) -> set[str]:
+        """Targets of a scan that have rows in the store."""
+        with self._reader() as conn:
+            rows = conn.execute("SELECT DISTINCT target FROM scan_results WHERE scan_id = ?", (scan_id,)).fetchall()
+        return {row["target"] for row in rows}
+
+    def delete_results(self, scan_id: str, targets: Iterable[str]) -> int:
+        """Remove the rows of the given targets of a scan (e.g. rows of a target a resumed scan scans again)."""
+        with self._transaction() as conn:
+            cursor = conn.executemany("DELETE FROM scan_results WHERE scan_id = ? AND target = ?", [(scan_id, target) for target in targets])
+        return cursor.rowcount
+
+    def get_scan(self, scan_id: str) -> dict | None:
+        with self._reader() as conn:
+            row = conn.execute("SELECT * FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+        if row is None:
+            return None
+        scan = dict(row)
+        scan["targets"] = json.loads(scan["targets"])
+        return scan
+
+    def add_shards(self, scan_id: str, target: str, shards: list[str]) -> None:
+        """Record the shards a target of the scan is split into, as pending."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scan_shards (scan_id, target, shard, status) VALUES (?, ?, ?, 'pending')",
+                [(scan_id, target, shard) for shard in shards]
+            )
+
+    def update_shard(self, scan_id: str, shard: str, status: str, hosts: int = 0, error: str = None, worker_id: str = None) -> None:
+        """
+        Move a shard to "running", or to a final status ("completed", "failed", "cancelled").
+
+        `worker_id` names the distributed worker that scanned the shard, if any.
+        """
+        with self._transaction() as conn:
+            if status == "running":
+                conn.execute(
+                    "UPDATE scan_shards SET status = ?, started_at = ? WHERE scan_id = ? AND shard = ?",
+                    (status, self._now(), scan_id, shard)
+                )
+            else:
+                conn.execute(
+                    "UPDATE scan_shards SET status = ?, hosts = ?, error = ?, worker_id = ?, finished_at = ? WHERE scan_id = ? AND shard = ?",
+                    (status, hosts, error, worker_id, self._now(), scan_id, shard)
+                )
+
+    def get_shards(self, scan_id: str) -> list[dict]:
+        with self._reader() as conn:
+            rows = conn.execute("SELECT * FROM scan_shards WHERE scan_id = ? ORDER BY rowid", (scan_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_scan_id(self, scan_dir: str) -> str | None:
+        """Return the ID of the scan saved in `scan_dir`, if it was recorded in the store."""
+        with self._reader() as conn:
+            row = conn.execute("SELECT scan_id FROM scans WHERE scan_dir = ?", (scan_dir,)).fetchone()
+        return row["scan_id"] if row is not None else None
+
+    def get_results(self, scan_id: str) -> list[dict]:
+        """Return every row of a scan, in insertion order."""
+        with self._reader() as conn:
+            rows = conn.execute("SELECT * FROM scan_results WHERE scan_id = ? ORDER BY id", (scan_id,)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    @staticmethod
+    def _substring_filter(column: str, value: str) -> tuple[str, list]:
+        # The trigram index needs at least 3 characters; shorter substrings scan the
+        # (small) table of distinct values instead
+        if len(value) >= 3:
+            phrase = value.replace('"', '""')
+            return (
+                f"{column} IN (SELECT value FROM service_values_fts WHERE service_values_fts MATCH ? AND kind = ?)",
+                [f'value : "{phrase}"', column]
+            )
+        escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return (
+            f"{column} IN (SELECT value FROM service_values WHERE kind = ? AND value LIKE ? ESCAPE '\\')",
+            [column, f"%{escaped}%"]
+        )
+
+    def query_results(
+        self,
+        ip: str = None,
+        cidr: str = None,
+        port: int = None,
+        protocol: str = None,
+        state: str = None,
+        service: str = None,
+        product: str = None,
+        version: str = None,
+        scan_id: str = None,
+        target: str = None,
+        since: str = None,
+        until: str = None,
+        sort_by: str = "scanned_at",
+        sort_order: str = "desc",
+        page: int = 1,
+        page_size: int = 100
+    ) -> dict:
+        """
+        Filter the rows of every recorded scan. Each filter maps to an index.
+
+        :param ip: Exact IP address.
+        :param cidr: Network (e.g. "10.0.0.0/16"), matched as a range of the indexed IP keys.
+        :param port: Port number.
+        :param protocol: Protocol ("tcp", "udp", ...).
+        :param state: Port state ("open", "filtered", ...).
+        :param service: Exact service name (e.g. "ssh").
+        :param product: Case-insensitive substring of the product (e.g. "OpenSSH").
+        :param version: Case-insensitive substring of the version (e.g. "7.").
+        :param scan_id: Restrict to one scan.
+        :param target: Restrict to one scanned target.
+        :param since: Earliest recording time (ISO 8601, inclusive).
+        :param until: Latest recording time (ISO 8601, inclusive).
+        :param sort_by: One of SORT_COLUMNS.
+        :param sort_order: "asc" or "desc".
+        :param page: Page number, starting at 1.
+        :param page_size: Rows per page.
+        :return: {"total", "page", "page_size", "results"}.
+        """
+        if sort_by not in self.SORT_COLUMNS:
+            raise ValueError(f"sort_by must be one of {list(self.SORT_COLUMNS)}")
+        if sort_order not in ("asc", "desc"):
+            raise ValueError("sort_order must be 'asc' or 'desc'")
+
+        clauses = []
+        params = []
+        for column, value in (
+            ("ip", ip), ("port", port), ("protocol", protocol), ("state", state),
+            ("name", service), ("scan_id", scan_id), ("target", target)
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if cidr is not None:
+            network = ipaddress.ip_network(cidr, strict=False)
+            clauses.append("ip_version = ? AND ip_key BETWEEN ? AND ?")
+            params.extend([
+                network.version,
+                f"{int(network.network_address):032x}",
+                f"{int(network.broadcast_address):032x}"
+            ])
+        if since is not None:
+            clauses.append("scanned_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("scanned_at <= ?")
+            params.append(until)
+        for column, value in (("product", product), ("version", version)):
+            if value:
+                clause, clause_params = self._substring_filter(column, value)
+                clauses.append(clause)
+                params.extend(clause_params)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = ", ".join(f"{column} {sort_order.upper()}" for column in self.SORT_COLUMNS[sort_by].split(", "))
+        if sort_by != "scanned_at":
+            order += f", id {sort_order.upper()}"
+        with self._reader() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM scan_results{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM scan_results{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [*params, page_size, (page - 1) * page_size]
+            ).fetchall()
+
+        return {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "results": [
+                {**self._to_record(row), "scan_id": row["scan_id"], "nmap_args": row["nmap_args"], "scanned_at": row["scanned_at"]}
+                for row in rows
+            ]
+        }
+
+    def list_scans(self, page: int = 1, page_size: int = 50) -> dict:
+        """List the recorded scans, most recent first, with their row counts."""
+        with self._reader() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+            rows = conn.execute(
+                """
+                SELECT scans.*, (SELECT COUNT(*) FROM scan_results WHERE scan_results.scan_id = scans.scan_id) AS rows
+                FROM scans ORDER BY created_at DESC LIMIT ? OFFSET ?
+                """,
+                (page_size, (page - 1) * page_size)
+            ).fetchall()
+        scans = []
+        for row in rows:
+            scan = dict(row)
+            scan["targets"] = json.loads(scan["targets"])
+            scans.append(scan)
+        return {"total": total, "page": page, "page_size": page_size, "scans": scans}
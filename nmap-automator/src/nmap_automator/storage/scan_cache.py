@@ -0,0 +1,55 @@
+import hashlib
+
+from .ttl_cache import TtlCache
+
+
+class ScanCache(TtlCache):
+    """
+    Persistent cache of per-target scan results, keyed on the target and the nmap arguments.
+
+    Entries expire after `ttl` seconds. When the cached results exceed `max_bytes`,
+    the least recently used entries are evicted first.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS scan_cache (
+            cache_key TEXT PRIMARY KEY,
+            target TEXT NOT NULL,
+            nmap_args TEXT NOT NULL,
+            results TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scan_cache_last_used ON scan_cache (last_used_at)",
+    )
+
+    TABLE = "scan_cache"
+    VALUE_COLUMN = "results"
+
+    def __init__(self, db_path: str, ttl: int = 3600, max_bytes: int = 100 * 1024 * 1024) -> None:
+        super().__init__(db_path, ttl, max_bytes)
+
+    @staticmethod
+    def normalize_target(target: str) -> str:
+        return target.strip().lower().rstrip(".")
+
+    @classmethod
+    def cache_key(cls, target: str, nmap_args: list[str]) -> str:
+        # The order (and repetition) of nmap flags does not change the scan
+        args = " ".join(sorted(set(nmap_args)))
+        return hashlib.sha256(f"{cls.normalize_target(target)}\0{args}".encode()).hexdigest()
+
+    def get(self, target: str, nmap_args: list[str]) -> dict | None:
+        """
+        Look up the cached results of a target.
+
+        :return: {"results", "cached_at", "age_seconds"}, or None when missing or expired.
+        """
+        return self._get(self.cache_key(target, nmap_args))
+
+    def put(self, target: str, nmap_args: list[str], results: list[dict]) -> None:
+        """Cache the results of a target, then evict expired and least recently used entries."""
+        self._put(self.cache_key(target, nmap_args), results, target=target, nmap_args=" ".join(nmap_args))
@@ -0,0 +1,119 @@
+SERVICE_FIELDS = ("Name", "Product", "Version")
+
+
+def _port_key(row: dict) -> tuple[str, str, int]:
+    # CSV rows carry the port as a string, stored rows as an int
+    return row["IP"], row["Protocol"], int(row["Port"])
+
+
+def _index_rows(rows: list[dict]) -> dict[tuple[str, str, int], dict]:
+    """Hash the rows on (IP, Protocol, Port). A later row for the same port wins."""
+    return {_port_key(row): row for row in rows}
+
+
+def _is_open(row: dict | None) -> bool:
+    return row is not None and row.get("State") == "open"
+
+
+def _port_entry(key: tuple[str, str, int], row: dict, previous: dict | None = None) -> dict:
+    entry = {
+        "IP": key[0],
+        "Protocol": key[1],
+        "Port": key[2],
+        "State": row.get("State", ""),
+        "Name": row.get("Name", ""),
+        "Product": row.get("Product", ""),
+        "Version": row.get("Version", "")
+    }
+    if row.get("Subdomain"):
+        entry["Subdomain"] = row["Subdomain"]
+    if previous is not None:
+        entry["Previous State"] = previous.get("State", "")
+    return entry
+
+
+def diff_scans(base_rows: list[dict], new_rows: list[dict]) -> dict:
+    """
+    Compare two scans of the same targets.
+
+    Rows are hash-joined on (IP, Protocol, Port), so the diff runs in linear time.
+
+    - new_hosts / disappeared_hosts: IPs only present in the new / base scan.
+    - opened_ports: ports open in the new scan that were not open in the base scan
+      (including the open ports of new hosts).
+    - closed_ports: ports open in the base scan that are no longer open, on hosts
+      present in both scans (the ports of disappeared hosts are not repeated here).
+    - service_changes: ports open in both scans whose name, product or version changed.
+
+    :param base_rows: Rows of the earlier scan, in the NmapScanner record shape.
+    :param new_rows: Rows of the later scan.
+    :return: Dictionary with the lists above and a summary of their sizes.
+    """
+    base = _index_rows(base_rows)
+    new = _index_rows(new_rows)
+    base_hosts = {key[0] for key in base}
+    new_hosts = {key[0] for key in new}
+
+    opened_ports = []
+    service_changes = []
+    for key, row in new.items():
+        previous = base.get(key)
+        if _is_open(row) and not _is_open(previous):
+            opened_ports.append(_port_entry(key, row, previous))
+        elif _is_open(row) and _is_open(previous):
+            before = {field: previous.get(field, "") for field in SERVICE_FIELDS}
+            after = {field: row.get(field, "") for field in SERVICE_FIELDS}
+            if before != after:
+                service_changes.append({"IP": key[0], "Protocol": key[1], "Port": key[2], "before": before, "after": after})
+
+    closed_ports = []
+    for key, previous in base.items():
+        if key[0] not in new_hosts or not _is_open(previous):
+            continue
+        row = new.get(key)
+        if not _is_open(row):
+            # A port missing from the new scan is reported with its last known service
+            closed_ports.append(_port_entry(key, row if row is not None else {**previous, "State": "absent"}, previous))
+
+    sort_key = lambda entry: (entry["IP"], entry["Protocol"], entry["Port"])
+    opened_ports.sort(key=sort_key)
+    closed_ports.sort(key=sort_key)
+    service_changes.sort(key=sort_key)
+    diff = {
+        "new_hosts": sorted(new_hosts - base_hosts),
+        "disappeared_hosts": sorted(base_hosts - new_hosts),
+        "opened_ports": opened_ports,
+        "closed_ports": closed_ports,
+        "service_changes": service_changes
+    }
+    diff["summary"] = {name: len(values) for name, values in diff.items()}
+    return diff
+
+
+def diff_to_results(diff: dict) -> list[dict]:
+    """
+    Flatten a diff into rows an interpretor can take in place of the full scan.
+
+    Every row keeps the usual record fields plus a `Change` field describing what
+    happened to the port or host.
+    """
+    rows = []
+    for entry in diff["opened_ports"]:
+        rows.append({**entry, "Change": "opened"})
+    for entry in diff["closed_ports"]:
+        rows.append({**entry, "Change": "closed"})
+    for change in diff["service_changes"]:
+        before = " ".join(value for value in change["before"].values() if value)
+        rows.append({
+            "IP": change["IP"],
+            "Protocol": change["Protocol"],
+            "Port": change["Port"],
+            "State": "open",
+            **change["after"],
+            "Change": f"service changed (was: {before or 'unknown'})"
+        })
+    for ip in diff["new_hosts"]:
+        rows.append({"IP": ip, "Change": "new host"})
+    for ip in diff["disappeared_hosts"]:
+        rows.append({"IP": ip, "Change": "host disappeared"})
+    return rows
@@ -0,0 +1,93 @@
+import datetime
+import io
+import json
+import os
+import re
+import threading
+
+
+class ScanJournal:
+    """
+    Write-ahead journal of a scan, kept as `journal.jsonl` in the scan directory.
+
+    Every finished target (and, for large ranges, every finished shard or host) is appended
+    and flushed to disk before it is recorded anywhere else, so a scan interrupted by a crash
+    or a restart can be resumed: the journaled work is kept and only the rest is scanned again.
+
+    Records are JSON lines with an "event" key:
+    - "scan": the scanner configuration, written when the scan directory is created;
+    - "target": the result of a requested target;
+    - "shard": the rows of one shard of a sharded range;
+    - "host": the rows of one host of a range scanned by a single (resumable) nmap run.
+    """
+
+    FILE_NAME = "journal.jsonl"
+
+    def __init__(self, scan_dir: str) -> None:
+        self.scan_dir = scan_dir
+        self.path = os.path.join(scan_dir, self.FILE_NAME)
+        self.scanner: dict | None = None
+        # Requested target -> result
+        self.targets: dict[str, dict] = {}
+        # Range -> {shard: rows}
+        self.shards: dict[str, dict[str, list[dict]]] = {}
+        # Range -> {IP: rows}
+        self.hosts: dict[str, dict[str, list[dict]]] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def __append(self, record: dict) -> None:
+        record["time"] = datetime.datetime.now().isoformat(timespec="seconds")
+        line = json.dumps(record) + "\n"
+        with self.__lock, io.open(self.path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, scanner: dict) -> None:
+        """Record the scanner configuration of a new scan."""
+        self.scanner = scanner
+        self.__append({"event": "scan", "scanner": scanner})
+
+    def record_target(self, result: dict) -> None:
+        self.targets[result["target"]] = result
+        self.__append({"event": "target", "result": result})
+
+    def record_shard(self, target: str, shard: str, rows: list[dict]) -> None:
+        self.shards.setdefault(target, {})[shard] = rows
+        self.__append({"event": "shard", "target": target, "shard": shard, "results": rows})
+
+    def record_host(self, target: str, ip: str, rows: list[dict]) -> None:
+        self.hosts.setdefault(target, {})[ip] = rows
+        self.__append({"event": "host", "target": target, "ip": ip, "results": rows})
+
+    def resume_log(self, target: str) -> str:
+        """Path of the nmap log `--resume` continues a single-run scan of `target` from."""
+        os.makedirs(os.path.join(self.scan_dir, "resume"), exist_ok=True)
+        return os.path.join(self.scan_dir, "resume", re.sub(r"[^\w.-]", "_", target) + ".gnmap")
+
+    def load(self) -> "ScanJournal":
+        """
+        Read the journal back.
+
+        A line torn by a crash in the middle of a write is ignored, as if it had not been written.
+        """
+        with io.open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                event = record.get("event")
+                if event == "scan":
+                    self.scanner = record["scanner"]
+                elif event == "target":
+                    self.targets[record["result"]["target"]] = record["result"]
+                elif event == "shard":
+                    self.shards.setdefault(record["target"], {})[record["shard"]] = record["results"]
+                elif event == "host":
+                    self.hosts.setdefault(record["target"], {})[record["ip"]] = record["results"]
+        return self
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import datetime
+import threading
+from contextlib import closing, contextmanager
+
+
+class SqliteStore:
+    """
+    Base class for the server's SQLite-backed stores.
+
+    Every operation opens its own short-lived connection, so a store can be shared
+    freely between request threads and background workers. Writes are serialized
+    with a lock and the database runs in WAL mode so that readers never block them.
+    """
+
+    SCHEMA: tuple[str, ...] = ()
+    # Statements upgrading an existing database, one tuple per schema version (PRAGMA user_version)
+    MIGRATIONS: tuple[tuple[str, ...], ...] = ()
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        dirs = os.path.dirname(db_path)
+        if dirs:
+            os.makedirs(dirs, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for next_version, migration in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                for statement in migration:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {next_version}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Connection for a write transaction, committed on success and rolled back on error."""
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            yield conn
+
+    @contextmanager
+    def _reader(self):
+        with closing(self._connect()) as conn:
+            yield conn
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat(timespec="seconds")
@@ -0,0 +1,76 @@
+import json
+import time
+import datetime
+
+from .sqlite_store import SqliteStore
+
+
+class TtlCache(SqliteStore):
+    """
+    Base class of the SQLite caches: entries expire after `ttl` seconds and, when the
+    cached values exceed `max_bytes`, the least recently used entries are evicted first.
+
+    Subclasses create `TABLE` with the columns cache_key (primary key), size, created_at,
+    last_used_at and `VALUE_COLUMN` (the JSON value), plus any column of their own.
+    """
+
+    TABLE: str = None
+    VALUE_COLUMN: str = None
+
+    def __init__(self, db_path: str, ttl: int, max_bytes: int) -> None:
+        super().__init__(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _get(self, key: str) -> dict | None:
+        """
+        Look up an entry and mark it used.
+
+        :return: {VALUE_COLUMN, "cached_at", "age_seconds"}, or None when missing or expired.
+        """
+        with self._reader() as conn:
+            row = conn.execute(f"SELECT {self.VALUE_COLUMN}, created_at FROM {self.TABLE} WHERE cache_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        with self._transaction() as conn:
+            if now - row["created_at"] > self.ttl:
+                conn.execute(f"DELETE FROM {self.TABLE} WHERE cache_key = ?", (key,))
+                return None
+            conn.execute(f"UPDATE {self.TABLE} SET last_used_at = ? WHERE cache_key = ?", (now, key))
+        return {
+            self.VALUE_COLUMN: json.loads(row[self.VALUE_COLUMN]),
+            "cached_at": datetime.datetime.fromtimestamp(row["created_at"]).isoformat(timespec="seconds"),
+            "age_seconds": round(now - row["created_at"], 1)
+        }
+
+    def _put(self, key: str, value, **columns) -> None:
+        """Cache `value` with the other `columns` of the table, then evict expired and least recently used entries."""
+        payload = json.dumps(value)
+        now = time.time()
+        values = {"cache_key": key, **columns, self.VALUE_COLUMN: payload, "size": len(payload), "created_at": now, "last_used_at": now}
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                tuple(values.values())
+            )
+            conn.execute(f"DELETE FROM {self.TABLE} WHERE created_at < ?", (now - self.ttl,))
+            # Keep the most recently used entries that fit in max_bytes
+            conn.execute(
+                f"""
+                DELETE FROM {self.TABLE} WHERE cache_key IN (
+                    SELECT cache_key FROM (
+                        SELECT cache_key, SUM(size) OVER (ORDER BY last_used_at DESC, cache_key) AS used
+                        FROM {self.TABLE}
+                    ) WHERE used > ?
+                )
+                """,
+                (self.max_bytes,)
+            )
+
+    def usage(self) -> dict:
+        """{"entries", "size_bytes"} of the cache."""
+        with self._reader() as conn:
+            row = conn.execute(f"SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS size FROM {self.TABLE}").fetchone()
+        return {"entries": row["entries"], "size_bytes": row["size"]}
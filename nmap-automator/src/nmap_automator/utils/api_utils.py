@@ -1,5 +1,7 @@
+import os
 import csv
-from flask import jsonify, request
+import json
+from flask import Response, jsonify, request
 from nmap_automator.config_loader.config import Config
 
 def parse_request_data():
@@ -18,6 +20,39 @@ def parse_request_data():
         error_response.status_code = 400
         return None, error_response
 
+def read_scan_results(results_store, scan_id: str = None, scan_dir_path: str = None, scan_file_path: str = None) -> tuple[list[dict], str]:
+    """
+    Load the rows of a scan, from the results store whenever the scan was recorded there.
+
+    The scan is looked up by ID, then by its directory (the directory of `scan_file_path`
+    when only that is given). Scans older than the results store fall back to their CSV file.
+
+    :return: The scan rows and the scan directory to save the interpretation in.
+    """
+    if scan_id is None:
+        scan_dir = scan_dir_path or (os.path.dirname(scan_file_path) if scan_file_path else None)
+        if scan_dir:
+            scan_id = results_store.find_scan_id(scan_dir)
+
+    if scan_id is not None:
+        scan = results_store.get_scan(scan_id)
+        if scan is None:
+            raise ValueError(f"Scan not found: {scan_id}")
+        return results_store.get_results(scan_id), scan_dir_path or scan["scan_dir"]
+
+    if scan_file_path is None:
+        raise ValueError(f"No stored scan found for directory: {scan_dir_path}")
+    return read_results_from_csv(scan_file_path), scan_dir_path or os.path.dirname(scan_file_path)
+
+def read_scan(results_store, scan_id: str = None, scan_dir_path: str = None) -> tuple[list[dict], str]:
+    """
+    Load a scan by ID or by data directory, including scans that were only saved as CSV.
+
+    :return: The scan rows and the scan directory.
+    """
+    legacy_file = os.path.join(scan_dir_path, "initial_scan_results.csv") if scan_dir_path and not scan_id else None
+    return read_scan_results(results_store, scan_id=scan_id, scan_dir_path=scan_dir_path, scan_file_path=legacy_file)
+
 def read_results_from_csv(file_path):
     """Read scan results from a CSV file."""
     try:
@@ -28,3 +63,36 @@ def read_results_from_csv(file_path):
         raise ValueError(f"File not found: {file_path}")
     except Exception as e:
         raise ValueError(f"Error reading file {file_path}: {e}")
+
+
+def stream_format() -> str:
+    """Pick the streaming format of the current request: "sse" or "ndjson" (default)."""
+    requested = request.args.get("format")
+    if requested in ("sse", "ndjson"):
+        return requested
+    if request.accept_mimetypes.best == "text/event-stream":
+        return "sse"
+    return "ndjson"
+
+def stream_events(events, fmt: str = "ndjson") -> Response:
+    """
+    Wrap a generator of event dictionaries into a streaming response.
+
+    Flask closes the generator when the client disconnects, which lets the producer
+    clean up (e.g. terminate nmap) in its `finally` block.
+    """
+    def encode(event: dict) -> str:
+        if fmt == "sse":
+            return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    def generate():
+        try:
+            for event in events:
+                yield encode(event)
+        finally:
+            events.close()
+
+    if fmt == "sse":
+        return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+    return Response(generate(), mimetype="application/x-ndjson")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+from nmap_automator.config_loader.config import ServerConfig
+from nmap_automator.server import create_api_server
+from nmap_automator.storage import ttl_cache
+
+FAKE_NMAP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_nmap.py")
+
+# A recorded `-A` scan of three hosts: two with identified services, one with a filtered port only
+SCAN_XML = """<?xml version="1.0"?>
+<nmaprun scanner="nmap" args="nmap -A -T3 -v">
+<host><status state="up" reason="syn-ack"/><address addr="10.0.0.1" addrtype="ipv4"/>
+<hostnames><hostname name="www.example.test" type="PTR"/></hostnames><ports>
+<port protocol="tcp" portid="22"><state state="open" reason="syn-ack"/><service name="ssh" product="OpenSSH" version="9.6"/></port>
+<port protocol="tcp" portid="80"><state state="open" reason="syn-ack"/><service name="http" product="nginx" version="1.24.0"/></port>
+</ports><times srtt="1200" rttvar="300" to="100000"/></host>
+<host><status state="up" reason="syn-ack"/><address addr="10.0.0.2" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="443"><state state="open" reason="syn-ack"/><service name="https" product="Apache httpd" version="2.4.58"/></port>
+</ports></host>
+<host timedout="true"><status state="up" reason="syn-ack"/><address addr="10.0.1.5" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="445"><state state="filtered" reason="no-response"/><service name="microsoft-ds"/></port>
+</ports></host>
+<runstats><finished time="0" elapsed="0"/></runstats></nmaprun>
+"""
+
+
+class Clock:
+    """Settable replacement of a time function."""
+
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def cache_clock(monkeypatch) -> Clock:
+    """Clock of the TTL caches."""
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def scan_xml(tmp_path) -> str:
+    path = tmp_path / "scan.xml"
+    path.write_text(SCAN_XML)
+    return str(path)
+
+
+@pytest.fixture
+def fake_nmap(tmp_path, monkeypatch, scan_xml) -> str:
+    """Put an `nmap` replaying SCAN_XML (benchmarks/fake_nmap.py) first on PATH; return the fixture path."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    shim = bin_dir / "nmap"
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_NMAP}" "$@"\n')
+    shim.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_NMAP_FIXTURE", scan_xml)
+    monkeypatch.setenv("FAKE_NMAP_SCALE", "0")
+    return scan_xml
+
+
+@pytest.fixture
+def client(tmp_path, fake_nmap):
+    app = create_api_server(ServerConfig(data_dir=str(tmp_path / "data"), scheduler_enabled=False))
+    app.config["TESTING"] = True
+    return app.test_client()
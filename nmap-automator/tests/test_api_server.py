@@ -0,0 +1,165 @@
+import json
+import os
+import time
+
+from nmap_automator.storage.scan_journal import ScanJournal
+
+def scan_request(tmp_path, targets: list[str], **scanner) -> dict:
+    return {"scanner": {"nmap_args": ["-sV"], "save_dir": str(tmp_path / "scans"), "target": targets, **scanner}}
+
+
+def test_nmap_scan_scans_every_target(client, tmp_path):
+    response = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.2", "10.0.1.5", "10.0.2.1"], concurrency=2))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["timing"]["concurrency"] == 2
+    # One result per target, in request order, whatever order they finished in
+    assert [result["target"] for result in body["data"]] == ["10.0.0.2", "10.0.1.5", "10.0.2.1"]
+    assert [[row["Port"] for row in result["results"]] for result in body["data"]] == [[443], [445], []]
+
+
+def test_nmap_scan_job(client, tmp_path):
+    response = client.post("/jobs/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1", "10.0.0.2"]))
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    deadline = time.monotonic() + 10
+    while (job := client.get(f"/jobs/{job_id}").get_json())["status"] not in ("completed", "failed"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert job["status"] == "completed"
+    assert job["progress"] == {"targets_done": 2, "targets_total": 2}
+    results = client.get(f"/jobs/{job_id}/results").get_json()["results"]
+    assert [result["target"] for result in results["data"]] == ["10.0.0.1", "10.0.0.2"]
+    assert client.get("/jobs/job_missing").status_code == 404
+
+
+def test_stream_sends_hosts_then_done_events(client, tmp_path):
+    response = client.post("/nmap_scan/stream", json=scan_request(tmp_path, ["10.0.0.0/24"]))
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.data.decode().splitlines() if line]
+    assert [event["event"] for event in events] == ["plan", "host", "host", "target_done", "scan_done"]
+    assert [event["host"]["IP"] for event in events if event["event"] == "host"] == ["10.0.0.1", "10.0.0.2"]
+    assert events[3]["hosts"] == 2
+
+
+def test_stream_as_server_sent_events(client, tmp_path):
+    response = client.post("/nmap_scan/stream?format=sse", json=scan_request(tmp_path, ["10.0.0.2"]))
+    assert response.mimetype == "text/event-stream"
+    events = [line.split(": ", 1)[1] for line in response.data.decode().splitlines() if line.startswith("event: ")]
+    assert events == ["plan", "host", "target_done", "scan_done"]
+
+
+def test_scans_are_recorded(client, tmp_path):
+    body = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1", "10.0.1.5"])).get_json()
+    scan = client.get(f"/scans/{body['scan_id']}").get_json()
+    assert scan["scan_dir"] == body["scan_dir_path"]
+    assert [listed["scan_id"] for listed in client.get("/scans").get_json()["scans"]] == [body["scan_id"]]
+    assert client.get("/scans/scan_missing").status_code == 404
+
+
+def test_scan_file_path_still_finds_the_scan(client, tmp_path):
+    body = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.1.5"])).get_json()
+    assert body["scan_file_path"] == os.path.join(body["scan_dir_path"], "initial_scan_results.csv")
+    response = client.post("/llm_interpret", json={
+        "scan_file_path": body["scan_file_path"],
+        "interpretor": {"interpretor_type": "gpt", "model_flavor": "gpt-4o", "interpret_runner": "normal"}
+    })
+    # Every port is filtered: the pre-classifier answers without calling the model
+    assert response.get_json()["interpreted_results"]["result"] == "Incomplete"
+
+
+def test_query_results(client, tmp_path):
+    scan_id = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.0/24", "10.0.1.5"])).get_json()["scan_id"]
+    rows = client.get(f"/results?scan_id={scan_id}&state=open&sort_by=port&sort_order=asc").get_json()["results"]
+    assert [(row["IP"], row["Port"]) for row in rows] == [("10.0.0.1", 22), ("10.0.0.1", 80), ("10.0.0.2", 443)]
+    rows = client.get("/results?cidr=10.0.1.0/24").get_json()["results"]
+    assert [(row["IP"], row["State"]) for row in rows] == [("10.0.1.5", "filtered")]
+    rows = client.get("/results?product=openssh").get_json()["results"]
+    assert [row["Port"] for row in rows] == [22]
+
+
+def test_identical_scans_are_answered_from_the_cache(client, tmp_path):
+    first = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1"])).get_json()["data"][0]
+    second = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1"])).get_json()["data"][0]
+    refreshed = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1"], force_refresh=True)).get_json()["data"][0]
+    assert (first["cache"]["hit"], second["cache"]["hit"], refreshed["cache"]["hit"]) == (False, True, False)
+    assert second["results"] == first["results"]
+
+
+def test_failed_nmap_is_reported(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_NMAP_FIXTURE", str(tmp_path / "missing.xml"))
+    result = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1"])).get_json()["data"][0]
+    assert "nmap failed" in result["error"]
+    assert "results" not in result
+
+
+def test_two_phase_scan_finds_the_same_services(client, tmp_path):
+    targets = ["10.0.0.0/24", "10.0.1.5"]
+    single = client.post("/nmap_scan", json=scan_request(tmp_path, targets, nmap_args=["-A"])).get_json()
+    two_phase = client.post(
+        "/nmap_scan", json=scan_request(tmp_path, targets, nmap_args=["-A"], scan_mode="two_phase", force_refresh=True)
+    ).get_json()
+    assert [result["results"] for result in two_phase["data"]] == [result["results"] for result in single["data"]]
+    assert two_phase["timing"]["phases"]["hosts_with_open_ports"] == 2
+
+
+def test_overlapping_targets_are_scanned_once(client, tmp_path):
+    body = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.0/24", "10.0.0.1", "10.0.0.1."])).get_json()
+    assert body["targets"] == {"requested": 3, "unique": 2, "planned": 1, "deduplicated": 2, "unresolved": []}
+    network, host = body["data"]
+    assert {row["IP"] for row in network["results"]} == {"10.0.0.1", "10.0.0.2"}
+    assert host["scanned_as"] == "10.0.0.0/24"
+    assert [(row["Port"], row["Subdomain"]) for row in host["results"]] == [(22, "10.0.0.1"), (80, "10.0.0.1")]
+
+
+def test_failed_shards_are_not_journaled(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_NMAP_FIXTURE", str(tmp_path / "missing.xml"))
+    body = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.0/24"], shard_size=128)).get_json()
+    result = body["data"][0]
+    assert result["shards"]["failed"] == ["10.0.0.0/25", "10.0.0.128/25"]
+    assert ScanJournal(body["scan_dir_path"]).load().shards == {}
+
+
+def test_resume_scans_only_the_unfinished_targets(client, tmp_path, monkeypatch):
+    body = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.0.1", "10.0.0.2"], force_refresh=True)).get_json()
+
+    # Interrupt the scan after its first target
+    journal = ScanJournal(body["scan_dir_path"])
+    with open(journal.path) as f:
+        records = [json.loads(line) for line in f]
+    with open(journal.path, "w") as f:
+        for record in records:
+            if record["event"] == "scan" or record["result"]["target"] == "10.0.0.1":
+                f.write(json.dumps(record) + "\n")
+
+    # Hosts scanned again now answer with nothing
+    empty = tmp_path / "empty.xml"
+    empty.write_text('<?xml version="1.0"?>\n<nmaprun scanner="nmap"></nmaprun>\n')
+    monkeypatch.setenv("FAKE_NMAP_FIXTURE", str(empty))
+
+    resumed = client.post(f"/scans/{body['scan_id']}/resume").get_json()
+    assert resumed["resumed"] == {"finished_before": 1, "scanned": 1}
+    finished, rescanned = resumed["data"]
+    assert finished["results"] == body["data"][0]["results"]
+    assert rescanned["results"] == []
+    # The rows stored before the interruption for the unfinished target are gone
+    rows = client.get(f"/results?scan_id={body['scan_id']}").get_json()["results"]
+    assert {row["IP"] for row in rows} == {"10.0.0.1"}
+    assert client.post("/scans/scan_missing/resume").status_code == 404
+
+
+def test_llm_interpret_short_circuits_filtered_scans(client, tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    scan_id = client.post("/nmap_scan", json=scan_request(tmp_path, ["10.0.1.5"])).get_json()["scan_id"]
+    response = client.post("/llm_interpret", json={
+        "scan_id": scan_id,
+        "interpretor": {"interpretor_type": "gpt", "model_flavor": "gpt-4o", "interpret_runner": "suggest"}
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["rule"]["rule"] == "all_filtered"
+    assert body["interpreted_results"]["result"] == "Incomplete"
+    assert body["interpreted_results"]["next_arguments"] == ["-Pn", "-sT"]
+    assert client.get("/metrics").get_json()["preclassifier"]["short_circuited"] == 1
@@ -0,0 +1,32 @@
+import threading
+
+from nmap_automator.distributed.coordinator import ShardCoordinator
+from nmap_automator.distributed.shard_queue import SqliteShardQueue
+from nmap_automator.distributed.worker import ShardWorker
+
+
+def test_coordinator_collects_the_shards_of_a_worker(fake_nmap, tmp_path):
+    queue = SqliteShardQueue(str(tmp_path / "queue.db"))
+    worker = ShardWorker(queue, worker_id="worker-1", poll_interval=0.01)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        results = ShardCoordinator(queue, poll_interval=0.01).run(["10.0.1.0/24", "10.0.0.0/24"], "-sV")
+    finally:
+        worker.stop()
+        thread.join()
+    assert [(result["shard"], result["worker_id"], len(result["results"])) for result in results] == [
+        ("10.0.1.0/24", "worker-1", 1), ("10.0.0.0/24", "worker-1", 3)
+    ]
+
+
+def test_failed_nmap_run_fails_the_shard(fake_nmap, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_NMAP_FIXTURE", str(tmp_path / "missing.xml"))
+    queue = SqliteShardQueue(str(tmp_path / "queue.db"))
+    queue.enqueue("batch", ["10.0.0.0/24"], "-sV", "native")
+    ShardWorker(queue, worker_id="worker-1").run(exit_when_idle=True)
+
+    task, = queue.batch_status("batch")
+    assert task["status"] == "failed"
+    assert task["error"].startswith("nmap failed")
+    assert [(worker["shards_completed"], worker["shards_failed"]) for worker in queue.worker_stats(60)] == [(0, 1)]
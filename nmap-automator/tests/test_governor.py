@@ -0,0 +1,47 @@
+from nmap_automator.scanner.governor import ScanGovernor
+
+
+def test_packet_rate_is_shared_between_scans_and_processes():
+    governor = ScanGovernor(packet_rate=1000)
+    first = governor.track("first", host_timeout=30)
+    assert first.arguments("-sV", processes=2) == "-sV --host-timeout 30s --max-rate 500"
+
+    second = governor.track("second", max_rate=200)
+    assert governor.rate_for(first, 1) == 500
+    assert governor.rate_for(second, 4) == 50
+    governor.untrack(second)
+    assert governor.rate_for(first, 1) == 1000
+
+
+def test_no_budget_no_rate():
+    governor = ScanGovernor()
+    assert governor.track().arguments("-sV") == "-sV"
+
+
+def test_rate_backs_off_on_congestion_and_recovers():
+    governor = ScanGovernor(packet_rate=1000)
+    scan = governor.track("scan")
+    scan.observe("10.0.0.1", {"srtt": [1000, 1200], "host_timeouts": 0, "dropped_probes": 0})
+    assert scan.rate_factor == 1.0
+    # RTTs inflated above twice the best median seen
+    scan.observe("10.0.0.2", {"srtt": [5000], "host_timeouts": 1, "dropped_probes": 0})
+    assert scan.rate_factor == 0.5
+    scan.observe("10.0.0.3", {"srtt": [], "host_timeouts": 0, "dropped_probes": 3}, timed_out=True)
+    assert scan.rate_factor == 0.25
+    assert governor.rate_for(scan, 1) == 250
+    scan.observe("10.0.0.4", {"srtt": [1100], "host_timeouts": 0, "dropped_probes": 0})
+    assert scan.rate_factor == 0.35
+
+    hit = scan.report()["hit"]
+    assert (hit["host_timeouts"], hit["target_timeouts"]) == (1, ["10.0.0.3"])
+    assert scan.report()["packet_rate"]["decreases"] == 2
+
+
+def test_process_cap_waits_are_counted():
+    governor = ScanGovernor(max_processes=1)
+    scan = governor.track("scan")
+    assert scan.acquire()
+    assert not scan.acquire(timeout=0.01)
+    scan.release()
+    assert scan.report()["hit"]["process_cap_waits"] == 1
+    assert governor.stats()["running_processes"] == 0
@@ -0,0 +1,35 @@
+import json
+
+from nmap_automator.storage.interpretation_cache import InterpretationCache
+
+ROWS = [{"IP": "10.0.0.1", "Port": 22, "State": "open"}]
+RESULT = {"error": None, "result": "Completed", "analysis_description": "ok", "next_arguments": None}
+
+
+def test_cache_key_ignores_row_order_and_value_types():
+    rows = [{"IP": "10.0.0.1", "Port": 22}, {"IP": "10.0.0.2", "Port": 80}]
+    from_csv = [{"IP": "10.0.0.2", "Port": "80"}, {"IP": "10.0.0.1", "Port": "22"}]
+    key = InterpretationCache.cache_key("gpt", "gpt-4o", "default", rows)
+    assert key == InterpretationCache.cache_key("gpt", "gpt-4o", "default", from_csv)
+    assert key != InterpretationCache.cache_key("gpt", "gpt-4o", "restricted", rows)
+    assert key != InterpretationCache.cache_key("gpt", "gpt-4o-mini", "default", rows)
+
+
+def test_expiry_eviction_and_stats(tmp_path, cache_clock):
+    cache = InterpretationCache(str(tmp_path / "cache.db"), ttl=100, max_bytes=len(json.dumps(RESULT)))
+    key = InterpretationCache.cache_key("gpt", "gpt-4o", "default", ROWS)
+    other = InterpretationCache.cache_key("gpt", "gpt-4o", "default", [])
+    cache.put(key, "gpt", "gpt-4o", "default", RESULT)
+    assert cache.get(key)["result"] == RESULT
+
+    # Only one entry fits: caching another one evicts the first
+    cache_clock.now += 1
+    cache.put(other, "gpt", "gpt-4o", "default", RESULT)
+    assert cache.get(key) is None
+
+    cache_clock.now += 101
+    assert cache.get(other) is None
+    cache.record_bypass()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bypassed"], stats["hit_rate"]) == (1, 2, 1, 0.333)
+    assert stats["entries"] == 0
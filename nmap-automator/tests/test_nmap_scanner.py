@@ -0,0 +1,51 @@
+import pytest
+
+from nmap_automator.scanner.nmap_scanner import NmapScanner
+
+
+@pytest.fixture
+def unprivileged(monkeypatch):
+    monkeypatch.setattr(NmapScanner, "is_privileged", staticmethod(lambda: False))
+
+
+@pytest.mark.parametrize("arguments, sweep", [
+    ("-A -T3 -v", "-sT -T4"),
+    ("-sV --privileged", "-sS -T4"),
+    ("-sS -sV", "-sS -T4"),
+    # The requested ports are swept, not nmap's default ones
+    ("-A -p 1-1000 -T3", "-sT -p 1-1000 -T4"),
+    ("-A -p1-1000", "-sT -p1-1000 -T4"),
+    ("-sV -F", "-sT -F -T4"),
+    ("-sV --top-ports 100 --exclude-ports=25", "-sT --top-ports 100 --exclude-ports=25 -T4"),
+    ("-sV -p- -Pn", "-sT -p- -T4"),
+    # UDP scans stay UDP, alone or next to the TCP scan type
+    ("-sU -sV -p 53,161", "-sU -p 53,161 -T4"),
+    ("-sS -sU -A", "-sS -sU -T4"),
+])
+def test_sweep_arguments(unprivileged, arguments, sweep):
+    assert NmapScanner.sweep_arguments(arguments) == sweep
+
+
+@pytest.mark.parametrize("arguments, service", [
+    ("-A -T3 -v", "-A -T3 -v -Pn -p 22,80"),
+    # Port options are replaced with their values
+    ("-A -p 1-1000 -T3", "-A -T3 -Pn -p 22,80"),
+    ("-A -p1-1000", "-A -Pn -p 22,80"),
+    ("-sV -F --top-ports=100 --port-ratio 0.1", "-sV -Pn -p 22,80"),
+    # No UDP port is open: the UDP scan is dropped
+    ("-sS -sU -sV -p 1-100", "-sS -sV -Pn -p 22,80"),
+])
+def test_service_arguments(arguments, service):
+    assert NmapScanner.service_arguments(arguments, [22, 80]) == service
+
+
+def test_service_arguments_with_udp_ports():
+    assert NmapScanner.service_arguments("-sS -sU -sV -p 1-100", [22], [53]) == "-sS -sU -sV -Pn -p T:22,U:53"
+    # Only UDP ports are open: no TCP scan
+    assert NmapScanner.service_arguments("-sS -sU -sV", [], [53, 161]) == "-sU -sV -Pn -p U:53,U:161"
+
+
+def test_split_port_options():
+    assert NmapScanner.split_port_options(["-sV", "-p", "80", "-Pn", "--top-ports", "10", "-v"]) == (
+        ["-p", "80", "--top-ports", "10"], ["-sV", "-Pn", "-v"]
+    )
@@ -0,0 +1,30 @@
+from nmap_automator.interpretors.prompt_serializer import serialize, serialize_compact
+from nmap_automator.storage.scan_diff import diff_scans, diff_to_results
+
+from .test_scan_diff import BASE, NEW
+
+
+def test_compact_lists_open_ports_and_counts_the_others():
+    assert serialize_compact(BASE).splitlines() == [
+        "hosts: 2, open ports: 3",
+        "host 10.0.0.1 open=2 closed=1",
+        "  22/tcp ssh OpenSSH 8.9",
+        "  80/tcp http nginx 1.24.0",
+        "host 10.0.0.2 open=1",
+        "  80/tcp http nginx 1.24.0",
+    ]
+
+
+def test_compact_keeps_the_changes_of_a_diff():
+    prompt = serialize(diff_to_results(diff_scans(BASE, NEW)), "compact")
+    assert prompt.splitlines() == [
+        "hosts: 3, open ports: 3",
+        "host 10.0.0.1 open=2 absent=1",
+        "  22/tcp ssh OpenSSH 9.6 [service changed (was: ssh OpenSSH 8.9)]",
+        # Closed ports are listed too, since the change is what matters
+        "  80/tcp http nginx 1.24.0 state=absent was=open [closed]",
+        "  443/tcp http nginx 1.24.0 was=closed [opened]",
+        "host 10.0.0.3 open=1 [new host]",
+        "  8080/tcp http nginx 1.24.0 [opened]",
+        "host 10.0.0.2 [host disappeared]",
+    ]
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from nmap_automator.interpretors import resilience
+from nmap_automator.interpretors.resilience import CircuitBreaker, CircuitOpenError, ProviderGuard, TokenBucket
+
+from .conftest import Clock
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def test_token_bucket_spreads_a_burst(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0
+    # The bucket is empty: the next token is refilled in a second
+    assert bucket.reserve(1) == pytest.approx(1)
+    assert bucket.reserve(1) == pytest.approx(2)
+    clock.now += 2
+    assert bucket.reserve(1) == pytest.approx(1)
+
+
+def test_token_bucket_caps_requests_and_refunds(clock):
+    bucket = TokenBucket(per_minute=10)
+    # Larger than the bucket: waits for a full bucket, not forever
+    assert bucket.reserve(100) == 0
+    assert bucket.reserve(10) == pytest.approx(60)
+    bucket.refund(10)
+    assert bucket.reserve(5) == pytest.approx(30)
+
+
+def test_unlimited_token_bucket_never_waits(clock):
+    bucket = TokenBucket(per_minute=0)
+    assert bucket.reserve(1_000_000) == 0
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.record_failure()
+    assert (breaker.state, breaker.opened) == ("open", 1)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    # A single trial call goes through
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A failed trial opens the circuit again
+    breaker.record_failure()
+    assert (breaker.state, breaker.opened) == ("open", 2)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A successful trial closes it
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert (breaker.state, breaker.failures) == ("closed", 0)
+    breaker.before_call()
+
+
+def test_released_trial_lets_another_one_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_cancelled_trial_lets_another_one_through():
+    # Half open right away: the next call is the trial
+    guard = ProviderGuard("gpt", tokens_per_minute=100, deadline=5, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0))
+    guard.breaker.record_failure()
+
+    async def cancel_trial_then_call() -> str:
+        started = asyncio.Event()
+
+        async def hang(timeout):
+            started.set()
+            await asyncio.Event().wait()
+
+        async def answer(timeout):
+            return "ok"
+
+        trial = asyncio.create_task(guard.acall(hang, tokens=100))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        # The tokens of the cancelled call were given back: no rate limit wait past the deadline
+        return await guard.acall(answer, tokens=100)
+
+    assert asyncio.run(cancel_trial_then_call()) == "ok"
+    assert guard.breaker.state == "closed"
+    assert guard.stats()["rate_limited"] == 0
@@ -0,0 +1,70 @@
+import pytest
+
+from nmap_automator.interpretors.rule_classifier import RULES, RuleClassifier
+
+
+def row(port: int, state: str = "open", name: str = "http", product: str = "nginx", version: str = "1.24.0") -> dict:
+    return {"IP": "10.0.0.1", "Protocol": "tcp", "Port": port, "State": state, "Name": name, "Product": product, "Version": version}
+
+
+def test_no_hosts_up():
+    match = RuleClassifier().classify([], "suggest", ["-sV"])
+    assert match == {
+        "rule": "no_hosts_up",
+        "confidence": 0.95,
+        "result": {
+            "error": None,
+            "result": "Incomplete",
+            "analysis_description": match["result"]["analysis_description"],
+            "next_arguments": ["-Pn"]
+        }
+    }
+
+
+def test_all_filtered():
+    records = [row(445, "filtered", "microsoft-ds", "", ""), row(139, "filtered", "netbios-ssn", "", "")]
+    match = RuleClassifier().classify(records, "normal")
+    assert (match["rule"], match["result"]["result"]) == ("all_filtered", "Incomplete")
+    # Next arguments are only given to suggest runs
+    assert match["result"]["next_arguments"] is None
+    assert match["result"]["analysis_description"].startswith("All 2 ports")
+
+
+def test_restricted_runs_get_no_description():
+    match = RuleClassifier().classify([], "restricted")
+    assert match["result"]["analysis_description"] is None
+
+
+def test_open_ports_go_to_the_llm_by_default():
+    assert RuleClassifier().classify([row(80), row(445, "filtered")], "normal", ["-sV"]) is None
+
+
+@pytest.mark.parametrize("nmap_args, confidence", [(["-sV"], 0.95), (["-A", "-T4"], 0.95), (None, 0.8)])
+def test_complete_service_scan_confidence(nmap_args, confidence):
+    classifier = RuleClassifier(rules=RULES, min_confidence=0.5)
+    match = classifier.classify([row(22, name="ssh", product="OpenSSH", version=""), row(80)], "suggest", nmap_args)
+    assert (match["rule"], match["confidence"], match["result"]["result"]) == ("complete_service_scan", confidence, "Completed")
+    assert match["result"]["next_arguments"] == []
+
+
+@pytest.mark.parametrize("records, nmap_args", [
+    # Named from the port table only
+    ([row(80, product="", version="")], ["-sV"]),
+    ([row(80, name="unknown")], ["-sV"]),
+    ([row(80, name="tcpwrapped")], ["-sV"]),
+    # No service detection
+    ([row(80)], ["-sT"]),
+])
+def test_complete_service_scan_needs_identified_services(records, nmap_args):
+    assert RuleClassifier(rules=RULES, min_confidence=0.5).classify(records, "normal", nmap_args) is None
+
+
+def test_low_confidence_matches_are_discarded():
+    classifier = RuleClassifier(rules=RULES)
+    assert classifier.classify([row(80)], "normal", None) is None
+    assert classifier.classify([row(80)], "normal", ["-sV"])["rule"] == "complete_service_scan"
+
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        RuleClassifier(rules=["no_hosts_up", "open_ports"])
@@ -0,0 +1,36 @@
+import pytest
+
+import nmap_automator.server
+from nmap_automator import runner
+
+
+class FakeApp:
+    def run(self, **kwargs) -> None:
+        self.run_args = kwargs
+
+
+@pytest.fixture
+def server_confs(monkeypatch, tmp_path) -> list:
+    confs = []
+
+    def create_api_server(server_conf):
+        confs.append(server_conf)
+        return FakeApp()
+
+    monkeypatch.setenv("NMAP_AUTOMATOR_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(nmap_automator.server, "create_api_server", create_api_server)
+    return confs
+
+
+def test_reloader_watcher_does_not_schedule(server_confs, monkeypatch, tmp_path):
+    monkeypatch.delenv("WERKZEUG_RUN_MAIN", raising=False)
+    runner.run_server()
+    assert not server_confs[0].scheduler_enabled
+    # The rest of the configuration still comes from the environment
+    assert server_confs[0].data_dir == str(tmp_path)
+
+
+def test_serving_process_schedules(server_confs, monkeypatch):
+    monkeypatch.setenv("WERKZEUG_RUN_MAIN", "true")
+    runner.run_server()
+    assert server_confs[0].scheduler_enabled
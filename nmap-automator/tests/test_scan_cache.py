@@ -0,0 +1,39 @@
+import json
+
+from nmap_automator.storage.scan_cache import ScanCache
+
+ROWS = [{"IP": "10.0.0.1", "Port": 22, "State": "open"}]
+
+
+def test_cache_key_ignores_argument_order_and_target_case(tmp_path, cache_clock):
+    cache = ScanCache(str(tmp_path / "cache.db"))
+    cache.put("WWW.Example.Test.", ["-sV", "-T4"], ROWS)
+    assert cache.get("www.example.test", ["-T4", "-sV", "-T4"])["results"] == ROWS
+    assert cache.get("www.example.test", ["-T4"]) is None
+
+
+def test_entries_expire(tmp_path, cache_clock):
+    cache = ScanCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.put("10.0.0.1", ["-sV"], ROWS)
+    cache_clock.now += 30
+    assert cache.get("10.0.0.1", ["-sV"])["age_seconds"] == 30
+    cache_clock.now += 31
+    assert cache.get("10.0.0.1", ["-sV"]) is None
+    assert cache.usage()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, cache_clock):
+    entry_size = len(json.dumps(ROWS))
+    cache = ScanCache(str(tmp_path / "cache.db"), max_bytes=2 * entry_size)
+    cache.put("a", ["-sV"], ROWS)
+    cache_clock.now += 1
+    cache.put("b", ["-sV"], ROWS)
+    cache_clock.now += 1
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a", ["-sV"]) is not None
+    cache_clock.now += 1
+    cache.put("c", ["-sV"], ROWS)
+    assert cache.get("b", ["-sV"]) is None
+    assert cache.get("a", ["-sV"]) is not None
+    assert cache.get("c", ["-sV"]) is not None
+    assert cache.usage() == {"entries": 2, "size_bytes": 2 * entry_size}
@@ -0,0 +1,52 @@
+from nmap_automator.storage.scan_diff import diff_scans, diff_to_results
+
+
+def row(ip: str, port: int, state: str = "open", name: str = "http", product: str = "nginx", version: str = "1.24.0") -> dict:
+    return {"IP": ip, "Protocol": "tcp", "Port": port, "State": state, "Name": name, "Product": product, "Version": version}
+
+
+BASE = [
+    row("10.0.0.1", 22, name="ssh", product="OpenSSH", version="8.9"),
+    row("10.0.0.1", 80),
+    row("10.0.0.1", 443, state="closed"),
+    row("10.0.0.2", 80),
+]
+NEW = [
+    row("10.0.0.1", 22, name="ssh", product="OpenSSH", version="9.6"),
+    # Rows read back from a CSV file carry the port as a string
+    {**row("10.0.0.1", 443), "Port": "443"},
+    row("10.0.0.3", 8080),
+]
+
+
+def test_diff_scans():
+    diff = diff_scans(BASE, NEW)
+    assert diff["new_hosts"] == ["10.0.0.3"]
+    assert diff["disappeared_hosts"] == ["10.0.0.2"]
+    assert [(entry["IP"], entry["Port"], entry.get("Previous State")) for entry in diff["opened_ports"]] == [
+        ("10.0.0.1", 443, "closed"), ("10.0.0.3", 8080, None)
+    ]
+    # Port 80 of 10.0.0.1 is missing from the new scan; the ports of 10.0.0.2 are not repeated
+    assert [(entry["IP"], entry["Port"], entry["State"]) for entry in diff["closed_ports"]] == [("10.0.0.1", 80, "absent")]
+    assert diff["service_changes"] == [{
+        "IP": "10.0.0.1", "Protocol": "tcp", "Port": 22,
+        "before": {"Name": "ssh", "Product": "OpenSSH", "Version": "8.9"},
+        "after": {"Name": "ssh", "Product": "OpenSSH", "Version": "9.6"}
+    }]
+    assert diff["summary"] == {"new_hosts": 1, "disappeared_hosts": 1, "opened_ports": 2, "closed_ports": 1, "service_changes": 1}
+
+
+def test_identical_scans_have_no_changes():
+    assert diff_to_results(diff_scans(BASE, list(reversed(BASE)))) == []
+
+
+def test_diff_to_results():
+    changes = [(result["IP"], result.get("Port"), result["Change"]) for result in diff_to_results(diff_scans(BASE, NEW))]
+    assert changes == [
+        ("10.0.0.1", 443, "opened"),
+        ("10.0.0.3", 8080, "opened"),
+        ("10.0.0.1", 80, "closed"),
+        ("10.0.0.1", 22, "service changed (was: ssh OpenSSH 8.9)"),
+        ("10.0.0.3", None, "new host"),
+        ("10.0.0.2", None, "host disappeared"),
+    ]
@@ -0,0 +1,37 @@
+from nmap_automator.storage.scan_journal import ScanJournal
+
+ROWS = [{"IP": "10.0.0.1", "Port": 22, "State": "open"}]
+
+
+def test_journal_is_read_back(tmp_path):
+    journal = ScanJournal(str(tmp_path))
+    assert not journal.exists
+    journal.start({"nmap_args": ["-sV"], "target": ["10.0.0.1", "10.0.0.0/16"]})
+    journal.record_target({"target": "10.0.0.1", "results": ROWS})
+    journal.record_shard("10.0.0.0/16", "10.0.0.0/24", ROWS)
+    journal.record_host("10.0.1.0/24", "10.0.1.5", [])
+
+    loaded = ScanJournal(str(tmp_path)).load()
+    assert loaded.exists
+    assert loaded.scanner == {"nmap_args": ["-sV"], "target": ["10.0.0.1", "10.0.0.0/16"]}
+    assert loaded.targets == {"10.0.0.1": {"target": "10.0.0.1", "results": ROWS}}
+    assert loaded.shards == {"10.0.0.0/16": {"10.0.0.0/24": ROWS}}
+    assert loaded.hosts == {"10.0.1.0/24": {"10.0.1.5": []}}
+
+
+def test_torn_line_is_ignored(tmp_path):
+    journal = ScanJournal(str(tmp_path))
+    journal.start({"nmap_args": ["-sV"], "target": ["10.0.0.1", "10.0.0.2"]})
+    journal.record_target({"target": "10.0.0.1", "results": ROWS})
+    # A crash in the middle of the next write
+    with open(journal.path, "a") as f:
+        f.write('{"event": "target", "result": {"target": "10.0.0.2", "res')
+
+    loaded = ScanJournal(str(tmp_path)).load()
+    assert list(loaded.targets) == ["10.0.0.1"]
+
+
+def test_resume_log_path(tmp_path):
+    path = ScanJournal(str(tmp_path)).resume_log("10.0.0.0/24")
+    assert path == str(tmp_path / "resume" / "10.0.0.0_24.gnmap")
+    assert (tmp_path / "resume").is_dir()
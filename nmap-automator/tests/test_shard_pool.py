@@ -0,0 +1,37 @@
+from nmap_automator.scanner.shard_pool import ShardPool, scan_shard, split_range
+
+
+def test_split_range():
+    assert split_range("10.0.0.0/22", 256) == ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24", "10.0.3.0/24"]
+    assert split_range("10.0.0.0/24", 256) == ["10.0.0.0/24"]
+    assert split_range("www.example.test", 256) == ["www.example.test"]
+
+
+def test_scan_shard(fake_nmap, tmp_path):
+    result = scan_shard("10.0.0.0/24", "-sV", "native", str(tmp_path / "cancel"))
+    assert result["shard"] == "10.0.0.0/24"
+    assert not result["cancelled"]
+    assert [(row["IP"], row["Port"]) for row in result["results"]] == [("10.0.0.1", 22), ("10.0.0.1", 80), ("10.0.0.2", 443)]
+
+
+def test_failed_shard_is_reported(fake_nmap, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_NMAP_FIXTURE", str(tmp_path / "missing.xml"))
+    result = scan_shard("10.0.0.0/24", "-sV", "native", str(tmp_path / "cancel"))
+    assert result["error"].startswith("nmap failed")
+    assert "results" not in result
+
+
+def test_cancelled_shard(fake_nmap, tmp_path):
+    flag = tmp_path / "cancel"
+    flag.touch()
+    assert scan_shard("10.0.0.0/24", "-sV", "native", str(flag)) == {"shard": "10.0.0.0/24", "error": "Scan cancelled.", "cancelled": True}
+
+
+def test_pool_returns_shards_in_order(fake_nmap):
+    pool = ShardPool(workers=2)
+    try:
+        results = pool.run(["10.0.1.0/24", "10.0.0.0/24"], "-sV")
+    finally:
+        pool.shutdown()
+    assert [result["shard"] for result in results] == ["10.0.1.0/24", "10.0.0.0/24"]
+    assert [len(result["results"]) for result in results] == [1, 3]
@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from nmap_automator.server.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {"rows": [1, 2]}
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flights.do, "key", work)
+        started.wait()
+        followers = [pool.submit(flights.do, "key", work) for _ in range(3)]
+        # Followers are waiting on the leader's flight
+        while flights.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert len(calls) == 1
+    assert [coalesced for _, coalesced in results] == [False, True, True, True]
+    # Every follower gets its own copy of the result
+    assert all(result == {"rows": [1, 2]} for result, _ in results)
+    assert results[1][0] is not results[2][0]
+    assert flights.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    def fail():
+        raise RuntimeError("nmap failed")
+
+    flights = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: 42) == (42, False)
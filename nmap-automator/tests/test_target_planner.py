@@ -0,0 +1,72 @@
+import ipaddress
+
+import pytest
+
+from nmap_automator.scanner.target_planner import TargetPlanner, normalize_target
+
+ADDRESSES = {
+    "www.example.test": "10.0.0.1",
+    "web.example.test": "10.0.0.1",
+    "mail.example.test": "192.168.1.10",
+}
+
+
+def planner() -> TargetPlanner:
+    return TargetPlanner(resolver=ADDRESSES.get)
+
+
+@pytest.mark.parametrize("target, expected", [
+    ("WWW.Example.Test.", "www.example.test"),
+    (" 10.0.0.1 ", "10.0.0.1"),
+    ("2001:DB8:0:0::1", "2001:db8::1"),
+    ("10.0.0.7/24", "10.0.0.0/24"),
+    ("10.0.1.1-20", "10.0.1.1-20"),
+])
+def test_normalize_target(target, expected):
+    assert normalize_target(target) == expected
+
+
+def test_duplicates_are_scanned_once():
+    plan = planner().plan(["10.0.0.1", "10.0.0.1", "WWW.EXAMPLE.TEST."])
+    assert plan.requested == ["10.0.0.1", "www.example.test"]
+    assert plan.scan_targets == ["10.0.0.1"]
+    assert plan.stats() == {"requested": 3, "unique": 2, "planned": 1, "deduplicated": 2, "unresolved": []}
+
+
+def test_adjacent_and_overlapping_ranges_are_collapsed():
+    plan = planner().plan(["10.0.0.0/25", "10.0.0.128/25", "10.0.0.64/26", "10.0.0.200"])
+    assert plan.scan_targets == ["10.0.0.0/24"]
+    # Every requested range only keeps the rows of its own addresses
+    assert plan.routes["10.0.0.128/25"] == ("10.0.0.0/24", ipaddress.ip_network("10.0.0.128/25"))
+    assert plan.routes["10.0.0.200"] == ("10.0.0.0/24", ipaddress.ip_network("10.0.0.200/32"))
+
+
+def test_names_sharing_an_ip_or_inside_a_range():
+    plan = planner().plan(["www.example.test", "web.example.test", "mail.example.test", "192.168.1.0/24"])
+    assert plan.scan_targets == ["10.0.0.1", "192.168.1.0/24"]
+    assert plan.requested_by("10.0.0.1") == ["www.example.test", "web.example.test"]
+    assert plan.requested_by("192.168.1.0/24") == ["mail.example.test", "192.168.1.0/24"]
+    # The range was requested as is: it keeps all of its rows
+    assert plan.routes["192.168.1.0/24"] == ("192.168.1.0/24", None)
+
+
+def test_unresolved_names_and_nmap_ranges_are_scanned_as_given():
+    plan = planner().plan(["missing.example.test", "10.0.1.1-20"])
+    assert plan.scan_targets == ["missing.example.test", "10.0.1.1-20"]
+    assert plan.unresolved == ["missing.example.test"]
+
+
+def test_fan_out_keeps_the_rows_of_the_requested_target():
+    plan = planner().plan(["10.0.0.0/25", "10.0.0.128/25"])
+    scan_result = {
+        "target": "10.0.0.0/24",
+        "results": [{"IP": "10.0.0.5", "Port": 22}, {"IP": "10.0.0.130", "Port": 80}]
+    }
+    result = plan.fan_out("10.0.0.128/25", scan_result)
+    assert result["target"] == "10.0.0.128/25"
+    assert result["scanned_as"] == "10.0.0.0/24"
+    assert result["results"] == [{"IP": "10.0.0.130", "Port": 80, "Subdomain": "10.0.0.128/25"}]
+
+    host = {"IP": "10.0.0.5", "status": "up", "hostnames": [], "results": [{"IP": "10.0.0.5", "Port": 22}]}
+    assert plan.fan_out_host("10.0.0.128/25", host) is None
+    assert plan.fan_out_host("10.0.0.0/25", host)["results"] == [{"IP": "10.0.0.5", "Port": 22, "Subdomain": "10.0.0.0/25"}]
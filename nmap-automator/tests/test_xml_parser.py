@@ -0,0 +1,43 @@
+import io
+
+from nmap_automator.scanner.xml_parser import HostRecord, NmapXmlParser, PortRecord, iter_hosts, iter_hosts_from_file
+
+from .conftest import SCAN_XML
+
+
+def test_iter_hosts_from_file(scan_xml):
+    hosts = list(iter_hosts_from_file(scan_xml))
+    assert [host.ip for host in hosts] == ["10.0.0.1", "10.0.0.2", "10.0.1.5"]
+    assert hosts[0] == HostRecord(
+        "10.0.0.1", "up", ("www.example.test",),
+        (
+            PortRecord("10.0.0.1", "tcp", 22, "open", "ssh", "OpenSSH", "9.6"),
+            PortRecord("10.0.0.1", "tcp", 80, "open", "http", "nginx", "1.24.0"),
+        ),
+        1200,
+        False
+    )
+    assert hosts[2].ports == (PortRecord("10.0.1.5", "tcp", 445, "filtered", "microsoft-ds", "", ""),)
+    assert hosts[2].timed_out
+
+
+def test_hosts_are_yielded_as_soon_as_they_are_complete():
+    data = SCAN_XML.encode()
+    parser = NmapXmlParser()
+    end_of_first_host = data.index(b"</host>") + len(b"</host>")
+    assert list(parser.feed(data[:end_of_first_host - 1])) == []
+    assert [host.ip for host in parser.feed(data[end_of_first_host - 1:end_of_first_host])] == ["10.0.0.1"]
+    assert [host.ip for host in parser.feed(data[end_of_first_host:])] == ["10.0.0.2", "10.0.1.5"]
+    parser.close()
+
+
+def test_small_chunks_give_the_same_records(scan_xml):
+    assert list(iter_hosts(io.BytesIO(SCAN_XML.encode()), chunk_size=7)) == list(iter_hosts_from_file(scan_xml))
+
+
+def test_to_dict():
+    host = next(iter_hosts(io.BytesIO(SCAN_XML.encode())))
+    assert host.to_dict("www.example.test")["results"][0] == {
+        "IP": "10.0.0.1", "Protocol": "tcp", "Port": 22, "State": "open",
+        "Name": "ssh", "Product": "OpenSSH", "Version": "9.6", "Subdomain": "www.example.test"
+    }